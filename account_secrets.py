@@ -0,0 +1,38 @@
+import os
+import base64
+import hashlib
+
+from cryptography.fernet import Fernet, InvalidToken
+
+# Platform account passwords have to be recoverable to log in, so unlike the
+# dashboard's bcrypt hashes they are encrypted. ACCOUNT_SECRET_KEY is a Fernet
+# key (python -c 'from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())');
+# without it a key is derived from SECRET_KEY.
+ACCOUNT_SECRET_KEY = os.getenv("ACCOUNT_SECRET_KEY")
+
+
+def _fernet() -> Fernet:
+    if ACCOUNT_SECRET_KEY:
+        return Fernet(ACCOUNT_SECRET_KEY.encode())
+    secret = os.getenv("SECRET_KEY", "a-very-secret-key-please-change")
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest()))
+
+
+def is_legacy_hash(value: str) -> bool:
+    """Older versions stored platform passwords as bcrypt hashes, which cannot be turned back into a password."""
+    return bool(value) and value.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+def encrypt_secret(plain: str) -> str:
+    return _fernet().encrypt(plain.encode()).decode()
+
+
+def decrypt_secret(token: str) -> str:
+    """Raises ValueError when the token was not encrypted with the current key."""
+    if is_legacy_hash(token):
+        raise ValueError("Account password was stored as a one-way hash by an older version; "
+                         "re-enter it with PUT /api/accounts/{id}/credentials")
+    try:
+        return _fernet().decrypt(token.encode()).decode()
+    except InvalidToken:
+        raise ValueError("Account password cannot be decrypted; was ACCOUNT_SECRET_KEY or SECRET_KEY changed?")
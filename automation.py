@@ -1,10 +1,18 @@
-import asyncio
+import time
 import logging
-from models import Content
-from database import SessionLocal
+from functools import partial
+from typing import Dict, Optional
+from metrics import UPLOAD_DURATION
+from retry_policy import UploadError
+from platform_executor import platform_executor
+from upload_job import UploadJob
 
 # Import the new specific uploader functions
 from instagram_api import (
+    credentials_for,
+    STAGEABLE_POST_TYPES,
+    stage_media,
+    publish_staged,
     upload_photo,
     upload_video,
     upload_reel,
@@ -17,15 +25,19 @@ logger = logging.getLogger(__name__)
 class ContentUploader:
     """
     Manages the content uploading process by routing to the correct uploader.
+    Works on UploadJob snapshots, never on ORM objects.
     """
-    
-    async def upload_to_instagram(self, content: Content) -> bool:
+
+    async def upload_to_instagram(self, job: UploadJob, staged: Optional[Dict] = None) -> bool:
         """
-        Dispatches the content to the correct instagrapi upload function
-        based on the post_type stored in the Content object.
+        Dispatches the job to the correct instagrapi upload function based
+        on its post_type, posting from its account (the .env account when
+        None). When `staged` holds the job's media, uploaded earlier by
+        stage_for_platform, only the configure step is sent.
+        Raises UploadError when the upload fails.
         """
-        post_type = content.post_type
-        logger.info(f"Dispatching content {content.id} for Instagram upload as type: '{post_type}'")
+        post_type = job.post_type
+        logger.info(f"Dispatching content {job.content_id} for Instagram upload as type: '{post_type}'")
 
         # Define a mapping from post_type to the upload function
         upload_functions = {
@@ -39,47 +51,77 @@ class ContentUploader:
         upload_function = upload_functions.get(post_type)
 
         if not upload_function:
-            logger.error(f"Unknown post type '{post_type}' for content ID {content.id}")
-            return False
+            logger.error(f"Unknown post type '{post_type}' for content ID {job.content_id}")
+            raise UploadError(f"Unknown post type '{post_type}'", "invalid_media", retryable=False)
 
         try:
-            loop = asyncio.get_running_loop()
+            if staged is not None:
+                credentials = job.account or credentials_for()
+                if (staged.get("post_type"), staged.get("path"), staged.get("username")) == (post_type, job.paths[0], credentials.username):
+                    return await platform_executor.run(publish_staged, staged, job.caption, credentials)
+                logger.warning(f"Pre-staged upload of content {job.content_id} no longer matches it; uploading it again.")
+
+            if job.account is not None:
+                upload_function = partial(upload_function, account=job.account)
 
             # Prepare arguments for the upload function
             if post_type == "album":
                 # Album expects a list of paths
-                args = [content.file_path.split(','), content.caption]
+                args = [list(job.paths), job.caption]
             elif post_type == "story":
                 # Story needs a path and file_type. Caption is not supported by the library for stories.
-                args = [content.file_path, content.file_type]
+                args = [job.paths[0], job.file_type]
             else:
                 # Others need path and caption
-                args = [content.file_path, content.caption]
+                args = [job.paths[0], job.caption]
 
-            # Run the synchronous instagrapi function in a separate thread
-            success = await loop.run_in_executor(
-                None,       # Use the default executor
+            # Run the synchronous instagrapi function in the bounded platform
+            # executor, not the default one the rest of the app shares
+            success = await platform_executor.run(
                 upload_function, # The specific function to call (e.g., upload_photo)
                 *args       # Unpack arguments
             )
 
             if success:
-                logger.info(f"Successfully processed content {content.id} (type: {post_type}).")
+                logger.info(f"Successfully processed content {job.content_id} (type: {post_type}).")
             else:
-                logger.error(f"Failed to process content {content.id} (type: {post_type}).")
+                logger.error(f"Failed to process content {job.content_id} (type: {post_type}).")
             return success
 
         except Exception as e:
-            logger.error(f"An unexpected error occurred during dispatch for content {content.id}: {e}")
-            return False
-    
-    async def upload_to_platform(self, content: Content, platform: str) -> bool:
+            logger.error(f"An unexpected error occurred during dispatch for content {job.content_id}: {e}")
+            raise UploadError.from_exception(e) from e
+
+    async def stage_for_platform(self, job: UploadJob) -> Optional[Dict]:
+        """
+        Uploads the media of a single photo, video or reel ahead of its
+        publish time. Returns the staged upload to pass to upload_to_platform
+        later, or None when the job cannot be pre-staged.
+        Raises UploadError when the upload fails.
+        """
+        if job.platform != "instagram" or job.post_type not in STAGEABLE_POST_TYPES or len(job.paths) != 1:
+            return None
+        return await platform_executor.run(stage_media, job.paths[0], job.post_type, job.account or credentials_for())
+
+    async def upload_to_platform(self, job: UploadJob, staged: Optional[Dict] = None) -> bool:
         """
-        Routes the content upload to the appropriate platform-specific method.
+        Routes the job to the appropriate platform-specific method.
+        `staged` is a pre-staged upload from stage_for_platform, if any.
+        Raises UploadError when the upload fails.
         """
+        platform = job.platform
         # This function now only supports 'instagram' but is kept for structural consistency.
         if platform == "instagram":
-            return await self.upload_to_instagram(content)
+            started = time.perf_counter()
+            success = False
+            try:
+                success = await self.upload_to_instagram(job, staged)
+                return success
+            finally:
+                UPLOAD_DURATION.labels(
+                    platform=platform, post_type=job.post_type,
+                    outcome="success" if success else "failure",
+                ).observe(time.perf_counter() - started)
         else:
             logger.error(f"Unsupported platform: '{platform}'. This application is currently configured for Instagram only.")
-            return False
+            raise UploadError(f"Unsupported platform '{platform}'", "unsupported_platform", retryable=False)
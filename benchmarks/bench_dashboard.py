@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboard data loading as the contents and schedules tables grow.
+
+Seeds a throwaway SQLite database and times what the `/` handler does per
+page load:
+
+  legacy  - the original six queries: latest contents, every pending
+            schedule, three count()s and every recurring schedule.
+  single  - load_dashboard(): latest contents, the recurring schedules of
+            those contents only, and one aggregate stats query.
+  cached  - get_dashboard() while its TTL cache entry is warm.
+
+    python benchmarks/bench_dashboard.py --rows 100000 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_DIR = tempfile.mkdtemp(prefix="bench_dashboard_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Base, engine, SessionLocal
+from models import Content, Schedule
+from dashboard_stats import dashboard_cache, get_dashboard, load_dashboard
+
+
+def seed(rows: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, rows, 10000):
+            count = min(10000, rows - offset)
+            conn.execute(Content.__table__.insert(), [{
+                "filename": f"{offset + i}.jpg", "file_path": f"/tmp/{offset + i}.jpg",
+                "platform": "instagram", "post_type": "photo",
+                "status": random.choice(("uploaded", "published", "failed")),
+                "created_at": start + timedelta(seconds=offset + i),
+            } for i in range(count)])
+            conn.execute(Schedule.__table__.insert(), [{
+                "content_id": offset + i + 1, "platform": "instagram",
+                "status": random.choice(("pending", "recurring", "completed", "completed")),
+                "scheduled_time": start, "hour": random.randrange(24), "minute": random.randrange(60),
+            } for i in range(count)])
+
+
+def legacy_load():
+    db = SessionLocal()
+    try:
+        contents = db.query(Content).order_by(Content.created_at.desc()).limit(10).all()
+        schedules = db.query(Schedule).filter(Schedule.status == "pending").all()
+        total_contents = db.query(Content).count()
+        pending_schedules = db.query(Schedule).filter(Schedule.status == "pending").count()
+        published_contents = db.query(Content).filter(Content.status == "published").count()
+        recurring_map = {s.content_id: s for s in db.query(Schedule).filter(Schedule.status == 'recurring').all()}
+        return contents, schedules, recurring_map, (total_contents, pending_schedules, published_contents)
+    finally:
+        db.close()
+
+
+def single_load():
+    db = SessionLocal()
+    try:
+        return load_dashboard(db)
+    finally:
+        db.close()
+
+
+def cached_load():
+    db = SessionLocal()
+    try:
+        return get_dashboard(db)
+    finally:
+        db.close()
+
+
+def best_of(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000],
+                        help="Contents (and schedules) to seed, one run per value")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"Seeding {rows} contents and {rows} schedules...")
+        seed(rows)
+        dashboard_cache.invalidate()
+        cached_load()  # warm the cache entry
+
+        legacy = best_of(legacy_load, args.repeats)
+        single = best_of(single_load, args.repeats)
+        cached = best_of(cached_load, args.repeats)
+
+        print(f"  legacy six queries: {legacy * 1000:9.2f} ms")
+        print(f"  single aggregate:   {single * 1000:9.2f} ms  ({legacy / single:.1f}x)")
+        print(f"  cached:             {cached * 1000:9.2f} ms  ({legacy / cached:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full active-schedule scan vs. the indexed next_run_at due query.
+
+Seeds a throwaway SQLite database with N schedules (mostly recurring, a few
+one-time jobs already due) and times one scheduler tick both ways:
+
+  legacy  - load every pending/recurring row and evaluate due-ness in Python
+            with pytz, as check_and_run_schedules used to.
+  indexed - fetch_due_batches(): status IN (...) AND next_run_at <= now,
+            ordered and LIMIT-batched on the (status, next_run_at) index.
+
+    python benchmarks/bench_due_query.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+
+DB_DIR = tempfile.mkdtemp(prefix="bench_due_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytz
+from database import Base, engine, SessionLocal
+from models import Content, Schedule
+from schedule_engine import fetch_due_batches
+from schedule_times import fire_time, to_db_time
+
+
+def seed(rows: int, due: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(Content.__table__.insert(), [{"filename": "p.jpg", "file_path": "/tmp/p.jpg"}])
+        batch = []
+        for i in range(rows):
+            if i < due:
+                row = Schedule(status="pending", scheduled_time=now - timedelta(seconds=30))
+            else:
+                row = Schedule(status="recurring", scheduled_time=now,
+                               hour=random.randrange(24), minute=random.randrange(60))
+                # Keep recurring rows out of the current minute so only `due` rows are due.
+                if row.hour == now.hour and row.minute == now.minute:
+                    row.minute = (row.minute + 1) % 60
+            batch.append({
+                "content_id": 1, "platform": "instagram", "status": row.status,
+                "scheduled_time": to_db_time(row.scheduled_time), "hour": row.hour, "minute": row.minute,
+                "next_run_at": to_db_time(fire_time(row, now)),
+            })
+            if len(batch) == 10000:
+                conn.execute(Schedule.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(Schedule.__table__.insert(), batch)
+
+
+def legacy_tick(now_utc: datetime) -> int:
+    db = SessionLocal()
+    try:
+        due = 0
+        active = db.query(Schedule).filter(
+            (Schedule.status == 'pending') | (Schedule.status == 'recurring')
+        ).all()
+        for schedule in active:
+            if schedule.status == 'pending':
+                if now_utc >= schedule.scheduled_time.replace(tzinfo=timezone.utc):
+                    due += 1
+            else:
+                user_timezone = pytz.timezone(os.getenv('TIMEZONE', 'UTC'))
+                now_in_user_tz = datetime.now(user_timezone)
+                if now_in_user_tz.hour == schedule.hour and now_in_user_tz.minute == schedule.minute:
+                    due += 1
+        return due
+    finally:
+        db.close()
+
+
+def indexed_tick(now_utc: datetime) -> int:
+    db = SessionLocal()
+    try:
+        return sum(len(batch) for batch in fetch_due_batches(db, now_utc, 500))
+    finally:
+        db.close()
+
+
+def best_of(fn, repeats: int):
+    timings, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn(datetime.now(timezone.utc))
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--due", type=int, default=50, help="How many of the rows are due now")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.rows} schedules ({args.due} due)...")
+    seed(args.rows, args.due)
+
+    legacy, legacy_due = best_of(legacy_tick, args.repeats)
+    indexed, indexed_due = best_of(indexed_tick, args.repeats)
+
+    print(f"  legacy full scan: {legacy * 1000:9.1f} ms  ({legacy_due} due)")
+    print(f"  indexed query:    {indexed * 1000:9.1f} ms  ({indexed_due} due)")
+    print(f"  speedup:          {legacy / indexed:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
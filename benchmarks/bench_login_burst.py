@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency of other requests while a burst of logins is verified.
+
+Runs the app in-process (httpx over ASGI, one event loop like a uvicorn
+worker) against a throwaway database with one dashboard user, fires a
+burst of concurrent logins and meanwhile pings a trivial endpoint every
+few milliseconds, reporting the ping latency:
+
+  blocking - an equivalent login endpoint that calls auth.verify_password
+             directly in the async handler, as POST /login used to
+  pooled   - the real POST /login, which verifies in auth's bcrypt pool
+
+    python benchmarks/bench_login_burst.py --logins 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DB_DIR = tempfile.mkdtemp(prefix="bench_login_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+from fastapi import Form, HTTPException
+
+import auth
+import main
+from database import Base, async_engine, engine, SessionLocal
+from models import Account
+
+USERNAME, PASSWORD = "bench", "bench-password"
+
+
+@main.app.get("/bench-ping")
+async def ping():
+    return {}
+
+
+@main.app.post("/legacy-login")
+async def legacy_login(username: str = Form(...), password: str = Form(...)):
+    db = SessionLocal()
+    try:
+        user = db.query(Account).filter(Account.platform == "webapp", Account.username == username).first()
+    finally:
+        db.close()
+    if not user or not auth.verify_password(password, user.password):
+        raise HTTPException(status_code=400)
+    return {"access_token": auth.create_access_token(data={"sub": user.username})}
+
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(Account(platform="webapp", username=USERNAME, password=auth.get_password_hash(PASSWORD)))
+    db.commit()
+    db.close()
+
+
+async def burst(client: httpx.AsyncClient, path: str, logins: int, interval: float):
+    latencies = []
+    done = asyncio.Event()
+
+    async def pinger():
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get("/bench-ping")
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(interval)
+
+    async def login():
+        response = await client.post(path, data={"username": USERNAME, "password": PASSWORD})
+        assert response.status_code in (200, 302), response.status_code
+
+    ping_task = asyncio.create_task(pinger())
+    await asyncio.sleep(interval * 5)  # a few pings before the burst
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ping_task
+    return elapsed, latencies
+
+
+def report(label: str, elapsed: float, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"  {label:8} burst {elapsed:6.2f}s | ping p50 {statistics.median(latencies) * 1000:8.1f} ms"
+          f"  p95 {p95 * 1000:8.1f} ms  max {latencies[-1] * 1000:8.1f} ms  ({len(latencies)} pings)")
+
+
+async def run(logins: int, interval: float):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        blocking = await burst(client, "/legacy-login", logins, interval)
+        pooled = await burst(client, "/login", logins, interval)
+    await async_engine.dispose()
+    return blocking, pooled
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20, help="Concurrent logins in the burst")
+    parser.add_argument("--interval", type=float, default=0.005, help="Pause between pings in seconds")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    seed()
+
+    blocking, pooled = asyncio.run(run(args.logins, args.interval))
+    print(f"{args.logins} concurrent logins, AUTH_HASH_WORKERS={auth.AUTH_HASH_WORKERS}")
+    report("blocking", *blocking)
+    report("pooled", *pooled)
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial vs. concurrent dispatch of due schedules.
+
+Seeds N one-time schedules that are all due now into a throwaway SQLite
+database, replaces ContentUploader with a mock that sleeps for a fixed
+latency, and measures the wall-clock time of check_and_run_schedules.
+
+    python benchmarks/bench_scheduler_dispatch.py --schedules 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+
+DB_DIR = tempfile.mkdtemp(prefix="bench_dispatch_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import run_scheduler
+from database import Base, engine, SessionLocal
+from models import Content, Schedule
+
+
+def seed(count: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    due_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    for i in range(count):
+        content = Content(filename=f"post_{i}.jpg", file_path=f"/tmp/post_{i}.jpg", post_type="photo")
+        db.add(content)
+        db.flush()
+        db.add(Schedule(
+            content_id=content.id, platform="instagram", scheduled_time=due_at,
+            status="pending", next_run_at=due_at.replace(tzinfo=None)
+        ))
+    db.commit()
+    db.close()
+
+
+class SlowUploader:
+    latency = 0.5
+
+    async def upload_to_platform(self, content, platform):
+        await asyncio.sleep(self.latency)
+        return True
+
+
+def run(count: int, concurrency: int, per_account: int) -> float:
+    seed(count)
+    started = time.perf_counter()
+    asyncio.run(run_scheduler.check_and_run_schedules(concurrency=concurrency, per_account_concurrency=per_account))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated upload time in seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-account", type=int, default=8,
+                        help="Per-account limit; all seeded schedules share one account")
+    args = parser.parse_args()
+
+    SlowUploader.latency = args.latency
+    import logging
+    logging.disable(logging.INFO)
+
+    with patch("scheduler.ContentUploader", SlowUploader):
+        serial = run(args.schedules, 1, 1)
+        concurrent = run(args.schedules, args.concurrency, args.per_account)
+
+    print(f"{args.schedules} due schedules, {args.latency:.2f}s simulated upload latency")
+    print(f"  serial:     {serial:7.2f}s")
+    print(f"  concurrent: {concurrent:7.2f}s  (concurrency={args.concurrency}, per-account={args.per_account})")
+    print(f"  speedup:    {serial / concurrent:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark: web app startup time and per-worker memory.
+
+1. Imports main (and run_scheduler) in fresh interpreters against a
+   throwaway database and reports the import time, the RSS after import
+   and whether the Instagram SDK or Alembic came along.
+2. Starts gunicorn with gunicorn_config.py and --workers workers, with and
+   without preload_app, and reports the time until every worker serves
+   requests plus each worker's memory from /proc/<pid>/smaps_rollup:
+   RSS, PSS (shared pages split between the processes sharing them) and
+   USS (pages only that worker holds). Copy-on-write sharing from a
+   preloaded master shows up as a lower PSS/USS at a similar RSS.
+
+Part 2 needs Linux and gunicorn; it is skipped otherwise.
+
+    python benchmarks/bench_startup.py --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_DIR = tempfile.mkdtemp(prefix="bench_startup_")
+DATABASE_URL = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+with open("/proc/self/status") as status:
+    rss_kb = next((int(line.split()[1]) for line in status if line.startswith("VmRSS:")), 0)
+print(json.dumps({{"seconds": elapsed, "rss_kb": rss_kb, "modules": len(sys.modules),
+                  "instagrapi": "instagrapi" in sys.modules, "alembic": "alembic" in sys.modules}}))
+"""
+
+
+def bench_env(**extra) -> dict:
+    env = dict(os.environ, DATABASE_URL=DATABASE_URL, **extra)
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)  # Any value, even empty, switches prometheus_client to files
+    return env
+
+
+def import_once(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+        cwd=ROOT, env=bench_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report_imports(module: str, runs: int):
+    samples = [import_once(module) for _ in range(runs)]
+    seconds = statistics.median(sample["seconds"] for sample in samples)
+    rss_mb = statistics.median(sample["rss_kb"] for sample in samples) / 1024
+    last = samples[-1]
+    print(f"  import {module:14} {seconds * 1000:7.0f} ms  RSS {rss_mb:6.1f} MB  {last['modules']:5} modules"
+          f"  instagrapi={'yes' if last['instagrapi'] else 'no'}  alembic={'yes' if last['alembic'] else 'no'}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children(pid: int) -> list:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def memory_kb(pid: int) -> dict:
+    """Rss, Pss and USS (private clean + dirty) of a process in kB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":"):
+                fields[parts[0][:-1]] = int(parts[1]) if parts[1].isdigit() else 0
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def serving(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def run_gunicorn(workers: int, preload: bool, settle: float, timeout: float):
+    port = free_port()
+    env = bench_env(PORT=str(port), WEB_WORKERS=str(workers), WEB_PRELOAD_APP=str(preload).lower(),
+                    DB_POOL_LOG_SECONDS="0")
+    started = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "--pid", os.path.join(DB_DIR, "gunicorn.pid"),
+         "main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Ready once every worker has booted and one of them answers
+        while not (len(children(master.pid)) == workers and serving(port)):
+            if master.poll() is not None or time.perf_counter() - started > timeout:
+                raise RuntimeError(f"gunicorn did not start (exit code {master.poll()})")
+            time.sleep(0.05)
+        ready = time.perf_counter() - started
+        time.sleep(settle)  # Let the remaining workers finish booting their apps
+        # Warm every worker a little, so the numbers reflect serving processes
+        for _ in range(workers * 4):
+            serving(port)
+        master_memory = memory_kb(master.pid)
+        worker_memory = [memory_kb(pid) for pid in children(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+    return ready, master_memory, worker_memory
+
+
+def report_gunicorn(workers: int, preload: bool, settle: float, timeout: float):
+    ready, master, worker_memory = run_gunicorn(workers, preload, settle, timeout)
+
+    def mean_mb(key):
+        return statistics.mean(memory[key] for memory in worker_memory) / 1024
+
+    total_pss = (master["pss"] + sum(memory["pss"] for memory in worker_memory)) / 1024
+    print(f"  preload_app={'on ' if preload else 'off'}  ready in {ready:5.2f}s | per worker: RSS {mean_mb('rss'):6.1f} MB"
+          f"  PSS {mean_mb('pss'):6.1f} MB  USS {mean_mb('uss'):6.1f} MB | master + workers PSS {total_pss:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Gunicorn workers (WEB_WORKERS)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per import measurement")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait after the first response")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Give up on a gunicorn start after this long")
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, {args.runs} fresh interpreter(s) per import")
+    report_imports("main", args.runs)
+    report_imports("run_scheduler", args.runs)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("gunicorn is not installed; skipping the worker measurements")
+        return
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("/proc/<pid>/smaps_rollup is unavailable (Linux only); skipping the worker measurements")
+        return
+
+    print(f"gunicorn, {args.workers} workers")
+    for preload in (False, True):
+        report_gunicorn(args.workers, preload, args.settle, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: UploadJob snapshot vs. deepcopy of the ORM Content.
+
+Loads a content row the way run_schedule does (media and account
+selectin-loaded, still attached to its session) from a throwaway SQLite
+database, then times what execute_upload_logic does per day-counter run:
+
+  deepcopy - the former `deepcopy(content)` plus setting the caption
+  snapshot - UploadJob.from_content() plus dataclasses.replace(caption=...)
+
+Also reports the pickled size of the snapshot, which is what a process-pool
+platform executor would ship to its worker.
+
+    python benchmarks/bench_upload_job.py --media 10 --iterations 2000
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import timeit
+from copy import deepcopy
+from dataclasses import replace
+
+DB_DIR = tempfile.mkdtemp(prefix="bench_upload_job_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.orm import selectinload
+
+from database import Base, engine, SessionLocal
+from models import Account, Content, ContentMedia
+from upload_job import UploadJob
+
+
+def seed(media: int, with_account: bool) -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    account = None
+    if with_account:
+        account = Account(platform="instagram", username="bench", is_active=True)
+        account.set_credentials("bench-password")
+        db.add(account)
+    content = Content(
+        filename="album", file_path="/tmp/bench_0.jpg", caption="Benchmark caption " * 20,
+        post_type="album" if media > 1 else "photo", file_type="image/jpeg", account=account,
+        media=[ContentMedia(position=i, path=f"/tmp/bench_{i}.jpg", mime_type="image/jpeg") for i in range(media)],
+    )
+    db.add(content)
+    db.commit()
+    content_id = content.id
+    db.close()
+    return content_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--media", type=int, default=10, help="Files in the content (1: a photo)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--with-account", action="store_true",
+                        help="Post from a stored account, so the snapshot also decrypts its password")
+    args = parser.parse_args()
+
+    content_id = seed(args.media, args.with_account)
+    db = SessionLocal()
+    content = db.query(Content).options(
+        selectinload(Content.media), selectinload(Content.account),
+    ).filter(Content.id == content_id).one()
+
+    def with_deepcopy():
+        copy = deepcopy(content)
+        copy.caption = f"Day 7 {content.caption}"
+        return copy
+
+    def with_snapshot():
+        job = UploadJob.from_content(content, "instagram")
+        return replace(job, caption=f"Day 7 {job.caption}")
+
+    copied = timeit.timeit(with_deepcopy, number=args.iterations) / args.iterations
+    snapshot = timeit.timeit(with_snapshot, number=args.iterations) / args.iterations
+    job = with_snapshot()
+    db.close()
+
+    print(f"{args.media} media file(s), {'stored account' if args.with_account else '.env account'}, {args.iterations} runs")
+    print(f"  deepcopy(Content): {copied * 1e6:9.1f} us/run")
+    print(f"  UploadJob:         {snapshot * 1e6:9.1f} us/run")
+    print(f"  speedup:           {copied / snapshot:9.2f}x")
+    print(f"  pickled UploadJob: {len(pickle.dumps(job))} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: server peak RSS while POST /upload receives a large file.
+
+Starts the app under uvicorn in a subprocess (throwaway database and upload
+folder), streams a multi-hundred-MB file to it with httpx, and reports how
+much the server's peak RSS (VmHWM) grew during the request:
+
+  streaming - the real /upload endpoint (chunked stream_to_file)
+  legacy    - an equivalent endpoint doing `await file.read()` first
+
+Linux only (reads /proc/<pid>/status).
+
+    python benchmarks/bench_upload_memory.py --size-mb 300
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SERVER = r'''
+import os, sys
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+import uvicorn
+from typing import List
+from fastapi import UploadFile, File
+import auth, main
+
+main.app.dependency_overrides[auth.get_current_user] = lambda: {"username": "bench"}
+main.MAX_FILE_SIZE = 10 * 1024**3
+
+@main.app.post("/legacy-upload")
+async def legacy_upload(files: List[UploadFile] = File(...)):
+    for file in files:
+        data = await file.read()
+        with open(os.path.join(main.UPLOAD_FOLDER, "legacy_" + file.filename), "wb") as f:
+            f.write(data)
+    return {"ok": True}
+
+uvicorn.run(main.app, host="127.0.0.1", port=PORT, log_level="warning")
+'''
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not available")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure(mode: str, payload: str, workdir: str) -> float:
+    port = free_port()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, mode + '.db')}",
+               UPLOAD_FOLDER=os.path.join(workdir, "uploads_" + mode))
+    code = f"ROOT={ROOT!r}\nPORT={port}\n" + SERVER
+    server = subprocess.Popen([sys.executable, "-c", code], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(200):
+            try:
+                httpx.get(base_url + "/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        before = peak_rss_mb(server.pid)
+        url = base_url + ("/upload" if mode == "streaming" else "/legacy-upload")
+        with open(payload, "rb") as f:
+            response = httpx.post(url, files={"files": ("bench.mp4", f, "video/mp4")},
+                                  data={"post_type": "video"}, timeout=600)
+        response.raise_for_status()
+        return peak_rss_mb(server.pid) - before
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_upload_") as workdir:
+        payload = os.path.join(workdir, "payload.mp4")
+        chunk = b"\0" * (1024 * 1024)
+        with open(payload, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(chunk)
+
+        print(f"Uploading a {args.size_mb} MB file; server peak RSS growth during the request:")
+        for mode in ("legacy", "streaming"):
+            print(f"  {mode:10s} {measure(mode, payload, workdir):8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Load test: request latency with the sync vs. the async database path.
+
+Starts the app under uvicorn in a subprocess on a seeded throwaway SQLite
+database and fires concurrent requests at two variants of the same work:
+
+  sync  - `async def` handlers calling the blocking Session from get_db,
+          as every endpoint used to. Each query stalls the event loop.
+  async - the AsyncSession from get_async_db (aiosqlite / aiomysql).
+
+The mix is mostly cheap content pages with every `--heavy-every`th request a
+full-table stats aggregate, the kind of slow query that stalls a worker.
+Reports p50/p99 latency of the cheap requests, throughput and failed
+requests. Above the sync pool's 15 connections the sync path stalls outright:
+the blocking pool checkout runs on the event loop, while the sessions that
+would free a connection are closed in the threadpool, until the 30 s pool
+timeout; use `--modes async` to load-test the async path alone at that level.
+
+    python benchmarks/load_test_db.py --rows 200000 --requests 2000 --concurrency 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SERVER = r'''
+import os, sys
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+import uvicorn
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+import auth, main
+from database import get_db, get_async_db
+from content_listing import list_contents
+from dashboard_stats import dashboard_stats
+
+main.app.dependency_overrides[auth.get_current_user] = lambda: {"username": "bench"}
+
+@main.app.get("/bench/sync/contents")
+async def sync_contents(db: Session = Depends(get_db)):
+    return {"contents": list_contents(db, ("id", "filename"), 20)[0]}
+
+@main.app.get("/bench/sync/stats")
+async def sync_stats(db: Session = Depends(get_db)):
+    return dashboard_stats(db)
+
+@main.app.get("/bench/async/contents")
+async def async_contents(db: AsyncSession = Depends(get_async_db)):
+    return {"contents": (await db.run_sync(list_contents, ("id", "filename"), 20))[0]}
+
+@main.app.get("/bench/async/stats")
+async def async_stats(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(dashboard_stats)
+
+uvicorn.run(main.app, host="127.0.0.1", port=PORT, log_level="warning")
+'''
+
+
+def seed(database_url: str, rows: int):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    code = f"""
+import sys, random
+sys.path.insert(0, {ROOT!r})
+from datetime import datetime, timedelta
+from database import Base, engine
+from models import Content
+Base.metadata.create_all(bind=engine)
+start = datetime(2025, 1, 1)
+with engine.begin() as conn:
+    for offset in range(0, {rows}, 10000):
+        conn.execute(Content.__table__.insert(), [{{
+            "filename": f"{{offset + i}}.jpg", "file_path": f"/tmp/{{offset + i}}.jpg", "platform": "instagram",
+            "status": random.choice(("uploaded", "published")), "created_at": start + timedelta(seconds=offset + i),
+        }} for i in range(min(10000, {rows} - offset))])
+"""
+    subprocess.run([sys.executable, "-c", code], env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def fire(base_url: str, mode: str, requests: int, concurrency: int, heavy_every: int):
+    limit = asyncio.Semaphore(concurrency)
+    light, errors = [], []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i: int):
+            heavy = heavy_every and i % heavy_every == 0
+            path = f"/bench/{mode}/{'stats' if heavy else 'contents'}"
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    errors.append(e)
+                    return
+                elapsed = time.perf_counter() - started
+            if not heavy:
+                light.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return light, len(errors), time.perf_counter() - started
+
+
+def measure(mode: str, database_url: str, args) -> str:
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, UPLOAD_FOLDER=tempfile.mkdtemp(prefix="load_uploads_"))
+    code = f"ROOT={ROOT!r}\nPORT={port}\n" + SERVER
+    server = subprocess.Popen([sys.executable, "-c", code], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(200):
+            try:
+                httpx.get(base_url + "/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        asyncio.run(fire(base_url, mode, 50, 5, 0))  # warm up connections and caches
+        light, errors, total = asyncio.run(fire(base_url, mode, args.requests, args.concurrency, args.heavy_every))
+        if not light:
+            return f"  {mode:5s}  all {errors} requests failed"
+        return (f"  {mode:5s}  p50 {statistics.median(light) * 1000:8.1f} ms   "
+                f"p99 {percentile(light, 99) * 1000:8.1f} ms   {args.requests / total:7.1f} req/s   {errors} failed")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--heavy-every", type=int, default=10, help="Every Nth request is a full-table aggregate (0: none)")
+    parser.add_argument("--modes", nargs="+", choices=("sync", "async"), default=["sync", "async"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="load_test_db_") as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        print(f"Seeding {args.rows} contents...")
+        seed(database_url, args.rows)
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, "
+              f"every {args.heavy_every}th a stats aggregate; latency of the cheap requests:")
+        for mode in args.modes:
+            print(measure(mode, database_url, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import logging
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import MediaBlob
+from storage import remove_quietly
+from media_prep import artifact_paths
+
+logger = logging.getLogger(__name__)
+
+
+def blob_path(upload_folder: str, sha256: str, extension: str = "") -> str:
+    """UPLOAD_FOLDER/blobs/ab/abcdef....jpg: fanned out so no directory grows huge."""
+    return os.path.join(upload_folder, "blobs", sha256[:2], f"{sha256}{extension.lower()}")
+
+
+def store_blob(db: Session, upload_folder: str, tmp_path: str, sha256: str, size: int, extension: str = "") -> str:
+    """
+    Moves a freshly written file into the content-addressed store and returns
+    its final path. If identical bytes are already stored, the temporary file
+    is dropped and the existing blob gains a reference instead.
+    """
+    for _ in range(3):
+        blob = db.query(MediaBlob).filter(MediaBlob.sha256 == sha256).first()
+        if blob:
+            referenced = db.query(MediaBlob).filter(MediaBlob.sha256 == sha256).update(
+                {MediaBlob.ref_count: MediaBlob.ref_count + 1}, synchronize_session=False)
+            db.commit()
+            if referenced == 1:
+                remove_quietly(tmp_path)
+                logger.info(f"Deduplicated upload against blob {sha256[:12]}; saved {size} bytes.")
+                return blob.path
+            # release_blobs deleted the blob since the lookup; store these bytes afresh on the next pass
+            continue
+
+        final_path = blob_path(upload_folder, sha256, extension)
+        db.add(MediaBlob(sha256=sha256, path=final_path, size=size, ref_count=1))
+        try:
+            # The row goes in before the file: it waits for a release_blobs that is still
+            # removing an old copy at this path, so that removal cannot hit the new file.
+            db.flush()
+        except IntegrityError:
+            # A concurrent upload of the same bytes registered the blob first; reference theirs on the next pass.
+            db.rollback()
+            continue
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        db.commit()
+        return final_path
+    raise RuntimeError(f"Could not register blob {sha256}")
+
+
+def _remove_with_artifacts(path: str):
+    remove_quietly(path)
+    for artifact in artifact_paths(path):
+        remove_quietly(artifact)
+
+
+def release_blob(db: Session, path: str):
+    """Drops one reference to the blob stored at `path`. See release_blobs."""
+    release_blobs(db, [path])
+
+
+def release_blobs(db: Session, paths: Iterable[str]):
+    """
+    Drops one reference per entry in `paths` (a path listed twice drops two),
+    deleting files and their prepared artifacts once nothing references them.
+    Works in a fixed number of queries however many files are released. Files
+    stored before the blob store existed are deleted directly.
+    """
+    counts = Counter(path for path in paths if path)
+    if not counts:
+        return
+
+    known = {path for (path,) in db.query(MediaBlob.path).filter(MediaBlob.path.in_(list(counts)))}
+    by_count = defaultdict(list)
+    for path in known:
+        by_count[counts[path]].append(path)
+    for count, group in by_count.items():
+        db.query(MediaBlob).filter(MediaBlob.path.in_(group)).update(
+            {MediaBlob.ref_count: MediaBlob.ref_count - count}, synchronize_session=False)
+
+    # The UPDATE above holds the row locks, so nothing can re-reference these before the commit.
+    orphaned = [path for (path,) in db.query(MediaBlob.path).filter(
+        MediaBlob.path.in_(list(known)), MediaBlob.ref_count <= 0)] if known else []
+    if orphaned:
+        db.query(MediaBlob).filter(MediaBlob.path.in_(orphaned)).delete(synchronize_session=False)
+        # Removed while the deleted rows are still locked: a store_blob of the same bytes
+        # inserts its row first and so only writes its file once this commits.
+        for path in orphaned:
+            _remove_with_artifacts(path)
+            logger.info(f"Blob at {path} has no references left; removed it.")
+    db.commit()
+
+    for path in counts.keys() - known:
+        _remove_with_artifacts(path)
+
+
+def bytes_saved(db: Session) -> int:
+    """Bytes not written to disk thanks to deduplication."""
+    saved = db.query(func.sum((MediaBlob.ref_count - 1) * MediaBlob.size)).filter(MediaBlob.ref_count > 1).scalar()
+    return int(saved or 0)
@@ -0,0 +1,94 @@
+import base64
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from models import Content
+
+# Columns a client may ask for with `fields=`; the default is all of them.
+CONTENT_FIELDS = tuple(column.name for column in Content.__table__.columns)
+CONTENT_PAGE_SIZE = 100
+CONTENT_MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: datetime, content_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{content_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for anything that is not a cursor returned by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, content_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(content_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def parse_fields(fields: Optional[str]) -> Sequence[str]:
+    """Raises ValueError for unknown field names."""
+    if not fields:
+        return CONTENT_FIELDS
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in CONTENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(CONTENT_FIELDS)}")
+    return requested
+
+
+def list_contents(
+    db: Session,
+    fields: Sequence[str] = CONTENT_FIELDS,
+    limit: int = CONTENT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    post_type: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str], str]:
+    """
+    One page of contents, newest first, as (rows, next_cursor, etag).
+
+    Pages are keyed on (created_at, id) so every page costs the same however
+    deep it is, and only the requested columns are loaded. The ETag covers the
+    ids and updated_at of the page, so it changes when a row on it is edited,
+    added or deleted.
+    """
+    limit = max(1, min(limit, CONTENT_MAX_PAGE_SIZE))
+    # The keyset and the ETag need these even when the client did not ask for them.
+    loaded = list(dict.fromkeys([*fields, "id", "created_at", "updated_at"]))
+    query = db.query(*(getattr(Content, name) for name in loaded))
+
+    if status:
+        query = query.filter(Content.status == status)
+    if post_type:
+        query = query.filter(Content.post_type == post_type)
+    if cursor:
+        created_at, content_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Content.created_at < created_at,
+            and_(Content.created_at == created_at, Content.id < content_id),
+        ))
+
+    rows = query.order_by(Content.created_at.desc(), Content.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more and rows[-1].created_at else None
+
+    # The cursor too: rows added past the end of the page change it without touching the page itself
+    digest = hashlib.sha1(repr((list(fields), limit, cursor, status, post_type, has_more, next_cursor)).encode())
+    for row in rows:
+        digest.update(f"{row.id}:{row.updated_at.isoformat() if row.updated_at else ''};".encode())
+    etag = f'"{digest.hexdigest()}"'
+
+    return [{name: getattr(row, name) for name in fields} for row in rows], next_cursor, etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,113 @@
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import Content, Schedule
+
+# How long a rendered dashboard's data may be reused. Writes made through the
+# web app invalidate it at once; the TTL bounds staleness for changes made by
+# the scheduler process or by another web worker.
+DASHBOARD_CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "5"))
+DASHBOARD_RECENT_CONTENTS = 10
+
+
+class TTLCache:
+    """A small in-process cache whose entries expire `ttl` seconds after they are stored."""
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any):
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self._ttl, value)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+dashboard_cache = TTLCache(DASHBOARD_CACHE_SECONDS)
+
+
+def dashboard_stats(db: Session) -> Dict[str, int]:
+    """All dashboard counters in a single aggregate query."""
+    pending_schedules = (
+        select(func.count(Schedule.id)).where(Schedule.status == "pending").scalar_subquery()
+    )
+    total, published, pending = db.execute(
+        select(
+            func.count(Content.id),
+            func.coalesce(func.sum(case((Content.status == "published", 1), else_=0)), 0),
+            pending_schedules,
+        ).select_from(Content)
+    ).one()
+    return {"total_contents": total, "pending_schedules": pending, "published_contents": int(published)}
+
+
+def load_dashboard(db: Session) -> Dict[str, Any]:
+    """
+    The latest contents, their recurring schedules and the counters. The
+    returned ORM objects only have their columns read by the template, so they
+    stay usable after the session closes.
+    """
+    contents = (
+        db.query(Content).order_by(Content.created_at.desc())
+        .limit(DASHBOARD_RECENT_CONTENTS).all()
+    )
+    content_ids = [content.id for content in contents]
+    recurring = db.query(Schedule).filter(
+        Schedule.status == "recurring", Schedule.content_id.in_(content_ids)
+    ).all() if content_ids else []
+    return {
+        "contents": contents,
+        "recurring_map": {schedule.content_id: schedule for schedule in recurring},
+        "stats": dashboard_stats(db),
+    }
+
+
+def get_dashboard(db: Session) -> Dict[str, Any]:
+    return dashboard_cache.get_or_load("dashboard", lambda: load_dashboard(db))
+
+
+async def get_dashboard_async(db: AsyncSession) -> Dict[str, Any]:
+    """get_dashboard for an AsyncSession; the queries run without blocking the event loop."""
+    data = dashboard_cache.get("dashboard")
+    if data is None:
+        data = await db.run_sync(load_dashboard)
+        dashboard_cache.set("dashboard", data)
+    return data
+
+
+def invalidate_dashboard():
+    dashboard_cache.invalidate()
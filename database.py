@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import create_engine, inspect, make_url, Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -8,6 +9,8 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from db_pool import TimedAsyncQueuePool, TimedQueuePool, apply_sqlite_pragmas, pool_options, pool_stats
+
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -24,24 +27,77 @@ if not DATABASE_URL:
         # Development fallback
         DATABASE_URL = "sqlite:///./daily_content.db"
 
-# Engine configuration
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+# Engine configuration. Pool sizing comes from DB_POOL_* (see db_pool.py).
 if "mysql" in DATABASE_URL:
     engine = create_engine(
         DATABASE_URL,
+        poolclass=TimedQueuePool,
         pool_pre_ping=True,
-        pool_recycle=300,
+        echo=os.getenv("DEBUG", "false").lower() == "true",
+        **pool_options()
+    )
+elif _is_memory_sqlite(DATABASE_URL):
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
         echo=os.getenv("DEBUG", "false").lower() == "true"
     )
 else:
     engine = create_engine(
         DATABASE_URL, 
         connect_args={"check_same_thread": False},
-        echo=os.getenv("DEBUG", "false").lower() == "true"
+        poolclass=TimedQueuePool,
+        echo=os.getenv("DEBUG", "false").lower() == "true",
+        **pool_options()
     )
+    apply_sqlite_pragmas(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async driver for the same database, used by the web app's hot endpoints so a
+# slow query does not block the event loop: sqlite -> aiosqlite, mysql -> aiomysql.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "mysql": "mysql+aiomysql"}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+
+if "mysql" in ASYNC_DATABASE_URL:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=TimedAsyncQueuePool,
+        pool_pre_ping=True,
+        echo=os.getenv("DEBUG", "false").lower() == "true",
+        **pool_options()
+    )
+elif _is_memory_sqlite(ASYNC_DATABASE_URL):
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=os.getenv("DEBUG", "false").lower() == "true"
+    )
+else:
+    # Keep aiosqlite connections open between requests instead of reconnecting each time.
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=TimedAsyncQueuePool,
+        echo=os.getenv("DEBUG", "false").lower() == "true",
+        **pool_options()
+    )
+    apply_sqlite_pragmas(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes cannot be lazily reloaded after an async commit.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -49,11 +105,38 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def database_pool_stats() -> dict:
+    """Connection pool occupancy and checkout waits of this process's engines."""
+    return {
+        "pid": os.getpid(),
+        "sync": pool_stats(engine.pool),
+        "async": pool_stats(async_engine.pool),
+    }
+
+def _alembic_config():
+    from alembic.config import Config
+    return Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+
 def init_database():
-    """Initialize database tables"""
+    """
+    Brings the schema up to date. An empty database gets every table and is
+    stamped at the newest migration; an existing one is migrated with
+    `alembic upgrade head`, since the migrations own every table added later.
+    """
+    from alembic import command
+    import models  # noqa: F401  (registers the tables on Base.metadata, whoever the caller is)
     try:
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully")
+        if inspect(engine).has_table("schedules"):
+            command.upgrade(_alembic_config(), "head")
+            print("Database schema migrated to the latest revision")
+        else:
+            Base.metadata.create_all(bind=engine)
+            command.stamp(_alembic_config(), "head")
+            print("Database tables created successfully")
     except Exception as e:
         print(f"Error creating database tables: {e}")
         raise
@@ -0,0 +1,124 @@
+import os
+import time
+import threading
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# Per-engine pool limits. Every gunicorn worker has its own sync and async
+# engine, so a deployment can open up to
+#   workers * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# connections; keep that below the server's max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+# Applied to every new SQLite connection. WAL lets readers run while one
+# process writes; busy_timeout makes a writer wait for the lock instead of
+# failing at once with "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+
+def pool_options() -> Dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+class _CheckoutTiming:
+    """Records how long checkouts wait for a free connection, and how many give up."""
+
+    def _init_timing(self):
+        self._timing_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _record_wait(self, started: float, timed_out: bool = False):
+        waited = time.perf_counter() - started
+        with self._timing_lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def _timed_get(self, get):
+        started = time.perf_counter()
+        try:
+            connection = get()
+        except PoolTimeoutError:
+            self._record_wait(started, timed_out=True)
+            raise
+        self._record_wait(started)
+        return connection
+
+    def wait_stats(self) -> Dict[str, float]:
+        with self._timing_lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_mean": round(self.wait_seconds_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+class TimedQueuePool(_CheckoutTiming, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_timing()
+
+    def _do_get(self):
+        return self._timed_get(super()._do_get)
+
+
+class TimedAsyncQueuePool(_CheckoutTiming, AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_timing()
+
+    def _do_get(self):
+        return self._timed_get(super()._do_get)
+
+
+def apply_sqlite_pragmas(engine: Engine):
+    """Sets the journal mode, busy timeout and sync level on every new SQLite connection."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        finally:
+            cursor.close()
+
+
+def pool_stats(pool: Pool) -> Dict:
+    """Occupancy of a pool, plus checkout wait times when it is a timed pool."""
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, _CheckoutTiming):
+        stats.update(pool.wait_stats())
+    return stats
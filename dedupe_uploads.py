@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+One-off migration of UPLOAD_FOLDER into the content-addressed blob store.
+
+Hashes every file referenced by a Content row, moves unique bytes to
+UPLOAD_FOLDER/blobs/, drops duplicate copies, rewrites ContentMedia.path (and
+Content.file_path) and records reference counts. Safe to run more than once.
+
+    python dedupe_uploads.py            # migrate and report bytes saved
+    python dedupe_uploads.py --dry-run  # only report what would be saved
+"""
+import os
+import sys
+import hashlib
+import argparse
+from pathlib import Path
+
+project_dir = Path(__file__).parent
+sys.path.insert(0, str(project_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from database import SessionLocal
+from sqlalchemy.orm import selectinload
+
+from models import Content
+from blob_store import bytes_saved, store_blob
+
+
+def sha256_of(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report only; change nothing")
+    args = parser.parse_args()
+
+    upload_folder = os.getenv("UPLOAD_FOLDER", "./uploads")
+    blobs_root = os.path.abspath(os.path.join(upload_folder, "blobs"))
+
+    db = SessionLocal()
+    try:
+        seen = {}  # original path -> (sha256, size)
+        sizes_by_hash = {}
+        total_bytes = 0
+        contents = db.query(Content).options(selectinload(Content.media)).all()
+
+        for content in contents:
+            for item in content.media:
+                path = item.path
+                if not path or os.path.abspath(path).startswith(blobs_root + os.sep):
+                    continue
+                if path not in seen:
+                    if not os.path.isfile(path):
+                        print(f"⚠️  Content {content.id}: file {path} is missing; left unchanged.")
+                        continue
+                    seen[path] = (sha256_of(path), os.path.getsize(path))
+                    total_bytes += seen[path][1]
+                sha256, size = seen[path]
+                sizes_by_hash[sha256] = size
+
+                if not args.dry_run:
+                    # Moves the first copy into the store; later copies only add a reference.
+                    item.path = store_blob(db, upload_folder, path, sha256, size, os.path.splitext(path)[1])
+                    item.sha256, item.size = sha256, size
+
+            if not args.dry_run and content.media:
+                content.file_path = content.media[0].path
+                db.commit()
+
+        unique_bytes = sum(sizes_by_hash.values())
+        print(f"Contents scanned:     {len(contents)}")
+        print(f"Files migrated:       {len(seen)}")
+        print(f"Unique blobs:         {len(sizes_by_hash)}")
+        print(f"Disk bytes freed:     {total_bytes - unique_bytes}" + (" (dry run)" if args.dry_run else ""))
+        if not args.dry_run:
+            print(f"Bytes saved overall:  {bytes_saved(db)} (vs. one copy per content reference)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,13 +13,22 @@ load_dotenv()
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 backlog = 2048
 
-# Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
+# Worker processes. Each worker has its own database pools, so the worker
+# count multiplies the number of database connections (see when_ready).
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Import the app once in the master and fork the workers from it: they start
+# warm and share its memory copy-on-write. Turn off to import per worker.
+preload_app = os.getenv("WEB_PRELOAD_APP", "true").lower() == "true"
+
+# Create or migrate the schema once in the master before any worker starts. Turn off
+# when a separate deploy step does it (python init_database.py --schema-only).
+DB_INIT_ON_START = os.getenv("DB_INIT_ON_START", "true").lower() == "true"
+
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
 max_requests_jitter = 50
@@ -43,3 +52,39 @@ tmp_upload_dir = None
 # SSL (if needed)
 # keyfile = None
 # certfile = None
+
+
+def on_starting(server):
+    """Creates or migrates the schema once per deployment instead of on every worker import."""
+    if DB_INIT_ON_START:
+        from database import engine, init_database
+        init_database()
+        # Close the master's connections so no worker inherits them
+        engine.dispose()
+
+
+def post_fork(server, worker):
+    """
+    Gives each worker fresh database pools. A preloaded app's engines come
+    from the master; close=False leaves any connection the master holds to it.
+    """
+    from database import async_engine, engine
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+def when_ready(server):
+    """Logs the worst-case number of database connections this deployment can open."""
+    from db_pool import DB_MAX_OVERFLOW, DB_POOL_SIZE
+    per_worker = 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)  # a sync and an async engine per worker
+    server.log.info(
+        f"Database connection budget: {workers} workers x {per_worker} = {workers * per_worker} "
+        f"(DB_POOL_SIZE={DB_POOL_SIZE}, DB_MAX_OVERFLOW={DB_MAX_OVERFLOW}); keep it below MySQL max_connections."
+    )
+
+
+def child_exit(server, worker):
+    """Drops a finished worker's live gauges from the shared Prometheus metrics directory."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
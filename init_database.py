@@ -2,6 +2,9 @@
 """
 Database initialization script for production deployment
 Run this script after setting up your MySQL database
+
+    python init_database.py                # tables, folders and accounts (interactive)
+    python init_database.py --schema-only  # just create or migrate the schema, e.g. as a deploy step
 """
 import os
 import sys
@@ -62,7 +65,8 @@ def create_admin_account():
                     username=username,
                     is_active=True
                 )
-                account.set_password(password)
+                # Encrypted rather than hashed: the uploader needs it to log in
+                account.set_credentials(password)
                 
                 db.add(account)
                 db.commit()
@@ -93,6 +97,10 @@ def main():
         return
     
     print(f"Database URL: {db_url}")
+
+    if "--schema-only" in sys.argv:
+        init_database()
+        return 0
     
     try:
         # Initialize database tables
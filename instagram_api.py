@@ -1,131 +1,296 @@
 import os
+import time
 import logging
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Optional
 from dotenv import load_dotenv
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired
+
+from session_pool import SessionPool
+from metrics import observe_login
+from media_prep import existing_thumbnail
+from retry_policy import UploadError
+from rate_limiter import AccountRateLimiter, account_key
+from database import SessionLocal
+from models import Account
+
+if TYPE_CHECKING:
+    # instagrapi itself is loaded by the session pool on first login
+    from instagrapi import Client
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 load_dotenv()
 
+# The account used for content that does not target an Account row
 INSTAGRAM_USERNAME = os.getenv("INSTAGRAM_USERNAME")
 INSTAGRAM_PASSWORD = os.getenv("INSTAGRAM_PASSWORD")
 SESSION_FILE = Path("session.json")
 
-# --- Helper Function ---
+# Session files (instagrapi settings) of the accounts stored in the database, one per account
+SESSIONS_FOLDER = Path(os.getenv("SESSIONS_FOLDER", "./sessions"))
 
-def _get_instagrapi_client() -> Client:
-    """
-    Handles client instantiation, session loading, and login.
-    This function will attempt a full login if the session is invalid.
-    """
-    if not all([INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD]):
-        logging.error("Missing Instagram credentials in .env file.")
-        return None
+# Every HTTP request an instagrapi client makes (login checks, ruploads, configures,
+# one rupload per album item...) first takes a token from the account's calls/minute bucket.
+call_limiter = AccountRateLimiter(SessionLocal)
+# Rate key of the account the current thread is calling Instagram for (see _run_with_client)
+_metering = threading.local()
+
+
+def _metered(request):
+    def _request(*args, **kwargs):
+        rate_key = getattr(_metering, "rate_key", None)
+        if rate_key:
+            call_limiter.wait_for_call(rate_key)
+        return request(*args, **kwargs)
+    return _request
 
+
+def _metered_client() -> "Client":
+    """An instagrapi client whose HTTP sessions are charged to the account being served."""
+    from instagrapi import Client
     cl = Client()
+    for name in ("private", "public", "graphql"):
+        session = getattr(cl, name, None)
+        if session is not None:
+            session.request = _metered(session.request)
+    return cl
+
+
+# One warm client per account, shared by every upload in this process. Calls
+# for one account are serialized by the pool; different accounts run in parallel.
+session_pool = SessionPool(client_factory=_metered_client, login_observer=observe_login)
+
+# Post types whose media can be uploaded ahead of time and configured later
+STAGEABLE_POST_TYPES = ("photo", "video", "reel")
+# Instagram refuses to configure a video until it has transcoded it; how often to ask again
+CONFIGURE_ATTEMPTS = int(os.getenv("INSTAGRAM_CONFIGURE_ATTEMPTS", "20"))
+CONFIGURE_RETRY_SECONDS = float(os.getenv("INSTAGRAM_CONFIGURE_RETRY_SECONDS", "5"))
+
 
-    if SESSION_FILE.exists():
-        logging.info(f"Loading session from {SESSION_FILE}...")
-        cl.load_settings(SESSION_FILE)
+@dataclass(frozen=True)
+class InstagramCredentials:
+    username: str
+    password: str
+    session_file: Path
+    rate_key: str  # Key of the account's rate-limit buckets
 
+
+def credentials_for(account: Optional[Account] = None) -> InstagramCredentials:
+    """Login details for a stored account, or for the .env account when none is given."""
+    if account is None:
+        if not all([INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD]):
+            raise UploadError("Missing Instagram credentials in .env file.", "auth", retryable=False)
+        return InstagramCredentials(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD, SESSION_FILE, account_key("instagram"))
+
+    if not account.is_active:
+        raise UploadError(f"Account '{account.username}' is disabled.", "auth", retryable=False)
     try:
-        # This login call will use the session if it's loaded and valid,
-        # otherwise it will perform a full login with username/password.
-        cl.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
-        cl.get_timeline_feed() # Verify session is truly working
-        logging.info("Session is valid and login successful.")
-        return cl
-    except LoginRequired:
-        logging.error("Session is invalid. A new login attempt will be made, which may require a challenge code if run on a new server.")
-        # The login call above will handle the re-login attempt.
-        # If it fails again, it will raise an exception.
-        return None # Should not be reached if login raises
-    except Exception as e:
-        logging.error(f"An unexpected error occurred during client login: {e}", exc_info=True)
-        return None
+        password = account.get_credentials()
+    except ValueError as e:
+        raise UploadError(str(e), "auth", retryable=False) from e
+    SESSIONS_FOLDER.mkdir(parents=True, exist_ok=True)
+    # Named by id: the username is user input and need not be a safe file name
+    return InstagramCredentials(
+        account.username, password, SESSIONS_FOLDER / f"{account.id}.json",
+        account_key(account.platform, account.id),
+    )
+
+# --- Helper Functions ---
+
+def _run_with_client(
+    action, account: Optional[InstagramCredentials] = None, detached: bool = False, idempotent: bool = False,
+):
+    """
+    Runs `action(client)` with the pooled client of an account (default: the
+    .env account). An expired session triggers a re-login; only an
+    `idempotent` action (one that publishes nothing) is retried, otherwise
+    the error is raised to the caller like any other. With `detached`, the
+    action gets a copy of the client and does not hold the account lock (see
+    SessionPool.run_detached).
+    """
+    account = account or credentials_for()
+    run = session_pool.run_detached if detached else session_pool.run
+    # The pool runs the login, a re-login and the action on this thread, so all their requests are metered
+    previous, _metering.rate_key = getattr(_metering, "rate_key", None), account.rate_key
+    try:
+        return run(account.username, account.password, account.session_file, action, idempotent=idempotent)
+    finally:
+        _metering.rate_key = previous
+
+def get_session_stats() -> dict:
+    """Hit/miss/re-login counters of the client pool."""
+    return session_pool.stats()
 
 # --- Upload Functions ---
+# Each returns True on success and raises UploadError, classified for the retry policy, on failure.
+# `account` selects the Instagram account; the .env account is used when it is omitted.
 
-def upload_photo(path: str, caption: str) -> bool:
+def upload_photo(path: str, caption: str, account: Optional[InstagramCredentials] = None) -> bool:
     logging.info(f"Attempting to upload photo from {path}...")
-    cl = _get_instagrapi_client()
-    if not cl:
-        return False
     try:
-        media = cl.photo_upload(path=path, caption="")
-        if caption:
-            logging.info(f"Editing media {media.pk} to set caption.")
-            cl.media_edit(media.pk, caption)
+        # The caption goes with the upload: a separate edit that failed after the
+        # post went out would be retried, and every retry would publish it again.
+        media = _run_with_client(lambda cl: cl.photo_upload(path=path, caption=caption), account)
         logging.info(f"Successfully uploaded photo {media.pk}.")
         return True
     except Exception as e:
         logging.error(f"Failed to upload photo: {e}", exc_info=True)
-        return False
+        raise UploadError.from_exception(e) from e
 
-def upload_video(path: str, caption: str) -> bool:
+def upload_video(path: str, caption: str, account: Optional[InstagramCredentials] = None) -> bool:
     logging.info(f"Attempting to upload video from {path}...")
-    cl = _get_instagrapi_client()
-    if not cl:
-        return False
     try:
-        media = cl.video_upload(path=path, caption="")
-        if caption:
-            logging.info(f"Editing media {media.pk} to set caption.")
-            cl.media_edit(media.pk, caption)
+        # A thumbnail extracted ahead of time saves instagrapi from decoding the video now.
+        thumbnail = existing_thumbnail(path)
+        media = _run_with_client(lambda cl: cl.video_upload(path=path, caption=caption, thumbnail=thumbnail), account)
         logging.info(f"Successfully uploaded video {media.pk}.")
         return True
     except Exception as e:
         logging.error(f"Failed to upload video: {e}", exc_info=True)
-        return False
+        raise UploadError.from_exception(e) from e
 
-def upload_reel(path: str, caption: str) -> bool:
+def upload_reel(path: str, caption: str, account: Optional[InstagramCredentials] = None) -> bool:
     logging.info(f"Attempting to upload Reel from {path}...")
-    cl = _get_instagrapi_client()
-    if not cl:
-        return False
     try:
-        media = cl.clip_upload(path=path, caption=caption)
+        thumbnail = existing_thumbnail(path)
+        media = _run_with_client(lambda cl: cl.clip_upload(path=path, caption=caption, thumbnail=thumbnail), account)
         logging.info(f"Successfully uploaded Reel {media.pk}.")
         return True
     except Exception as e:
         logging.error(f"Failed to upload Reel: {e}", exc_info=True)
-        return False
+        raise UploadError.from_exception(e) from e
 
-def upload_album(paths: List[str], caption: str) -> bool:
+def upload_album(paths: List[str], caption: str, account: Optional[InstagramCredentials] = None) -> bool:
     logging.info(f"Attempting to upload album with {len(paths)} media...")
-    cl = _get_instagrapi_client()
-    if not cl:
-        return False
     validated_paths = [p for p in paths if Path(p).is_file()]
     if len(validated_paths) != len(paths):
         logging.error("One or more files not found in album paths. Aborting upload.")
-        return False
+        raise UploadError("One or more album files not found", "invalid_media", retryable=False)
     try:
-        media = cl.album_upload(paths=validated_paths, caption=caption)
+        media = _run_with_client(lambda cl: cl.album_upload(paths=validated_paths, caption=caption), account)
         logging.info(f"Successfully uploaded album {media.pk}.")
         return True
     except Exception as e:
         logging.error(f"Failed to upload album: {e}", exc_info=True)
-        return False
+        raise UploadError.from_exception(e) from e
 
-def upload_story(path: str, file_type: str) -> bool:
+def upload_story(path: str, file_type: str, account: Optional[InstagramCredentials] = None) -> bool:
     logging.info(f"Attempting to upload story from {path}...")
-    cl = _get_instagrapi_client()
-    if not cl:
-        return False
+    if "image" in file_type:
+        upload = lambda cl: cl.photo_upload_to_story(path=path)
+    elif "video" in file_type:
+        upload = lambda cl: cl.video_upload_to_story(path=path)
+    else:
+        logging.error(f"Unsupported file type for story: {file_type}")
+        raise UploadError(f"Unsupported file type for story: {file_type}", "invalid_media", retryable=False)
     try:
-        if "image" in file_type:
-            media = cl.photo_upload_to_story(path=path)
-        elif "video" in file_type:
-            media = cl.video_upload_to_story(path=path)
-        else:
-            logging.error(f"Unsupported file type for story: {file_type}")
-            return False
+        media = _run_with_client(upload, account)
         logging.info(f"Successfully uploaded story {media.pk}.")
         return True
     except Exception as e:
         logging.error(f"Failed to upload story: {e}", exc_info=True)
-        return False
+        raise UploadError.from_exception(e) from e
+
+# --- Two-phase publishing ---
+# stage_media transfers the media bytes (rupload) ahead of the due time and
+# publish_staged later sends only the configure request with the caption.
+
+class _ClipStaged(Exception):
+    """Raised in place of clip_upload's configure step, so the reel stays unpublished."""
+
+
+def _stage_clip(cl: "Client", path: str) -> Dict:
+    """
+    Uploads a reel with instagrapi's own clip_upload, which sends the
+    clips-specific upload settings and rupload parameters, and stops it at
+    the configure step; publish_staged sends that with the caption later.
+    `cl` must be a client of its own (a detached one): its clip_configure is replaced.
+    """
+    staged = {}
+
+    def _hold(upload_id, thumbnail, width, height, duration, *args, **kwargs):
+        staged.update(upload_id=upload_id, width=width, height=height, duration=duration, thumbnail=str(thumbnail))
+        raise _ClipStaged()
+
+    cl.clip_configure = _hold
+    try:
+        cl.clip_upload(Path(path), caption="", thumbnail=existing_thumbnail(path), configure_timeout=0)
+    except _ClipStaged:
+        return staged
+    raise RuntimeError("clip_upload returned without reaching its configure step")
+
+def stage_media(path: str, post_type: str, account: Optional[InstagramCredentials] = None) -> Dict:
+    """
+    Uploads the media of a photo, video or reel without publishing it.
+    Returns what publish_staged needs to configure it, JSON-serializable.
+    The transfer runs on a detached client, so publishes that come due on the
+    same account meanwhile are not held up behind it.
+    """
+    logging.info(f"Pre-staging {post_type} from {path}...")
+    if post_type not in STAGEABLE_POST_TYPES:
+        raise UploadError(f"Post type '{post_type}' cannot be pre-staged", "invalid_media", retryable=False)
+    account = account or credentials_for()
+
+    def _stage(cl: "Client") -> Dict:
+        if post_type == "photo":
+            upload_id, width, height = cl.photo_rupload(Path(path))
+            return {"upload_id": upload_id, "width": width, "height": height}
+        if post_type == "reel":
+            return _stage_clip(cl, path)
+        upload_id, width, height, duration, thumbnail = cl.video_rupload(Path(path), existing_thumbnail(path))
+        return {
+            "upload_id": upload_id, "width": width, "height": height,
+            "duration": duration, "thumbnail": str(thumbnail),
+        }
+
+    try:
+        # Staging only transfers bytes, so it may run again after a re-login
+        staged = _run_with_client(_stage, account, detached=True, idempotent=True)
+    except Exception as e:
+        logging.error(f"Failed to pre-stage {post_type}: {e}", exc_info=True)
+        raise UploadError.from_exception(e) from e
+    staged.update(post_type=post_type, path=path, username=account.username)
+    logging.info(f"Pre-staged {post_type} as upload {staged['upload_id']}.")
+    return staged
+
+def publish_staged(staged: Dict, caption: str, account: Optional[InstagramCredentials] = None) -> bool:
+    """Publishes media uploaded by stage_media with its final caption; only the configure step is left."""
+    post_type = staged["post_type"]
+    upload_id = staged["upload_id"]
+    logging.info(f"Configuring pre-staged {post_type} upload {upload_id}...")
+
+    def _configure_once(cl: "Client") -> Optional[Dict]:
+        from instagrapi.exceptions import ClientError
+        try:
+            if post_type == "photo":
+                return cl.photo_configure(upload_id, staged["width"], staged["height"], caption)
+            thumbnail = Path(staged["thumbnail"])
+            if post_type == "video":
+                return cl.video_configure(
+                    upload_id, staged["width"], staged["height"], staged["duration"], thumbnail, caption,
+                )
+            return cl.clip_configure(
+                upload_id, thumbnail, staged["width"], staged["height"], staged["duration"], caption,
+            )
+        except ClientError as e:
+            if "Transcode not finished yet" not in str(e):
+                raise
+            return None
+
+    try:
+        for attempt in range(CONFIGURE_ATTEMPTS):
+            if attempt:
+                # Waits outside the account lock, so other publishes for the account go ahead meanwhile
+                time.sleep(CONFIGURE_RETRY_SECONDS)
+            configured = _run_with_client(_configure_once, account)
+            if configured:
+                break
+        else:
+            raise TimeoutError(f"Instagram did not accept upload {upload_id} after {CONFIGURE_ATTEMPTS} attempts")
+        logging.info(f"Successfully published pre-staged {post_type} {configured.get('media', {}).get('pk')}.")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to publish pre-staged {post_type}: {e}", exc_info=True)
+        raise UploadError.from_exception(e) from e
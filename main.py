@@ -1,40 +1,72 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, Form, status
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, Form, BackgroundTasks, status
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
+from typing import List, Optional
 import os
 import logging
 import uvicorn
 from datetime import datetime, timezone, timedelta
 import shutil
-import aiofiles
+import uuid
+import time
+import asyncio
 from contextlib import asynccontextmanager
 
-from database import SessionLocal, engine, Base, init_database, get_db
-from models import Content, Schedule, Account
-from automation import ContentUploader
+from database import (
+    SessionLocal, AsyncSessionLocal, engine, Base, init_database, get_db, get_async_db, database_pool_stats,
+)
+from models import Content, ContentMedia, Schedule, Account, UploadSession
+from scheduler_notify import notify_scheduler
+from storage import (
+    FileTooLarge, RESUMABLE_CHUNK_SIZE, assemble_chunks, chunk_count, discard_session, expected_chunk_length,
+    missing_chunks, stream_to_file, write_chunk
+)
+from schedule_times import refresh_next_run_at, to_db_time
+from blob_store import release_blobs, store_blob
+from media_prep import MediaPreparer, image_dimensions
+from dashboard_stats import get_dashboard_async, invalidate_dashboard
+from content_listing import CONTENT_PAGE_SIZE, etag_matches, list_contents, parse_fields
+from metrics import HTTP_REQUEST_DURATION, render_metrics
+from rate_limiter import AccountRateLimiter, account_key
+from publish_jobs import job_events, job_state
 import auth
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-print("Database tables created successfully")
-
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize content uploader
-uploader = ContentUploader()
+# Prepares Instagram-ready media in a process pool right after upload
+media_preparer = MediaPreparer()
+
+# Reports when a queued publish can start under its account's post limit
+rate_limiter = AccountRateLimiter(SessionLocal)
+
+# How often each worker logs its connection pool usage (0 disables)
+DB_POOL_LOG_SECONDS = float(os.getenv("DB_POOL_LOG_SECONDS", "300"))
+
+async def _log_pool_stats(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"Database pool stats: {database_pool_stats()}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting Daily Content Uploader Web Server...")
     logger.info(f"Environment: {os.getenv('ENVIRONMENT', 'development')}")
     logger.info(f"Database URL: {os.getenv('DATABASE_URL', 'Not configured')}")
+    pool_logger = asyncio.create_task(_log_pool_stats(DB_POOL_LOG_SECONDS)) if DB_POOL_LOG_SECONDS > 0 else None
     yield
+    if pool_logger:
+        pool_logger.cancel()
+    media_preparer.shutdown()
     logger.info("Shutting down Daily Content Uploader Web Server...")
 
 app = FastAPI(title="Daily Content Uploader", version="1.1.0", lifespan=lifespan)
@@ -45,12 +77,23 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
-init_database()
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template ("/publish/{content_id}"), not the raw path, to keep label values bounded.
+    route = request.scope.get("route")
+    HTTP_REQUEST_DURATION.labels(
+        method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code,
+    ).observe(time.perf_counter() - started)
+    return response
 
 UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "./uploads")
 STATIC_FOLDER = "./static"
 TEMPLATES_FOLDER = "./templates"
+STAGING_FOLDER = os.path.join(UPLOAD_FOLDER, ".staging")
 Path(UPLOAD_FOLDER).mkdir(parents=True, exist_ok=True)
+Path(STAGING_FOLDER).mkdir(parents=True, exist_ok=True)
 Path(STATIC_FOLDER).mkdir(exist_ok=True)
 Path(TEMPLATES_FOLDER).mkdir(exist_ok=True)
 
@@ -59,20 +102,46 @@ app.mount("/uploads", StaticFiles(directory=UPLOAD_FOLDER), name="uploads")
 templates = Jinja2Templates(directory=TEMPLATES_FOLDER)
 
 
+def _parse_size(value: str) -> int:
+    """Parses sizes like '200MB', '1GB' or a plain byte count."""
+    value = value.strip().upper()
+    for suffix, factor in (("GB", 1024**3), ("MB", 1024**2), ("KB", 1024), ("B", 1)):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+MAX_FILE_SIZE = _parse_size(os.getenv("MAX_FILE_SIZE", "200MB"))
+ALLOWED_EXTENSIONS = {ext.strip().lower() for ext in os.getenv("ALLOWED_EXTENSIONS", "jpg,jpeg,png,mp4,mov").split(",")}
+
+def is_allowed_filename(filename: str) -> bool:
+    """Checks a file name's extension against ALLOWED_EXTENSIONS."""
+    if not filename or "." not in filename:
+        return False
+    return filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def validate_file(file: UploadFile) -> bool:
+    """Checks the uploaded file's extension against ALLOWED_EXTENSIONS."""
+    return is_allowed_filename(file.filename)
+
+
 # --- Authentication Endpoints ---
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
+def _webapp_user(db: Session, username: str) -> Optional[Account]:
+    return db.query(Account).filter(Account.platform == "webapp", Account.username == username).first()
+
 @app.post("/login")
 async def login_for_access_token(
     response: JSONResponse,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(Account).filter(Account.platform == "webapp", Account.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.password):
+    user = await db.run_sync(_webapp_user, form_data.username)
+    # bcrypt runs in auth's worker pool so a burst of logins does not stall other requests
+    if not user or not await auth.verify_password_async(form_data.password, user.password):
         return templates.TemplateResponse("login.html", {
             "request": {},
             "error": "Incorrect username or password"
@@ -92,73 +161,113 @@ async def logout():
 # --- Protected Endpoints ---
 
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, db: Session = Depends(get_db), current_user: dict = Depends(auth.get_current_user)):
+async def dashboard(request: Request, db: AsyncSession = Depends(get_async_db), current_user: dict = Depends(auth.get_current_user)):
     if not current_user:
         return RedirectResponse(url="/login")
 
-    contents = db.query(Content).order_by(Content.created_at.desc()).limit(10).all()
-    schedules = db.query(Schedule).filter(Schedule.status == "pending").all()
-    total_contents = db.query(Content).count()
-    pending_schedules = db.query(Schedule).filter(Schedule.status == "pending").count()
-    published_contents = db.query(Content).filter(Content.status == "published").count()
-    recurring_schedules_q = db.query(Schedule).filter(Schedule.status == 'recurring').all()
-    recurring_map = {s.content_id: s for s in recurring_schedules_q}
+    # Latest contents, their recurring schedules and one aggregate stats query, cached briefly.
+    dashboard_data = await get_dashboard_async(db)
 
     return templates.TemplateResponse("dashboard.html", {
-        "request": request, "contents": contents, "schedules": schedules,
-        "recurring_map": recurring_map, "current_user": current_user,
-        "stats": {"total_contents": total_contents, "pending_schedules": pending_schedules, "published_contents": published_contents}
+        "request": request, "current_user": current_user, **dashboard_data
     })
 
 @app.post("/upload")
 async def upload_content(
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...), caption: str = Form(""),
-    post_type: str = Form(...), db: Session = Depends(get_db),
+    post_type: str = Form(...), account_id: Optional[int] = Form(None), db: Session = Depends(get_db),
     current_user: dict = Depends(auth.get_current_user)
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files were uploaded.")
-
-    total_size = 0
-    file_paths = []
-    primary_filename = files[0].filename
-    primary_file_type = files[0].content_type
+    account = _platform_account(db, account_id)
 
     for file in files:
         if not validate_file(file):
             raise HTTPException(status_code=400, detail=f"File type not allowed for {file.filename}")
-        
-        file_content = await file.read()
-        file_size = len(file_content)
-        total_size += file_size
-        
-        if total_size > MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail=f"Total file size exceeds limit of {MAX_FILE_SIZE / 1024**2}MB")
-
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{file.filename}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(file_content)
-        file_paths.append(file_path)
-
-    db_file_path = ",".join(file_paths)
-    db_filename = f"Album of {len(files)} items" if post_type == "album" else primary_filename
+
+    total_size = 0
+    media = []
+
+    try:
+        for file in files:
+            staging_path = _staging_path(file.filename)
+
+            # Streamed in chunks; aborts as soon as the total crosses MAX_FILE_SIZE.
+            file_size, file_hash = await stream_to_file(file, staging_path, MAX_FILE_SIZE - total_size)
+            total_size += file_size
+            media.append(await asyncio.to_thread(
+                _store_media, db, staging_path, file.filename, file.content_type, file_size, file_hash
+            ))
+            logger.info(f"Stored {file.filename} ({file_size} bytes, sha256 {file_hash})")
+        result = await asyncio.to_thread(_create_content, db, media, files[0].filename, caption, post_type, account)
+    except FileTooLarge:
+        await asyncio.to_thread(_release_files, db, [item.path for item in media])
+        raise HTTPException(status_code=400, detail=f"Total file size exceeds limit of {MAX_FILE_SIZE / 1024**2}MB")
+    except Exception:
+        db.rollback()
+        await asyncio.to_thread(_release_files, db, [item.path for item in media])
+        raise
+
+    background_tasks.add_task(media_preparer.prepare, [item.path for item in media], post_type)
+    return result
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename or "")[1].lower()
+
+def _staging_path(filename: str) -> str:
+    """A unique temporary path for an incoming file, before it moves into the blob store."""
+    return os.path.join(STAGING_FOLDER, f"{uuid.uuid4().hex}{_extension(filename)}")
+
+def _release_files(db: Session, file_paths: List[str]):
+    """Drops the blob references held by a content's files (or a failed upload's)."""
+    release_blobs(db, file_paths)
+
+def _content_media(path: str, mime_type: str, size: int, sha256: str) -> ContentMedia:
+    width, height = image_dimensions(path)
+    return ContentMedia(path=path, mime_type=mime_type, size=size, sha256=sha256, width=width, height=height)
+
+def _store_media(db: Session, staging_path: str, filename: str, mime_type: str, size: int, sha256: str) -> ContentMedia:
+    """Moves a staged file into the blob store and reads its dimensions. Blocking: run it in a thread."""
+    path = store_blob(db, UPLOAD_FOLDER, staging_path, sha256, size, _extension(filename))
+    return _content_media(path, mime_type, size, sha256)
+
+
+def _platform_account(db: Session, account_id: Optional[int]) -> Optional[Account]:
+    """The stored platform account `account_id` refers to; None selects the .env account."""
+    if account_id in (None, ""):
+        return None
+    account = db.get(Account, int(account_id))
+    if not account or account.platform == "webapp":
+        raise HTTPException(status_code=404, detail="Account not found")
+    return account
+
+def _create_content(
+    db: Session, media: List[ContentMedia], primary_filename: str, caption: str, post_type: str,
+    account: Optional[Account] = None,
+) -> dict:
+    """Creates the Content row and its ContentMedia rows for files already stored in UPLOAD_FOLDER."""
+    db_filename = f"Album of {len(media)} items" if post_type == "album" else primary_filename
+    for position, item in enumerate(media):
+        item.position = position
 
     try:
         new_content = Content(
-            filename=db_filename, file_path=db_file_path, caption=caption,
-            platform="instagram", post_type=post_type, file_type=primary_file_type,
-            file_size=total_size, status="uploaded"
+            filename=db_filename, file_path=media[0].path, caption=caption,
+            platform=account.platform if account else "instagram", account=account,
+            post_type=post_type, file_type=media[0].mime_type,
+            file_size=sum(item.size for item in media), status="uploaded", media=media
         )
         db.add(new_content)
         db.commit()
         db.refresh(new_content)
-        
+        invalidate_dashboard()
+
         logger.info(f"Content entry created successfully: ID {new_content.id}, Type: {post_type}")
         return {"message": "Content uploaded and saved successfully.", "content_id": new_content.id}
-        
+
     except HTTPException:
         raise
     except Exception as e:
@@ -166,30 +275,207 @@ async def upload_content(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@app.post("/publish/{content_id}")
-async def publish_content(
-    content_id: int, platform: str, db: Session = Depends(get_db),
+# --- Resumable Uploads ---
+# init -> PUT chunks by offset (in any order, in parallel) -> finalize.
+# Chunks live under UPLOAD_FOLDER/.sessions/<id>/ until finalize assembles them.
+
+def _get_open_upload_session(db: Session, session_id: str) -> UploadSession:
+    return _check_open_upload_session(db.query(UploadSession).filter(UploadSession.id == session_id).first())
+
+def _check_open_upload_session(upload_session: Optional[UploadSession]) -> UploadSession:
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if upload_session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is {upload_session.status}")
+    return upload_session
+
+def _upload_session_state(upload_session: UploadSession) -> dict:
+    missing = missing_chunks(UPLOAD_FOLDER, upload_session.id, upload_session.total_size, upload_session.chunk_size)
+    return {
+        "session_id": upload_session.id,
+        "filename": upload_session.filename,
+        "total_size": upload_session.total_size,
+        "chunk_size": upload_session.chunk_size,
+        "chunk_count": chunk_count(upload_session.total_size, upload_session.chunk_size),
+        "missing_chunks": missing,
+        "complete": not missing,
+        "status": upload_session.status,
+    }
+
+@app.post("/upload/sessions")
+async def create_upload_session(
+    request: dict, db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(auth.get_current_user)
 ):
-    content = db.query(Content).filter(Content.id == content_id).first()
-    if not content:
-        raise HTTPException(status_code=404, detail="Content not found")
+    """Starts a resumable upload for one file."""
+    filename = request.get("filename")
+    total_size = request.get("total_size")
+
+    if not filename or not isinstance(total_size, int) or total_size <= 0:
+        raise HTTPException(status_code=400, detail="filename and a positive integer total_size are required")
+    if not is_allowed_filename(filename):
+        raise HTTPException(status_code=400, detail=f"File type not allowed for {filename}")
+    if total_size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail=f"File size exceeds limit of {MAX_FILE_SIZE / 1024**2}MB")
+
+    upload_session = UploadSession(
+        id=uuid.uuid4().hex, filename=os.path.basename(filename),
+        content_type=request.get("content_type"), total_size=total_size,
+        chunk_size=RESUMABLE_CHUNK_SIZE, status="open"
+    )
+    db.add(upload_session)
+    await db.commit()
 
-    if not os.path.exists(content.file_path):
-        raise HTTPException(status_code=404, detail="Content file not found")
+    logger.info(f"Upload session {upload_session.id} started for {upload_session.filename} ({total_size} bytes)")
+    return _upload_session_state(upload_session)
 
-    success = await uploader.upload_to_platform(content, platform)
+@app.get("/upload/sessions/{session_id}")
+async def get_upload_session(
+    session_id: str, db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """Reports which chunks are still missing, so a client can resume after a disconnect."""
+    upload_session = await db.get(UploadSession, session_id)
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return _upload_session_state(upload_session)
+
+@app.put("/upload/sessions/{session_id}")
+async def put_upload_chunk(
+    session_id: str, offset: int, request: Request, db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """Stores the request body as the chunk starting at `offset`. Re-sending a chunk overwrites it."""
+    upload_session = _check_open_upload_session(await db.get(UploadSession, session_id))
+    chunk_size, total_size = upload_session.chunk_size, upload_session.total_size
+    await db.close()  # Don't hold a connection while the body streams in
 
-    if success:
-        content.status = "published"
-        db.commit()
-        logger.info(f"Content {content_id} published successfully to {platform}")
-        return {"message": f"Content published successfully to {platform}"}
-    else:
-        content.status = "failed"
+    if offset < 0 or offset >= total_size or offset % chunk_size:
+        raise HTTPException(status_code=400, detail=f"offset must be a multiple of {chunk_size} below {total_size}")
+
+    index = offset // chunk_size
+    try:
+        await write_chunk(UPLOAD_FOLDER, session_id, index, request.stream(),
+                          expected_chunk_length(index, total_size, chunk_size))
+    except (FileTooLarge, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"session_id": session_id, "chunk": index, "received": True}
+
+@app.post("/upload/sessions/finalize")
+async def finalize_upload_sessions(
+    request: dict, background_tasks: BackgroundTasks, db: Session = Depends(get_db),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """
+    Assembles one or more completed sessions (several for an album, in order)
+    and creates the Content row exactly like POST /upload.
+    """
+    session_ids = request.get("session_ids") or []
+    post_type = request.get("post_type")
+    caption = request.get("caption", "")
+
+    if not session_ids or not post_type:
+        raise HTTPException(status_code=400, detail="session_ids and post_type are required")
+    if len(set(session_ids)) != len(session_ids):
+        raise HTTPException(status_code=400, detail="session_ids must not list a session twice")
+    account = _platform_account(db, request.get("account_id"))
+
+    upload_sessions = [_get_open_upload_session(db, session_id) for session_id in session_ids]
+    for upload_session in upload_sessions:
+        missing = missing_chunks(UPLOAD_FOLDER, upload_session.id, upload_session.total_size, upload_session.chunk_size)
+        if missing:
+            raise HTTPException(status_code=409, detail=f"Upload session {upload_session.id} is missing chunks {missing[:20]}")
+
+    total_size = sum(s.total_size for s in upload_sessions)
+    if total_size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Total file size exceeds limit of {MAX_FILE_SIZE / 1024**2}MB")
+
+    # Reserve the sessions so a concurrent finalize of the same upload gets a 409.
+    reserved = db.query(UploadSession).filter(
+        UploadSession.id.in_(session_ids), UploadSession.status == "open"
+    ).update({UploadSession.status: "finalizing"}, synchronize_session=False)
+    db.commit()
+    if reserved != len(session_ids):
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+
+    media = []
+    try:
+        for upload_session in upload_sessions:
+            staging_path = _staging_path(upload_session.filename)
+            file_size, file_hash = await asyncio.to_thread(
+                assemble_chunks, UPLOAD_FOLDER, upload_session.id,
+                upload_session.total_size, upload_session.chunk_size, staging_path
+            )
+            media.append(await asyncio.to_thread(
+                _store_media, db, staging_path, upload_session.filename, upload_session.content_type, file_size, file_hash
+            ))
+            logger.info(f"Assembled {upload_session.filename} ({file_size} bytes, sha256 {file_hash})")
+        result = await asyncio.to_thread(
+            _create_content, db, media, upload_sessions[0].filename, caption, post_type, account
+        )
+    except Exception:
+        db.rollback()
+        await asyncio.to_thread(_release_files, db, [item.path for item in media])
+        # The chunks are still on disk, so the client can finalize again
+        db.query(UploadSession).filter(UploadSession.id.in_(session_ids)).update(
+            {UploadSession.status: "open"}, synchronize_session=False)
         db.commit()
-        logger.error(f"Failed to publish content {content_id} to {platform}")
-        raise HTTPException(status_code=500, detail="Failed to publish content")
+        raise
+
+    db.query(UploadSession).filter(UploadSession.id.in_(session_ids)).update(
+        {UploadSession.status: "finalized"}, synchronize_session=False)
+    db.commit()
+    for session_id in session_ids:
+        discard_session(UPLOAD_FOLDER, session_id)
+    background_tasks.add_task(media_preparer.prepare, [item.path for item in media], post_type)
+    return result
+
+
+@app.post("/publish/{content_id}", status_code=status.HTTP_202_ACCEPTED)
+async def publish_content(
+    content_id: int, platform: str, account_id: Optional[int] = None, db: Session = Depends(get_db),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """
+    Queues the content for publishing now, from `account_id` if given, else
+    from the content's account. The scheduler process does the upload; follow
+    it at GET /jobs/{job_id} or its event stream.
+    """
+    job, starts_in = await asyncio.to_thread(_queue_publish_job, db, content_id, platform, account_id)
+    invalidate_dashboard()
+    notify_scheduler()
+    logger.info(f"Publish job {job.id} queued for content {content_id} on {platform}")
+    return {
+        "job_id": job.id,
+        "state": "queued",
+        "starts_in_seconds": round(starts_in, 1),
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+
+def _queue_publish_job(db: Session, content_id: int, platform: str, account_id: Optional[int]):
+    """Adds the publish job and returns it with the seconds until the post limit lets it start."""
+    content = db.query(Content).options(selectinload(Content.media)).filter(Content.id == content_id).first()
+    if not content:
+        raise HTTPException(status_code=404, detail="Content not found")
+    account = _platform_account(db, account_id) or content.account
+
+    missing = [path for path in content.media_paths if not os.path.exists(path)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Content file not found: {', '.join(missing)}")
+
+    # A publish job is a one-time schedule due now, so it gets the scheduler's
+    # leases, retries, rate limits and per-account serialization.
+    now = datetime.now(timezone.utc)
+    job = Schedule(
+        content_id=content.id, platform=platform, account_id=account.id if account else None,
+        scheduled_time=to_db_time(now), status="pending", next_run_at=to_db_time(now),
+    )
+    db.add(job)
+    db.commit()
+    return job, rate_limiter.projected_delay(account_key(platform, job.account_id))
 
 
 @app.delete("/content/{content_id}")
@@ -197,26 +483,33 @@ async def delete_content(
     content_id: int, db: Session = Depends(get_db),
     current_user: dict = Depends(auth.get_current_user)
 ):
-    content = db.query(Content).filter(Content.id == content_id).first()
+    content = db.query(Content).options(selectinload(Content.media)).filter(Content.id == content_id).first()
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    if os.path.exists(content.file_path):
-        try:
-            os.remove(content.file_path)
-        except OSError as e:
-            logger.warning(f"Could not delete file {content.file_path}: {e}")
-
+    file_paths = content.media_paths
     db.delete(content)
     db.commit()
+    invalidate_dashboard()
+
+    # The bytes may be shared with other content; the blob store only removes
+    # a file once nothing references it.
+    _release_files(db, file_paths)
 
     logger.info(f"Content {content_id} deleted successfully")
     return {"message": "Content deleted successfully"}
 
 
+async def _schedule_account_id(db: AsyncSession, account_id: Optional[int], content: Content) -> Optional[int]:
+    """A schedule posts from the requested account, else from its content's account."""
+    if account_id in (None, ""):
+        return content.account_id
+    account = await db.run_sync(_platform_account, account_id)
+    return account.id
+
 @app.post("/schedule/daily")
 async def create_daily_schedule(
-    request: dict, db: Session = Depends(get_db),
+    request: dict, db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(auth.get_current_user)
 ):
     """Creates a daily recurring schedule intent."""
@@ -232,21 +525,25 @@ async def create_daily_schedule(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM.")
 
-    content = db.query(Content).filter(Content.id == content_id).first()
+    content = await db.get(Content, content_id)
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
+    account_id = await _schedule_account_id(db, request.get("account_id"), content)
 
     use_day_counter = request.get("use_day_counter", False)
     start_day = request.get("start_day", 1)
 
     new_schedule = Schedule(
-        content_id=content_id, platform=platform, status="recurring",
+        content_id=content_id, platform=platform, account_id=account_id, status="recurring",
         use_day_counter=use_day_counter, hour=hour, minute=minute,
         day_counter=int(start_day),
         scheduled_time=datetime.now(timezone.utc)
     )
+    refresh_next_run_at(new_schedule, datetime.now(timezone.utc))
     db.add(new_schedule)
-    db.commit()
+    await db.commit()
+    invalidate_dashboard()
+    notify_scheduler()
 
     logger.info(f"Daily schedule intent for content {content_id} created successfully.")
     return {"message": "Daily schedule intent created. The scheduler will pick it up shortly."}
@@ -254,7 +551,7 @@ async def create_daily_schedule(
 
 @app.post("/schedule/once")
 async def create_one_time_schedule(
-    request: dict, db: Session = Depends(get_db),
+    request: dict, db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(auth.get_current_user)
 ):
     """Creates a one-time schedule intent."""
@@ -270,30 +567,156 @@ async def create_one_time_schedule(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format. Use ISO 8601.")
 
-    content = db.query(Content).filter(Content.id == content_id).first()
+    content = await db.get(Content, content_id)
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
+    account_id = await _schedule_account_id(db, request.get("account_id"), content)
 
     new_schedule = Schedule(
-        content_id=content_id, platform=platform,
-        scheduled_time=scheduled_time, status="pending"
+        content_id=content_id, platform=platform, account_id=account_id,
+        scheduled_time=scheduled_time, status="pending",
+        next_run_at=to_db_time(scheduled_time)
     )
     db.add(new_schedule)
-    db.commit()
+    await db.commit()
+    invalidate_dashboard()
+    notify_scheduler()
 
     logger.info(f"One-time schedule intent for content {content_id} created at {scheduled_time}")
     return {"message": "Content schedule intent created. The scheduler will pick it up shortly."}
 
 
+# --- Job Endpoints ---
+
+async def _load_job(job_id: int) -> Optional[dict]:
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Schedule, job_id)
+        return job_state(job) if job else None
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int, current_user: dict = Depends(auth.get_current_user)):
+    """State of a publish job (or any schedule): queued, running, retrying, succeeded or failed."""
+    job = await _load_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: int, current_user: dict = Depends(auth.get_current_user)):
+    """Server-sent events with the job's state on every change, until it succeeds or fails."""
+    if await _load_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job_events(_load_job, job_id), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Account Endpoints ---
+
+def _account_summary(account: Account) -> dict:
+    return {
+        "id": account.id, "platform": account.platform, "username": account.username,
+        "is_active": account.is_active, "last_login": account.last_login,
+        "needs_credentials": account.needs_credentials,
+    }
+
+@app.get("/api/accounts")
+async def list_accounts(db: Session = Depends(get_db), current_user: dict = Depends(auth.get_current_user)):
+    """Platform accounts content can be published from; passwords are never returned."""
+    accounts = db.query(Account).filter(Account.platform != "webapp").order_by(Account.platform, Account.username).all()
+    return {"accounts": [_account_summary(account) for account in accounts]}
+
+@app.post("/api/accounts")
+async def create_account(request: dict, db: Session = Depends(get_db), current_user: dict = Depends(auth.get_current_user)):
+    """Stores a platform account; its password is encrypted so the uploader can log in with it."""
+    platform = request.get("platform", "instagram")
+    username = (request.get("username") or "").strip()
+    password = request.get("password")
+
+    if not username or not password:
+        raise HTTPException(status_code=400, detail="username and password are required")
+    if platform == "webapp":
+        raise HTTPException(status_code=400, detail="Dashboard users are not platform accounts")
+    if db.query(Account).filter(Account.platform == platform, Account.username == username).first():
+        raise HTTPException(status_code=409, detail=f"Account {username} for {platform} already exists")
+
+    account = Account(platform=platform, username=username, is_active=True)
+    account.set_credentials(password)
+    db.add(account)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Added by a concurrent request since the check above
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Account {username} for {platform} already exists")
+    logger.info(f"{platform} account '{username}' added with ID {account.id}")
+    return _account_summary(account)
+
+@app.put("/api/accounts/{account_id}/credentials")
+async def update_account_credentials(
+    account_id: int, request: dict, db: Session = Depends(get_db),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """Replaces a platform account's password, e.g. one an older version could only store as a hash."""
+    password = request.get("password")
+    if not password:
+        raise HTTPException(status_code=400, detail="password is required")
+    account = db.query(Account).filter(Account.id == account_id, Account.platform != "webapp").first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    account.set_credentials(password)
+    db.commit()
+    logger.info(f"Credentials of {account.platform} account '{account.username}' updated")
+    return _account_summary(account)
+
+
 # --- Public/Utility Endpoints ---
 
 @app.get("/api/contents")
 async def get_contents(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db),
+    request: Request, limit: int = CONTENT_PAGE_SIZE, cursor: Optional[str] = None,
+    fields: Optional[str] = None, status: Optional[str] = None, post_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(auth.get_current_user) # Also protect this
 ):
-    contents = db.query(Content).offset(skip).limit(limit).all()
-    return {"contents": contents}
+    """
+    Newest contents first. Pass the returned `next_cursor` as `cursor` for the
+    next page, `fields=id,filename` to receive only those columns, and
+    `status`/`post_type` to filter. Unchanged pages answer 304 to If-None-Match.
+    """
+    try:
+        selected_fields = parse_fields(fields)
+        contents, next_cursor, etag = await db.run_sync(
+            list_contents, selected_fields, limit, cursor, status, post_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder({"contents": contents, "next_cursor": next_cursor}), headers=headers)
+
+@app.get("/internal/pool-stats")
+async def get_pool_stats(current_user: dict = Depends(auth.get_current_user)):
+    """Connection pool usage of the worker that answers; compare across workers when sizing."""
+    return database_pool_stats()
+
+@app.get("/internal/rate-limits")
+async def get_rate_limits(
+    platform: str = "instagram", account_id: Optional[int] = None,
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """Projected seconds until an account (default: the .env account) may post, and make an API call, again."""
+    key = account_key(platform, account_id)
+    return {"account": key, "wait_seconds": await asyncio.to_thread(rate_limiter.snapshot, key)}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics; like /health it is unauthenticated, so keep it off the public network."""
+    content, content_type = render_metrics()
+    return Response(content, media_type=content_type)
 
 @app.get("/health")
 async def health_check():
@@ -304,4 +727,6 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 2009))
     host = os.getenv("HOST", "0.0.0.0")
     reload = os.getenv("DEBUG", "false").lower() == "true"
+    # Under gunicorn the master does this once (gunicorn_config.on_starting)
+    init_database()
     uvicorn.run("main:app", host=host, port=port, reload=reload)
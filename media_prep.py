@@ -0,0 +1,238 @@
+import os
+import json
+import shutil
+import asyncio
+import logging
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for media preparation (defaults to one per core).
+MEDIA_PREP_WORKERS = int(os.getenv("MEDIA_PREP_WORKERS") or "0") or (os.cpu_count() or 1)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic"}
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".m4v"}
+
+# Instagram feed images must have an aspect ratio between 4:5 and 1.91:1.
+FEED_MIN_ASPECT = 4 / 5
+FEED_MAX_ASPECT = 1.91
+FEED_MAX_WIDTH = 1080
+STORY_MAX_SIZE = (1080, 1920)
+JPEG_QUALITY = 90
+
+# Artifacts written next to an original file.
+ARTIFACT_SUFFIXES = (".feed.jpg", ".story.jpg", ".thumb.jpg", ".meta.json")
+
+
+def is_image(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def is_video(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+
+def image_variant(post_type: str) -> str:
+    return "story" if post_type == "story" else "feed"
+
+
+def prepared_image_path(path: str, post_type: str) -> str:
+    return f"{path}.{image_variant(post_type)}.jpg"
+
+
+def thumbnail_path(path: str) -> str:
+    return f"{path}.thumb.jpg"
+
+
+def metadata_path(path: str) -> str:
+    return f"{path}.meta.json"
+
+
+def artifact_paths(path: str) -> List[str]:
+    return [f"{path}{suffix}" for suffix in ARTIFACT_SUFFIXES]
+
+
+def _is_fresh(artifact: str, source: str) -> bool:
+    return os.path.exists(artifact) and os.path.getmtime(artifact) >= os.path.getmtime(source)
+
+
+def _replace_atomically(tmp_path: str, final_path: str):
+    try:
+        os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# --- Lookups used at publish time ---
+
+def resolve_image(path: str, post_type: str) -> str:
+    """The prepared version of an image if it is ready, otherwise the original."""
+    if is_image(path):
+        prepared = prepared_image_path(path, post_type)
+        if _is_fresh(prepared, path):
+            return prepared
+    return path
+
+
+def image_dimensions(path: str) -> Tuple[Optional[int], Optional[int]]:
+    """(width, height) of an image, read from its header; (None, None) for anything else."""
+    if not is_image(path):
+        return None, None
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+def existing_thumbnail(path: str) -> Optional[str]:
+    """The pre-extracted thumbnail of a video, if there is one."""
+    thumb = thumbnail_path(path)
+    return thumb if _is_fresh(thumb, path) else None
+
+
+# --- Preparation (runs in worker processes) ---
+
+def _center_crop_to_aspect(img: Image.Image, min_aspect: float, max_aspect: float) -> Image.Image:
+    width, height = img.size
+    aspect = width / height
+    if aspect < min_aspect:
+        new_height = round(width / min_aspect)
+        top = (height - new_height) // 2
+        return img.crop((0, top, width, top + new_height))
+    if aspect > max_aspect:
+        new_width = round(height * max_aspect)
+        left = (width - new_width) // 2
+        return img.crop((left, 0, left + new_width, height))
+    return img
+
+
+def prepare_image(path: str, post_type: str) -> str:
+    """
+    Writes an Instagram-ready JPEG next to `path`: orientation applied, EXIF
+    dropped, aspect ratio clamped for feed posts and size capped. Returns its path.
+    """
+    output = prepared_image_path(path, post_type)
+    if _is_fresh(output, path):
+        return output
+
+    with Image.open(path) as original:
+        img = ImageOps.exif_transpose(original).convert("RGB")
+
+    if image_variant(post_type) == "feed":
+        img = _center_crop_to_aspect(img, FEED_MIN_ASPECT, FEED_MAX_ASPECT)
+        if img.width > FEED_MAX_WIDTH:
+            img = img.resize((FEED_MAX_WIDTH, round(img.height * FEED_MAX_WIDTH / img.width)), Image.LANCZOS)
+    else:
+        img.thumbnail(STORY_MAX_SIZE, Image.LANCZOS)
+
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    # A fresh image carries no EXIF unless it is passed explicitly.
+    img.save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    _replace_atomically(tmp_path, output)
+    return output
+
+
+def prepare_video(path: str) -> Dict:
+    """
+    Extracts a thumbnail and basic metadata for a video with ffmpeg/ffprobe,
+    when they are installed. Returns the metadata (empty if unavailable).
+    """
+    meta_file = metadata_path(path)
+    if _is_fresh(meta_file, path):
+        with open(meta_file) as f:
+            return json.load(f)
+
+    metadata = {}
+    if shutil.which("ffprobe"):
+        probe = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=width,height:format=duration", "-of", "json", path],
+            capture_output=True, text=True, timeout=120,
+        )
+        if probe.returncode == 0:
+            info = json.loads(probe.stdout or "{}")
+            stream = (info.get("streams") or [{}])[0]
+            metadata = {
+                "width": stream.get("width"),
+                "height": stream.get("height"),
+                "duration": float(info.get("format", {}).get("duration") or 0),
+            }
+            tmp_path = f"{meta_file}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(metadata, f)
+            _replace_atomically(tmp_path, meta_file)
+
+    thumb = thumbnail_path(path)
+    if shutil.which("ffmpeg") and not _is_fresh(thumb, path):
+        tmp_path = f"{thumb}.{os.getpid()}.tmp.jpg"
+        result = subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", "-ss", "1", "-i", path, "-frames:v", "1", "-q:v", "3", tmp_path],
+            capture_output=True, timeout=120,
+        )
+        if result.returncode == 0 and os.path.exists(tmp_path):
+            _replace_atomically(tmp_path, thumb)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return metadata
+
+
+def prepare_media(paths: List[str], post_type: str) -> Dict[str, str]:
+    """
+    Prepares every file of a content item. Runs in a worker process, so it
+    only takes and returns plain picklable values.
+    """
+    results = {}
+    for path in paths:
+        try:
+            if is_image(path):
+                results[path] = prepare_image(path, post_type)
+            elif is_video(path):
+                prepare_video(path)
+                results[path] = path
+        except Exception as e:
+            # The original file is still publishable; preparation is best effort.
+            results[path] = path
+            logger.warning(f"Could not prepare {path}: {e}")
+    return results
+
+
+class MediaPreparer:
+    """
+    Runs prepare_media in a process pool so image/video work uses every core
+    without blocking the web server's event loop. The pool starts on first use.
+    """
+
+    def __init__(self, max_workers: int = MEDIA_PREP_WORKERS):
+        self._max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def prepare(self, paths: List[str], post_type: str) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._get_executor(), prepare_media, paths, post_type)
+            logger.info(f"Prepared {len(results)} file(s) for {post_type} ahead of publishing.")
+            return results
+        except Exception as e:
+            logger.error(f"Media preparation failed for {paths}: {e}", exc_info=True)
+            return {}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
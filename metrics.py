@@ -0,0 +1,85 @@
+import os
+import logging
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+# With several gunicorn workers, point PROMETHEUS_MULTIPROC_DIR at an empty
+# directory so /metrics aggregates every worker instead of just the one answering.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Port of the scheduler process's own exporter (0 disables it)
+SCHEDULER_METRICS_HOST = os.getenv("SCHEDULER_METRICS_HOST", "127.0.0.1")
+SCHEDULER_METRICS_PORT = int(os.getenv("SCHEDULER_METRICS_PORT", "9101"))
+
+# Uploads and logins take seconds to minutes, so they get wider buckets than HTTP requests.
+SLOW_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to answer HTTP requests", ["method", "route", "status"],
+)
+UPLOAD_DURATION = Histogram(
+    "content_upload_duration_seconds", "Time to publish one content item to a platform",
+    ["platform", "post_type", "outcome"], buckets=SLOW_BUCKETS,
+)
+PUBLISH_DELAY = Histogram(
+    "publish_due_to_live_seconds", "Time from a scheduled post's due time until it is live",
+    ["platform", "post_type", "staged"], buckets=SLOW_BUCKETS,
+)
+LOGIN_DURATION = Histogram(
+    "instagram_login_duration_seconds", "Time to log in and validate an Instagram session",
+    ["kind"], buckets=SLOW_BUCKETS,
+)
+UPLOAD_FAILURES = Counter(
+    "upload_failures_total", "Failed uploads by error class and whether they are retried",
+    ["error_class", "decision"],
+)
+PLATFORM_CALLS_IN_FLIGHT = Gauge(
+    "platform_calls_in_flight", "Blocking platform SDK calls running in the platform executor",
+    multiprocess_mode="livesum",
+)
+PLATFORM_QUEUE_DEPTH = Gauge(
+    "platform_calls_queued", "Platform SDK calls waiting for a free platform executor worker",
+    multiprocess_mode="livesum",
+)
+SCHEDULER_TICK_DURATION = Histogram(
+    "scheduler_tick_duration_seconds", "Time spent planning and dispatching per scheduler wake-up",
+)
+SCHEDULER_LATENESS = Histogram(
+    "scheduler_job_lateness_seconds", "How late scheduled jobs start compared to their due time",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600),
+)
+SCHEDULER_JOBS = Counter(
+    "scheduler_jobs_total", "Scheduled jobs by outcome", ["outcome"],
+)
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "scheduler_queue_depth", "Schedules known to the scheduler, by state", ["state"],
+    multiprocess_mode="livesum",
+)
+
+
+def observe_login(kind: str, seconds: float):
+    LOGIN_DURATION.labels(kind=kind).observe(seconds)
+
+
+def render_metrics():
+    """The exposition text for /metrics and its content type."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def start_scheduler_exporter(port: int = SCHEDULER_METRICS_PORT, host: str = SCHEDULER_METRICS_HOST):
+    """Serves the scheduler process's metrics on its own port, for local scraping."""
+    if port <= 0:
+        return
+    start_http_server(port, addr=host)
+    logger.info(f"Scheduler metrics available at http://{host}:{port}/metrics")
@@ -0,0 +1,91 @@
+"""Add schedules.next_run_at with a (status, next_run_at) index
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+import os
+from datetime import datetime, time, timedelta, timezone
+
+import pytz
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+schedules = sa.table(
+    'schedules',
+    sa.column('id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('scheduled_time', sa.DateTime),
+    sa.column('last_run_at', sa.DateTime),
+    sa.column('hour', sa.Integer),
+    sa.column('minute', sa.Integer),
+    sa.column('next_run_at', sa.DateTime),
+)
+
+
+# Frozen copy of schedule_times as of this revision, so later changes to the
+# app module cannot change what this migration writes.
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _next_occurrence(hour, minute, after, tz):
+    candidate_date = after.astimezone(tz).date()
+    while True:
+        local = tz.normalize(tz.localize(datetime.combine(candidate_date, time(hour, minute))))
+        candidate = local.astimezone(timezone.utc)
+        if candidate > after:
+            return candidate
+        candidate_date += timedelta(days=1)
+
+
+def _next_run_at(row, now_utc, tz):
+    """Naive UTC next run of an active schedule, or None."""
+    if row.status == 'pending':
+        fire_at = _as_utc(row.scheduled_time)
+    elif row.status == 'recurring' and row.hour is not None and row.minute is not None:
+        after = now_utc - timedelta(seconds=60)
+        last_run_at = _as_utc(row.last_run_at)
+        if last_run_at and last_run_at > after:
+            after = last_run_at
+        fire_at = _next_occurrence(row.hour, row.minute, after, tz)
+    else:
+        fire_at = None
+    return fire_at.replace(tzinfo=None) if fire_at else None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.add_column(sa.Column('next_run_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_schedules_status_next_run_at', ['status', 'next_run_at'])
+
+    # Backfill the next run of every active schedule.
+    conn = op.get_bind()
+    now_utc = datetime.now(timezone.utc)
+    tz = pytz.timezone(os.getenv('TIMEZONE', 'UTC'))
+    rows = conn.execute(
+        sa.select(schedules).where(schedules.c.status.in_(('pending', 'recurring')))
+    ).fetchall()
+    for row in rows:
+        conn.execute(
+            schedules.update().where(schedules.c.id == row.id)
+            .values(next_run_at=_next_run_at(row, now_utc, tz))
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.drop_index('ix_schedules_status_next_run_at')
+        batch_op.drop_column('next_run_at')
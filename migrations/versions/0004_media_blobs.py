@@ -0,0 +1,31 @@
+"""Add media_blobs for content-addressed storage
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Existing files are moved into the store by `python dedupe_uploads.py`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_blobs',
+        sa.Column('sha256', sa.String(length=64), primary_key=True),
+        sa.Column('path', sa.String(length=512), nullable=False, unique=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('media_blobs')
@@ -0,0 +1,103 @@
+"""Move album members from contents.file_path into content_media
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Every comma-separated path becomes one content_media row, in order, and
+contents.file_path keeps only the first path.
+"""
+import os
+import mimetypes
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+contents = sa.table(
+    'contents',
+    sa.column('id', sa.Integer),
+    sa.column('file_path', sa.String),
+    sa.column('file_type', sa.String),
+    sa.column('file_size', sa.Integer),
+)
+content_media = sa.table(
+    'content_media',
+    sa.column('content_id', sa.Integer),
+    sa.column('position', sa.Integer),
+    sa.column('path', sa.String),
+    sa.column('mime_type', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('sha256', sa.String),
+)
+media_blobs = sa.table(
+    'media_blobs',
+    sa.column('sha256', sa.String),
+    sa.column('path', sa.String),
+    sa.column('size', sa.Integer),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'content_media',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('content_id', sa.Integer(), sa.ForeignKey('contents.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(length=512), nullable=False),
+        sa.Column('mime_type', sa.String(length=100)),
+        sa.Column('size', sa.Integer()),
+        sa.Column('sha256', sa.String(length=64)),
+        sa.Column('width', sa.Integer()),
+        sa.Column('height', sa.Integer()),
+        sa.UniqueConstraint('content_id', 'position', name='uq_content_media_position'),
+    )
+    op.create_index('ix_content_media_id', 'content_media', ['id'])
+    op.create_index('ix_content_media_content_id', 'content_media', ['content_id'])
+    op.create_index('ix_content_media_path', 'content_media', ['path'])
+
+    conn = op.get_bind()
+    blobs = {row.path: row for row in conn.execute(sa.select(media_blobs))}
+    rows = []
+    for content in conn.execute(sa.select(contents)).fetchall():
+        paths = [path for path in (content.file_path or '').split(',') if path]
+        for position, path in enumerate(paths):
+            blob = blobs.get(path)
+            if blob is not None:
+                size = blob.size
+            elif len(paths) == 1:
+                size = content.file_size
+            else:
+                size = os.path.getsize(path) if os.path.isfile(path) else None
+            rows.append({
+                'content_id': content.id,
+                'position': position,
+                'path': path,
+                'mime_type': content.file_type if position == 0 else mimetypes.guess_type(path)[0],
+                'size': size,
+                'sha256': blob.sha256 if blob is not None else None,
+            })
+        if len(paths) > 1:
+            conn.execute(contents.update().where(contents.c.id == content.id).values(file_path=paths[0]))
+    if rows:
+        op.bulk_insert(content_media, rows)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    paths_by_content = {}
+    for row in conn.execute(sa.select(content_media).order_by(content_media.c.content_id, content_media.c.position)):
+        paths_by_content.setdefault(row.content_id, []).append(row.path)
+    for content_id, paths in paths_by_content.items():
+        if len(paths) > 1:
+            conn.execute(contents.update().where(contents.c.id == content_id).values(file_path=','.join(paths)))
+
+    op.drop_index('ix_content_media_path', table_name='content_media')
+    op.drop_index('ix_content_media_content_id', table_name='content_media')
+    op.drop_index('ix_content_media_id', table_name='content_media')
+    op.drop_table('content_media')
@@ -0,0 +1,26 @@
+"""Index contents.created_at and schedules.content_id for the dashboard
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+The dashboard reads the latest contents by created_at and then only the
+recurring schedules of those contents.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contents_created_at', 'contents', ['created_at'])
+    op.create_index('ix_schedules_content_id', 'schedules', ['content_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_schedules_content_id', table_name='schedules')
+    op.drop_index('ix_contents_created_at', table_name='contents')
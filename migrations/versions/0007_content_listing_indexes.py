@@ -0,0 +1,26 @@
+"""Index contents by status and post_type for filtered listing
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+/api/contents pages newest-first on (created_at, id), optionally filtered by
+status or post_type.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contents_status_created_at', 'contents', ['status', 'created_at'])
+    op.create_index('ix_contents_post_type_created_at', 'contents', ['post_type', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contents_post_type_created_at', table_name='contents')
+    op.drop_index('ix_contents_status_created_at', table_name='contents')
@@ -0,0 +1,33 @@
+"""Let contents and schedules target a platform account
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+Existing rows keep account_id NULL, which means the account configured in .env.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ('contents', 'schedules'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('account_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(
+                f'fk_{table}_account_id', 'accounts', ['account_id'], ['id'], ondelete='SET NULL')
+            batch_op.create_index(f'ix_{table}_account_id', ['account_id'])
+
+
+def downgrade() -> None:
+    for table in ('schedules', 'contents'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_account_id')
+            batch_op.drop_constraint(f'fk_{table}_account_id', type_='foreignkey')
+            batch_op.drop_column('account_id')
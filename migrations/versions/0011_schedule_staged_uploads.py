@@ -0,0 +1,27 @@
+"""Add staged_upload and staged_at to schedules for two-phase publishing
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.add_column(sa.Column('staged_upload', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('staged_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.drop_column('staged_at')
+        batch_op.drop_column('staged_upload')
@@ -0,0 +1,32 @@
+"""Unique index on accounts (platform, username)
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+
+Serves the login and account lookups, which filter on both columns, and
+makes a duplicate account impossible. Duplicates that already exist must
+be resolved by hand first; the upgrade lists them instead of picking one.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT platform, username, COUNT(*) FROM accounts GROUP BY platform, username HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        listed = ", ".join(f"{platform}/{username} ({count} rows)" for platform, username, count in duplicates)
+        raise RuntimeError(f"Remove duplicate accounts before upgrading: {listed}")
+    op.create_index('ix_accounts_platform_username', 'accounts', ['platform', 'username'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_accounts_platform_username', table_name='accounts')
@@ -1,38 +1,97 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
+from typing import List
 import bcrypt
 
+from account_secrets import decrypt_secret, encrypt_secret, is_legacy_hash
+
 class Content(Base):
     __tablename__ = "contents"
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False) # For single files, the name. For albums, a descriptive name.
-    file_path = Column(String(4096), nullable=False) # For albums, paths are comma-separated
+    file_path = Column(String(4096), nullable=False) # Path of the first file; every file is listed in `media`
     caption = Column(Text)
     platform = Column(String(50), nullable=False, default="instagram")
     post_type = Column(String(50), default="photo") # photo, video, reel, album, story
     file_type = Column(String(100))  # image/jpeg, video/mp4, etc. For albums, the type of the first file.
     file_size = Column(Integer)  # File size in bytes
     status = Column(String(50), default="uploaded")  # uploaded, scheduled, published, failed
-    created_at = Column(DateTime, default=datetime.utcnow)
+    account_id = Column(
+        Integer, ForeignKey("accounts.id", ondelete="SET NULL", name="fk_contents_account_id"), nullable=True, index=True,
+    )  # NULL: the .env account
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationship
+    # Relationships
     schedules = relationship("Schedule", back_populates="content")
+    account = relationship("Account")
+    media = relationship(
+        "ContentMedia", back_populates="content", order_by="ContentMedia.position",
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # Filtered, newest-first pages of /api/contents; the primary key completes the (created_at, id) keyset
+        Index("ix_contents_status_created_at", "status", "created_at"),
+        Index("ix_contents_post_type_created_at", "post_type", "created_at"),
+    )
+
+    @property
+    def media_paths(self) -> List[str]:
+        """Paths of the content's files in posting order."""
+        if self.media:
+            return [item.path for item in self.media]
+        # Rows created before content_media existed, or built without media
+        return [self.file_path] if self.file_path else []
+
+class ContentMedia(Base):
+    __tablename__ = "content_media"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_id = Column(Integer, ForeignKey("contents.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)  # Order within an album, starting at 0
+    path = Column(String(512), nullable=False, index=True)
+    mime_type = Column(String(100))
+    size = Column(Integer)  # File size in bytes
+    sha256 = Column(String(64))
+    width = Column(Integer)  # Pixel dimensions, known for images
+    height = Column(Integer)
+
+    # Relationship
+    content = relationship("Content", back_populates="media")
+
+    __table_args__ = (
+        UniqueConstraint("content_id", "position", name="uq_content_media_position"),
+    )
 
 class Schedule(Base):
     __tablename__ = "schedules"
     
     id = Column(Integer, primary_key=True, index=True)
-    content_id = Column(Integer, ForeignKey("contents.id", ondelete="CASCADE"))
+    content_id = Column(Integer, ForeignKey("contents.id", ondelete="CASCADE"), index=True)
     platform = Column(String(50), nullable=False)  # instagram, tiktok
+    account_id = Column(
+        Integer, ForeignKey("accounts.id", ondelete="SET NULL", name="fk_schedules_account_id"), nullable=True, index=True,
+    )  # NULL: the .env account
     scheduled_time = Column(DateTime, nullable=False)
     status = Column(String(50), default="pending")  # pending, completed, failed, recurring
     error_message = Column(Text)
-    retry_count = Column(Integer, default=0)
+    retry_count = Column(Integer, default=0)  # Retries made since the last success
+    next_attempt_at = Column(DateTime, nullable=True)  # UTC time of a pending retry after a failed run
     last_run_at = Column(DateTime, nullable=True) # Tracks the last execution for recurring jobs
+    next_run_at = Column(DateTime, nullable=True) # UTC time of the next execution; NULL once the job is finished
+
+    # Set while a scheduler process is executing the job, so other processes skip it
+    lease_owner = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+
+    # Media uploaded ahead of the due time (JSON from instagram_api.stage_media),
+    # so only the configure step is left when the job runs
+    staged_upload = Column(Text, nullable=True)
+    staged_at = Column(DateTime, nullable=True)  # When a scheduler claimed the staging; cleared after each run
 
     # For daily counter feature
     use_day_counter = Column(Boolean, default=False)
@@ -45,8 +104,14 @@ class Schedule(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationship
+    # Relationships
     content = relationship("Content", back_populates="schedules")
+    account = relationship("Account")
+
+    __table_args__ = (
+        # Serves the scheduler's due query: status IN (...) AND next_run_at <= now
+        Index("ix_schedules_status_next_run_at", "status", "next_run_at"),
+    )
 
 class Account(Base):
     __tablename__ = "accounts"
@@ -54,11 +119,16 @@ class Account(Base):
     id = Column(Integer, primary_key=True, index=True)
     platform = Column(String(50), nullable=False)  # instagram, tiktok
     username = Column(String(255), nullable=False)
-    password = Column(Text, nullable=False)  # Encrypted
+    password = Column(Text, nullable=False)  # bcrypt hash for webapp users, Fernet-encrypted for platform accounts
     is_active = Column(Boolean, default=True)
     last_login = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # One row per login on a platform; serves the login and account lookups
+        Index("ix_accounts_platform_username", "platform", "username", unique=True),
+    )
     
     def set_password(self, password: str):
         """Hash and set password"""
@@ -68,3 +138,45 @@ class Account(Base):
     def check_password(self, password: str) -> bool:
         """Check if password matches"""
         return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+
+    def set_credentials(self, password: str):
+        """Encrypt and store a platform account's password, which must be recoverable to log in"""
+        self.password = encrypt_secret(password)
+
+    def get_credentials(self) -> str:
+        """Decrypt the platform account's password"""
+        return decrypt_secret(self.password)
+
+    @property
+    def needs_credentials(self) -> bool:
+        """True for a platform account whose password an older version stored as a bcrypt hash."""
+        return self.platform != "webapp" and is_legacy_hash(self.password)
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True)  # Random hex token handed to the client
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100))
+    total_size = Column(Integer, nullable=False)  # Declared size of the whole file in bytes
+    chunk_size = Column(Integer, nullable=False)
+    status = Column(String(50), default="open")  # open, finalizing, finalized
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MediaBlob(Base):
+    __tablename__ = "media_blobs"
+
+    sha256 = Column(String(64), primary_key=True)  # Content address of the stored bytes
+    path = Column(String(512), nullable=False, unique=True)
+    size = Column(Integer, nullable=False)  # Size in bytes
+    ref_count = Column(Integer, nullable=False, default=1)  # Number of Content file references to this blob
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    account = Column(String(255), primary_key=True)  # Account key the limit applies to
+    bucket = Column(String(50), primary_key=True)  # posts, calls
+    tokens = Column(Float, nullable=False)  # Tokens left as of updated_at
+    updated_at = Column(DateTime, nullable=False)  # UTC time tokens was last refilled
@@ -0,0 +1,109 @@
+import os
+import sys
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from metrics import PLATFORM_CALLS_IN_FLIGHT, PLATFORM_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Blocking platform SDK calls (instagrapi) run here instead of the default
+# executor that Starlette and aiofiles share, so slow uploads cannot starve them.
+PLATFORM_WORKERS = int(os.getenv("PLATFORM_WORKERS", "4"))
+# Longest a single platform call may take before it counts as a timeout
+PLATFORM_CALL_TIMEOUT_SECONDS = float(os.getenv("PLATFORM_CALL_TIMEOUT_SECONDS", "600"))
+# "thread", or "process" to keep instagrapi's memory growth out of the scheduler
+PLATFORM_EXECUTOR = os.getenv("PLATFORM_EXECUTOR", "thread")
+# Process mode only: calls a worker process handles before it is replaced (0: never; Python 3.11+)
+PLATFORM_PROCESS_MAX_TASKS = int(os.getenv("PLATFORM_PROCESS_MAX_TASKS", "50"))
+
+
+class OutcomeUnknown(Exception):
+    """
+    A platform call timed out while it was running. The worker cannot be
+    interrupted, so the call may still succeed (e.g. publish the post) in
+    the background; retrying it could publish twice.
+    """
+
+
+class PlatformExecutor:
+    """
+    A bounded pool for blocking platform calls, started on first use.
+
+    Calls beyond `max_workers` wait in the pool's queue; the queue depth and
+    the calls in flight are exported as gauges. A call that times out before
+    it started is cancelled and raises TimeoutError, so it is safe to retry.
+    One that was already running finishes in the background, still holding
+    its worker, and raises OutcomeUnknown instead.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = PLATFORM_WORKERS,
+        kind: str = PLATFORM_EXECUTOR,
+        timeout: float = PLATFORM_CALL_TIMEOUT_SECONDS,
+        max_tasks_per_child: int = PLATFORM_PROCESS_MAX_TASKS,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"PLATFORM_EXECUTOR must be 'thread' or 'process', not {kind!r}")
+        self.max_workers = max_workers
+        self.kind = kind
+        self.timeout = timeout
+        self._max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0  # Submitted calls that have not finished, queued or running
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: forking a process that runs an event loop and threads is unsafe
+                options = {"mp_context": multiprocessing.get_context("spawn")}
+                if self._max_tasks_per_child and sys.version_info >= (3, 11):
+                    options["max_tasks_per_child"] = self._max_tasks_per_child
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, **options)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="platform")
+        return self._executor
+
+    def _track(self, delta: int):
+        with self._lock:
+            self.pending += delta
+            pending = self.pending
+        PLATFORM_CALLS_IN_FLIGHT.set(min(pending, self.max_workers))
+        PLATFORM_QUEUE_DEPTH.set(max(pending - self.max_workers, 0))
+
+    async def run(self, func: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs) -> T:
+        """Runs `func(*args, **kwargs)` in the pool. In process mode it and its arguments must be picklable."""
+        timeout = timeout or self.timeout
+        future = self._get_executor().submit(partial(func, *args, **kwargs))
+        self._track(1)
+        future.add_done_callback(lambda _: self._track(-1))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            name = getattr(func, "__name__", repr(func))
+            if future.cancel():
+                logger.error(f"Platform call {name} timed out after {timeout:.0f}s before it started.")
+                raise TimeoutError(f"{name} timed out after {timeout:.0f}s waiting for a worker")
+            logger.error(f"Platform call {name} timed out after {timeout:.0f}s while running; "
+                         f"it may still complete in the background.")
+            raise OutcomeUnknown(f"{name} timed out after {timeout:.0f}s while running; it may still have succeeded")
+
+    def stats(self):
+        return {"kind": self.kind, "max_workers": self.max_workers, "pending": self.pending}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+platform_executor = PlatformExecutor()
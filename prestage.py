@@ -0,0 +1,158 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
+
+from automation import ContentUploader
+from models import Content, Schedule
+from retry_policy import UploadError
+from schedule_leases import ACTIVE_STATUSES, SCHEDULER_LEASE_SECONDS, lease_available
+from schedule_times import to_db_time
+from upload_job import UploadJob
+
+logger = logging.getLogger(__name__)
+
+# Upload a post's media this long before it is due, so only the configure
+# step is left at the due time (0 disables pre-staging).
+PRESTAGE_LEAD_SECONDS = float(os.getenv("PRESTAGE_LEAD_SECONDS", "0"))
+# How often the scheduler looks for schedules entering the lead window
+PRESTAGE_POLL_SECONDS = float(os.getenv("PRESTAGE_POLL_SECONDS", "60"))
+
+
+def load_staged(schedule: Schedule) -> Optional[Dict]:
+    """The schedule's pre-staged upload, or None."""
+    return json.loads(schedule.staged_upload) if schedule.staged_upload else None
+
+
+def clear_staged(schedule: Schedule):
+    """A staged upload serves one run; persisted with the caller's commit."""
+    schedule.staged_upload = None
+    schedule.staged_at = None
+
+
+def fetch_stageable(db, now: datetime, lead_seconds: float) -> List[Schedule]:
+    """Active, unleased Instagram schedules due within the lead window and not staged yet."""
+    return db.query(Schedule).filter(
+        Schedule.status.in_(ACTIVE_STATUSES),
+        Schedule.platform == "instagram",
+        Schedule.next_attempt_at.is_(None),
+        Schedule.next_run_at > to_db_time(now),
+        Schedule.next_run_at <= to_db_time(now + timedelta(seconds=lead_seconds)),
+        Schedule.staged_upload.is_(None),
+        lease_available(now),
+    ).order_by(Schedule.next_run_at, Schedule.id).all()
+
+
+def claim_staging(db, schedule_id: int, now: datetime) -> Optional[datetime]:
+    """
+    Reserves a schedule's staging for this process with a conditional UPDATE,
+    like claim_schedule. Returns the claim time to hand to store_staged, or
+    None when it is staged already or another process is staging it.
+    """
+    # Whole seconds: MySQL DATETIME drops microseconds, which would break the equality check in store_staged.
+    claimed_at = to_db_time(now).replace(microsecond=0)
+    stale = to_db_time(now - timedelta(seconds=SCHEDULER_LEASE_SECONDS))
+    claimed = db.query(Schedule).filter(
+        Schedule.id == schedule_id,
+        Schedule.staged_upload.is_(None),
+        or_(Schedule.staged_at.is_(None), Schedule.staged_at < stale),
+        # Not while the job runs: the run clears staged_at, which makes a late store_staged a no-op
+        lease_available(now),
+    ).update({Schedule.staged_at: claimed_at}, synchronize_session=False)
+    db.commit()
+    return claimed_at if claimed == 1 else None
+
+
+def store_staged(db, schedule_id: int, claimed_at: datetime, staged: Dict) -> bool:
+    """Saves a staged upload, unless the job ran in the meantime (a run clears staged_at)."""
+    stored = db.query(Schedule).filter(
+        Schedule.id == schedule_id,
+        Schedule.staged_at == claimed_at,
+        Schedule.staged_upload.is_(None),
+    ).update({Schedule.staged_upload: json.dumps(staged)}, synchronize_session=False)
+    db.commit()
+    return stored == 1
+
+
+class Prestager:
+    """
+    Uploads the media of schedules that are about to come due (the lead
+    window), so that at the due time run_schedule only configures the post.
+
+    Staging is an optimization: when it fails, or does not finish in time,
+    the job does the full upload as before. A failed attempt keeps its claim,
+    so it is only tried again once the claim is stale.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        lead_seconds: float = PRESTAGE_LEAD_SECONDS,
+        poll_seconds: float = PRESTAGE_POLL_SECONDS,
+        uploader: Optional[ContentUploader] = None,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        self._session_factory = session_factory
+        self.lead_seconds = lead_seconds
+        self.poll_seconds = poll_seconds
+        self._uploader = uploader or ContentUploader()
+        self._clock = clock
+
+    async def stage(self, schedule_id: int) -> bool:
+        """Stages one schedule's media. Returns True when a staged upload was stored."""
+        db = self._session_factory()
+        try:
+            claimed_at = claim_staging(db, schedule_id, self._clock())
+            if claimed_at is None:
+                return False
+
+            schedule = db.query(Schedule).options(selectinload(Schedule.account)).filter(Schedule.id == schedule_id).first()
+            content = db.query(Content).options(
+                selectinload(Content.media), selectinload(Content.account),
+            ).filter(Content.id == schedule.content_id).first()
+
+            if content is None:
+                return False
+            try:
+                job = UploadJob.from_content(content, schedule.platform, schedule.account)
+                staged = await self._uploader.stage_for_platform(job)
+            except UploadError as e:
+                logger.warning(f"Could not pre-stage schedule {schedule_id}; it will upload in full when due: {e}")
+                return False
+            if staged is None:
+                return False
+
+            if not store_staged(db, schedule_id, claimed_at, staged):
+                logger.info(f"Schedule {schedule_id} ran before its pre-staging finished; discarding it.")
+                return False
+            logger.info(f"Pre-staged schedule {schedule_id} ahead of {schedule.next_run_at}.")
+            return True
+        finally:
+            db.close()
+
+    async def run_once(self) -> int:
+        """Stages every schedule in the lead window. Returns how many were staged."""
+        db = self._session_factory()
+        try:
+            schedule_ids = [schedule.id for schedule in fetch_stageable(db, self._clock(), self.lead_seconds)]
+        finally:
+            db.close()
+
+        staged = 0
+        for schedule_id in schedule_ids:
+            try:
+                staged += await self.stage(schedule_id)
+            except Exception as e:
+                logger.error(f"Error pre-staging schedule {schedule_id}: {e}", exc_info=True)
+        return staged
+
+    async def run_forever(self):
+        logger.info(f"Pre-staging media {self.lead_seconds:.0f}s before schedules are due.")
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.poll_seconds)
@@ -0,0 +1,88 @@
+import os
+import json
+import asyncio
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from models import Schedule
+from schedule_times import as_utc
+
+# How often the event stream re-reads a job, and how long it may stay silent
+# before sending a keep-alive comment so proxies do not drop the connection.
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "1"))
+JOB_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("JOB_EVENTS_KEEPALIVE_SECONDS", "15"))
+
+TERMINAL_STATES = ("succeeded", "failed")
+
+
+def job_state(schedule: Schedule, now: Optional[datetime] = None) -> Dict:
+    """
+    Status of a publish job. A job is a one-time schedule due immediately, so
+    its state is read off the schedule: queued until the scheduler claims it,
+    running while a scheduler holds its lease, retrying while it waits for
+    next_attempt_at, then succeeded or failed.
+    """
+    now = now or datetime.now(timezone.utc)
+    lease_expires_at = as_utc(schedule.lease_expires_at)
+
+    if schedule.status == "completed":
+        state = "succeeded"
+    elif schedule.status == "failed":
+        state = "failed"
+    elif schedule.lease_owner and lease_expires_at and lease_expires_at > now:
+        state = "running"
+    elif schedule.next_attempt_at is not None:
+        state = "retrying"
+    else:
+        state = "queued"
+
+    next_run_at = as_utc(schedule.next_run_at)
+    return {
+        "id": schedule.id,
+        "content_id": schedule.content_id,
+        "platform": schedule.platform,
+        "account_id": schedule.account_id,
+        "state": state,
+        "attempts": (schedule.retry_count or 0) + (1 if state in TERMINAL_STATES else 0),
+        "next_attempt_at": next_run_at.isoformat() if state in ("queued", "retrying") and next_run_at else None,
+        "error": schedule.error_message,
+        "updated_at": as_utc(schedule.updated_at).isoformat() if schedule.updated_at else None,
+    }
+
+
+def sse_message(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def job_events(
+    load_job: Callable[[int], Awaitable[Optional[Dict]]],
+    job_id: int,
+    poll_seconds: float = JOB_EVENTS_POLL_SECONDS,
+    keepalive_seconds: float = JOB_EVENTS_KEEPALIVE_SECONDS,
+) -> AsyncIterator[str]:
+    """
+    Server-sent events for one job: a `state` event whenever its state
+    changes (lease renewals alone do not count), ending after the first
+    terminal state. `load_job(job_id)` is a coroutine returning job_state(),
+    or None once the job is gone.
+    """
+    last = None
+    silent = 0.0
+    while True:
+        current = await load_job(job_id)
+        if current is None:
+            yield sse_message("gone", {"id": job_id})
+            return
+
+        comparable = {key: value for key, value in current.items() if key != "updated_at"}
+        if comparable != last:
+            yield sse_message("state", current)
+            last, silent = comparable, 0.0
+            if current["state"] in TERMINAL_STATES:
+                return
+        elif silent >= keepalive_seconds:
+            yield ": keep-alive\n\n"
+            silent = 0.0
+
+        await asyncio.sleep(poll_seconds)
+        silent += poll_seconds
@@ -0,0 +1,168 @@
+import os
+import math
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from models import RateLimitBucket
+from schedule_times import as_utc, to_db_time
+
+logger = logging.getLogger(__name__)
+
+# Per Instagram account. Posts are what triggers action blocks; API calls
+# count every HTTP request a pooled client makes (a publish is several).
+# A limit of 0 (or less) disables it.
+RATE_LIMIT_POSTS_PER_HOUR = float(os.getenv("RATE_LIMIT_POSTS_PER_HOUR", "10"))
+RATE_LIMIT_CALLS_PER_MINUTE = float(os.getenv("RATE_LIMIT_CALLS_PER_MINUTE", "30"))
+# API call tokens a process reserves from the database at once and then hands
+# out locally, so a single HTTP request does not cost a locked database round-trip.
+RATE_LIMIT_CALL_BATCH = int(os.getenv("RATE_LIMIT_CALL_BATCH", "5"))
+
+
+def account_key(platform: str, account_id: Optional[int] = None) -> str:
+    """Identifies an account for rate limits and per-account concurrency; the .env account is just the platform."""
+    return f"{platform}:{account_id}" if account_id is not None else platform
+
+
+class TokenBucket:
+    """
+    Holds up to `capacity` tokens and refills them evenly over `period_seconds`.
+
+    Stateless: the token count and its timestamp live in a RateLimitBucket row,
+    so the limit survives restarts and is shared by every process. A bucket
+    with no capacity is disabled: it never limits.
+    """
+
+    def __init__(self, capacity: float, period_seconds: float):
+        self.capacity = capacity
+        self.enabled = capacity > 0
+        self.rate = capacity / period_seconds if self.enabled else 0.0  # tokens per second
+
+    def refill(self, tokens: float, updated_at: datetime, now: datetime) -> float:
+        elapsed = max((now - updated_at).total_seconds(), 0.0)
+        return min(self.capacity, tokens + elapsed * self.rate)
+
+    def wait_seconds(self, tokens: float, needed: float = 1.0) -> float:
+        """Seconds until `needed` tokens are available, 0 if they already are."""
+        if not self.enabled or tokens >= needed:
+            return 0.0
+        return (needed - tokens) / self.rate
+
+
+class AccountRateLimiter:
+    """
+    Token buckets per account and bucket name, persisted in rate_limit_buckets.
+
+    take() either consumes a token and returns 0, or leaves the bucket alone
+    and returns how many seconds until a token will be free, so callers can
+    defer the work rather than fail it. The clock is injectable for tests.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        posts_per_hour: float = RATE_LIMIT_POSTS_PER_HOUR,
+        calls_per_minute: float = RATE_LIMIT_CALLS_PER_MINUTE,
+        call_batch: int = RATE_LIMIT_CALL_BATCH,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._session_factory = session_factory
+        self.buckets: Dict[str, TokenBucket] = {
+            "posts": TokenBucket(posts_per_hour, 3600),
+            "calls": TokenBucket(calls_per_minute, 60),
+        }
+        self.call_batch = max(call_batch, 1)
+        # API call tokens this process reserved and has not used yet, per account
+        self._call_allowance: Dict[str, int] = {}
+        self._allowance_lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+
+    def _load(self, db, account: str, bucket: str, now: datetime) -> Tuple[RateLimitBucket, float]:
+        """The bucket's row, locked for update, and its token count refilled up to `now`."""
+        spec = self.buckets[bucket]
+        row = db.query(RateLimitBucket).filter_by(account=account, bucket=bucket).with_for_update().first()
+        if row is None:
+            row = RateLimitBucket(account=account, bucket=bucket, tokens=spec.capacity, updated_at=to_db_time(now))
+            db.add(row)
+            try:
+                db.flush()
+            except IntegrityError:
+                # Another process created it first
+                db.rollback()
+                row = db.query(RateLimitBucket).filter_by(account=account, bucket=bucket).with_for_update().one()
+        return row, spec.refill(row.tokens, as_utc(row.updated_at), now)
+
+    def _take(self, account: str, bucket: str, most: int) -> Tuple[int, float]:
+        """
+        Consumes between one and `most` tokens, as many as are free, and
+        returns (tokens taken, 0); or (0, seconds until one is free).
+        """
+        now = self._clock()
+        db = self._session_factory()
+        try:
+            row, tokens = self._load(db, account, bucket, now)
+            delay = self.buckets[bucket].wait_seconds(tokens)
+            taken = 0 if delay else min(most, math.floor(tokens))
+            row.tokens = tokens - taken
+            row.updated_at = to_db_time(now)
+            db.commit()
+            return taken, delay
+        finally:
+            db.close()
+
+    def take(self, account: str, bucket: str) -> float:
+        """Consumes one token and returns 0, or returns the seconds until one is free."""
+        if not self.buckets[bucket].enabled:
+            return 0.0
+        return self._take(account, bucket, 1)[1]
+
+    def projected_delay(self, account: str, bucket: str = "posts", count: int = 1) -> float:
+        """Seconds until `count` more tokens would have been granted, without taking any."""
+        if not self.buckets[bucket].enabled:
+            return 0.0
+        now = self._clock()
+        db = self._session_factory()
+        try:
+            row = db.query(RateLimitBucket).filter_by(account=account, bucket=bucket).first()
+            spec = self.buckets[bucket]
+            tokens = spec.refill(row.tokens, as_utc(row.updated_at), now) if row else spec.capacity
+            return spec.wait_seconds(tokens, count)
+        finally:
+            db.close()
+
+    def reserve_post(self, account: str) -> float:
+        delay = self.take(account, "posts")
+        if delay:
+            logger.info(f"Post limit reached for '{account}'; next post possible in {delay:.0f}s.")
+        return delay
+
+    def wait_for_call(self, account: str):
+        """
+        Blocks until an API call token is free. Meant for the worker threads
+        that run instagrapi. Tokens come from this process's allowance, which
+        is refilled from the database up to `call_batch` tokens at a time.
+        """
+        if not self.buckets["calls"].enabled:
+            return
+        with self._allowance_lock:
+            if self._call_allowance.get(account, 0) > 0:
+                self._call_allowance[account] -= 1
+                return
+        while True:
+            taken, delay = self._take(account, "calls", self.call_batch)
+            if taken:
+                with self._allowance_lock:
+                    self._call_allowance[account] = self._call_allowance.get(account, 0) + taken - 1
+                return
+            logger.info(f"API call limit reached for '{account}'; waiting {delay:.1f}s.")
+            self._sleep(delay)
+
+    def snapshot(self, account: str) -> Dict[str, float]:
+        """Seconds until the next post and the next API call would be allowed."""
+        return {bucket: round(self.projected_delay(account, bucket), 1) for bucket in self.buckets}
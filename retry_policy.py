@@ -0,0 +1,136 @@
+import os
+import random
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from metrics import UPLOAD_FAILURES
+from models import Schedule
+from platform_executor import OutcomeUnknown
+from schedule_times import to_db_time
+
+logger = logging.getLogger(__name__)
+
+# Runs of a job, counting the first, before a retryable failure gives up
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+# Backoff before retry n is drawn from [d/2, d] with d = base * 2**(n-1), capped
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "60"))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "3600"))
+
+
+@lru_cache(maxsize=None)
+def _error_classes():
+    """
+    (error class, retryable) by exception type, checked in order; the first
+    matching type wins. Built on first use, so importing this module does
+    not load instagrapi.
+    """
+    from instagrapi import exceptions as ig
+    return (
+        # Timed out mid-call: the post may have gone out, so a retry could publish it twice
+        ((OutcomeUnknown,), ("unknown_outcome", False)),
+        ((ig.PleaseWaitFewMinutes, ig.ClientThrottledError, ig.RateLimitError), ("rate_limited", True)),
+        ((ig.ClientRequestTimeout, TimeoutError, asyncio.TimeoutError, socket.timeout), ("timeout", True)),
+        ((ig.ClientConnectionError, ig.ClientIncompleteReadError, ConnectionError), ("connection", True)),
+        ((ig.BadPassword, ig.BadCredentials, ig.ChallengeError, ig.TwoFactorRequired,
+          ig.ReloginAttemptExceeded, ig.AccountSuspended), ("auth", False)),
+        ((ig.VideoTooLongException, FileNotFoundError, IsADirectoryError), ("invalid_media", False)),
+    )
+
+
+class UploadError(Exception):
+    """A failed upload, classified so the scheduler knows whether to try again."""
+
+    def __init__(self, message: str, error_class: str = "unknown", retryable: bool = True):
+        super().__init__(message)
+        self.error_class = error_class
+        self.retryable = retryable
+
+    @classmethod
+    def from_exception(cls, exc: BaseException) -> "UploadError":
+        if isinstance(exc, UploadError):
+            return exc
+        error_class, retryable = classify_error(exc)
+        return cls(f"{type(exc).__name__}: {exc}", error_class, retryable)
+
+
+def classify_error(exc: BaseException) -> Tuple[str, bool]:
+    """
+    Maps an exception to (error class, retryable). Throttling, timeouts,
+    dropped connections and 5xx responses are worth retrying; bad credentials,
+    challenges and unusable media will fail the same way next time.
+    Anything unrecognised is retried, within RETRY_MAX_ATTEMPTS.
+    """
+    for types, result in _error_classes():
+        if isinstance(exc, types):
+            return result
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        if code == 429:
+            return "rate_limited", True
+        if code >= 500:
+            return "server_error", True
+        if 400 <= code < 500:
+            return "rejected", False
+    return "unknown", True
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, so a burst of failures does not retry in lockstep."""
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_seconds: float = RETRY_BASE_SECONDS,
+        max_seconds: float = RETRY_MAX_SECONDS,
+        rng: Optional[random.Random] = None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)."""
+        ceiling = min(self.max_seconds, self.base_seconds * 2 ** (attempt - 1))
+        return self._rng.uniform(ceiling / 2, ceiling)
+
+    def should_retry(self, schedule: Schedule, error: UploadError) -> bool:
+        return error.retryable and (schedule.retry_count or 0) + 1 < self.max_attempts
+
+    def record_failure(self, schedule: Schedule, error: UploadError, now_utc: datetime) -> bool:
+        """
+        Updates a schedule after a failed run. Returns True when a retry was
+        planned: retry_count goes up and next_attempt_at is set, which
+        refresh_next_run_at turns into the next due time. Otherwise the caller
+        decides what giving up means; retry_count keeps the attempts made.
+        """
+        retry = self.should_retry(schedule, error)
+        UPLOAD_FAILURES.labels(error_class=error.error_class, decision="retry" if retry else "give_up").inc()
+
+        if not retry:
+            schedule.next_attempt_at = None
+            schedule.error_message = f"[{error.error_class}] {error}"
+            return False
+
+        schedule.retry_count = (schedule.retry_count or 0) + 1
+        next_attempt_at = now_utc + timedelta(seconds=self.delay(schedule.retry_count))
+        schedule.next_attempt_at = to_db_time(next_attempt_at)
+        schedule.error_message = (
+            f"[{error.error_class}] {error} (attempt {schedule.retry_count + 1}/{self.max_attempts} "
+            f"at {next_attempt_at.isoformat()})"
+        )
+        logger.warning(f"Schedule {schedule.id} failed with {error.error_class}; {schedule.error_message}")
+        return True
+
+    @staticmethod
+    def record_success(schedule: Schedule):
+        schedule.retry_count = 0
+        schedule.next_attempt_at = None
+        schedule.error_message = None
+
+
+retry_policy = RetryPolicy()
@@ -1,119 +1,317 @@
 import asyncio
 import logging
 import os
-import pytz
 from dotenv import load_dotenv
-from datetime import datetime, timezone, time
+from datetime import datetime, timezone, timedelta
+from sqlalchemy.orm import selectinload
 
 # Load environment variables first
 load_dotenv()
 
 from scheduler import execute_upload_logic
+from schedule_engine import ScheduleEngine, fetch_due_batches
+from schedule_leases import ACTIVE_STATUSES, WORKER_ID, LeaseKeeper, claim_schedule, release_lease
+from schedule_times import as_utc, refresh_next_run_at, to_db_time
+from scheduler_notify import start_wake_listener
 from database import SessionLocal
 from models import Schedule, Content
+from metrics import PUBLISH_DELAY, SCHEDULER_JOBS, start_scheduler_exporter
+from retry_policy import UploadError, retry_policy
+from rate_limiter import AccountRateLimiter, account_key
+from platform_executor import platform_executor
+from prestage import PRESTAGE_LEAD_SECONDS, Prestager, clear_staged
+from upload_sessions import UPLOAD_SESSION_SWEEP_SECONDS, expire_upload_sessions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(asctime)s - %(name)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-async def check_and_run_schedules():
+# Posts/hour per account; resolves SessionLocal on each use so tests can swap the database.
+rate_limiter = AccountRateLimiter(lambda: SessionLocal())
+
+# Global cap on uploads running at the same time, and a per-account cap so a
+# burst of due posts does not hit Instagram's rate limits from one account.
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "4"))
+SCHEDULER_PER_ACCOUNT_CONCURRENCY = int(os.getenv("SCHEDULER_PER_ACCOUNT_CONCURRENCY", "1"))
+# Safety-net interval for re-reading schedules when no wake-up arrives.
+SCHEDULER_RESYNC_SECONDS = float(os.getenv("SCHEDULER_RESYNC_SECONDS", "300"))
+# How many due rows are fetched (and planned ahead) per query.
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "500"))
+# Where the web app keeps resumable upload chunks, swept for abandoned sessions
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "./uploads")
+
+
+def _account_key(schedule: Schedule) -> str:
+    """Identifies the account a schedule publishes from, for per-account limits."""
+    return account_key(schedule.platform, schedule.account_id)
+
+
+def _missed_recurring_run(schedule: Schedule, now_utc: datetime) -> bool:
     """
-    The core function of the custom scheduler.
-    - Fetches all active schedules (`pending` or `recurring`).
-    - Checks if they are due to be run.
-    - Executes them if they are.
+    Re-evaluates a recurring job's occurrence when it actually starts and
+    moves next_run_at to it. A run that starts late, within the misfire
+    grace period, still happens, with earlier missed occurrences coalesced
+    into it. Returns True when every missed occurrence is past the grace
+    period, so the job has to wait for its next one.
+    """
+    if schedule.status != 'recurring' or schedule.next_run_at is None or schedule.next_attempt_at is not None:
+        return False
+    planned = as_utc(schedule.next_run_at)
+    refresh_next_run_at(schedule, now_utc)
+    due_at = as_utc(schedule.next_run_at)
+    if due_at is None or due_at > now_utc:
+        return True
+    if planned < due_at:
+        logger.warning(f"Recurring job {schedule.id} missed occurrence(s) since {planned.isoformat()}; running once for {due_at.isoformat()}.")
+    return False
+
+
+async def run_schedule(schedule_id: int, now_utc: datetime):
+    """
+    Executes a single due schedule in its own DB session and commits its result
+    independently of any other job running at the same time.
+
+    The schedule is first claimed with a lease, so when several scheduler
+    processes share one database only the one holding the lease runs it.
+    The database work runs in worker threads; only the upload runs on the loop.
     """
     db = SessionLocal()
     try:
-        logger.info("Checking for due schedules...")
+        started = await asyncio.to_thread(_start_run, db, schedule_id, now_utc)
+        if started is None:
+            return
+        schedule, content = started
 
-        now_utc = datetime.now(timezone.utc)
-        active_schedules = db.query(Schedule).filter(
-            (Schedule.status == 'pending') | (Schedule.status == 'recurring')
-        ).all()
+        # Execute the upload logic, which is now DB-independent
+        due_at = as_utc(schedule.next_run_at)
+        staged = schedule.staged_upload is not None
+        try:
+            async with LeaseKeeper(SessionLocal, schedule.id, WORKER_ID, lambda: datetime.now(timezone.utc)):
+                success = await execute_upload_logic(schedule, content)
+            error = None if success else UploadError("Upload process failed. See logs for details.")
+        except UploadError as e:
+            error = e
+
+        await asyncio.to_thread(_finish_run, db, schedule, content, error, now_utc, due_at, staged)
+
+    except Exception as e:
+        await asyncio.to_thread(db.rollback)
+        logger.error(f"Error processing schedule {schedule_id}: {e}", exc_info=True)
+        SCHEDULER_JOBS.labels(outcome="error").inc()
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+def _start_run(db, schedule_id: int, now_utc: datetime):
+    """
+    Claims a due schedule and loads it with its content. Returns both when the
+    upload should run now; otherwise records why not and returns None.
+    """
+    if not claim_schedule(db, schedule_id, WORKER_ID, now_utc):
+        logger.info(f"Schedule {schedule_id} is not due or is being run by another worker; skipping.")
+        SCHEDULER_JOBS.labels(outcome="skipped").inc()
+        return None
+
+    schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+    if not schedule:
+        logger.warning(f"Schedule {schedule_id} disappeared before it could run.")
+        SCHEDULER_JOBS.labels(outcome="skipped").inc()
+        return None
+
+    if schedule.status not in ACTIVE_STATUSES:
+        logger.info(f"Schedule {schedule.id} is no longer active ({schedule.status}); skipping.")
+        release_lease(db, schedule.id, WORKER_ID)
+        db.commit()
+        SCHEDULER_JOBS.labels(outcome="skipped").inc()
+        return None
+
+    if _missed_recurring_run(schedule, now_utc):
+        logger.warning(f"Recurring job {schedule.id} missed its run by more than the misfire grace period; waiting until {schedule.next_run_at}.")
+        clear_staged(schedule)
+        release_lease(db, schedule.id, WORKER_ID)
+        db.commit()
+        SCHEDULER_JOBS.labels(outcome="missed").inc()
+        return None
+
+    logger.info(f"Preparing to execute job for schedule {schedule.id}...")
+    content = db.query(Content).options(
+        selectinload(Content.media), selectinload(Content.account),
+    ).filter(Content.id == schedule.content_id).first()
+
+    if not content:
+        logger.error(f"Execution failed: Content {schedule.content_id} not found for schedule {schedule.id}.")
+        schedule.status = "failed"
+        schedule.error_message = "Content not found"
+        schedule.next_run_at = None
+        release_lease(db, schedule.id, WORKER_ID)
+        db.commit()
+        SCHEDULER_JOBS.labels(outcome="content_not_found").inc()
+        return None
+
+    delay = rate_limiter.reserve_post(_account_key(schedule))
+    if delay:
+        # Over the account's post limit: run it when a post is allowed again instead of failing it.
+        schedule.next_attempt_at = to_db_time(now_utc + timedelta(seconds=delay))
+        refresh_next_run_at(schedule, now_utc)
+        release_lease(db, schedule.id, WORKER_ID)
+        db.commit()
+        logger.info(f"Schedule {schedule.id} deferred by {delay:.0f}s to respect the post rate limit.")
+        SCHEDULER_JOBS.labels(outcome="deferred").inc()
+        return None
+
+    return schedule, content
 
-        if not active_schedules:
-            logger.info("No active schedules found.")
-            return
 
-        logger.info(f"Found {len(active_schedules)} active schedule(s) to evaluate.")
-
-        for schedule in active_schedules:
-            try:
-                run_job = False
-                # --- Logic for one-time jobs ---
-                if schedule.status == 'pending':
-                    # Compare timezone-aware and naive datetimes correctly
-                    if now_utc >= schedule.scheduled_time.replace(tzinfo=timezone.utc):
-                        logger.info(f"One-time job {schedule.id} is due (scheduled for {schedule.scheduled_time}).")
-                        run_job = True
-
-                # --- Logic for recurring jobs ---
-                elif schedule.status == 'recurring':
-                    user_timezone_str = os.getenv('TIMEZONE', 'UTC')
-                    user_timezone = pytz.timezone(user_timezone_str)
-                    now_in_user_tz = datetime.now(user_timezone)
-
-                    # Check if it's the right time of day in the user's timezone
-                    if now_in_user_tz.hour == schedule.hour and now_in_user_tz.minute == schedule.minute:
-                        # Check if it has already run today (in the user's timezone)
-                        if schedule.last_run_at is None or schedule.last_run_at.astimezone(user_timezone).date() < now_in_user_tz.date():
-                            logger.info(f"Recurring job {schedule.id} is due (scheduled for {schedule.hour:02d}:{schedule.minute:02d} in {user_timezone_str}).")
-                            run_job = True
-                        else:
-                            logger.info(f"Recurring job {schedule.id} has already run today at {schedule.last_run_at.astimezone(user_timezone)}.")
-
-                if run_job:
-                    logger.info(f"Preparing to execute job for schedule {schedule.id}...")
-                    content = db.query(Content).filter(Content.id == schedule.content_id).first()
-
-                    if not content:
-                        logger.error(f"Execution failed: Content {schedule.content_id} not found for schedule {schedule.id}.")
-                        schedule.status = "failed"
-                        schedule.error_message = "Content not found"
-                        db.commit()
-                        continue
-
-                    # Execute the upload logic, which is now DB-independent
-                    success = await execute_upload_logic(schedule, content)
-
-                    # Now, handle all database updates based on the result
-                    if success:
-                        if schedule.status == 'pending':
-                            schedule.status = 'completed'
-                            content.status = 'published'
-                            logger.info(f"One-time job {schedule.id} completed successfully.")
-                        elif schedule.status == 'recurring':
-                            schedule.day_counter += 1
-                            schedule.last_run_at = now_utc
-                            logger.info(f"Recurring job {schedule.id} completed successfully. Day counter is now {schedule.day_counter}.")
-                    else:
-                        schedule.status = 'failed'
-                        schedule.error_message = "Upload process failed. See logs for details."
-                        logger.error(f"Job {schedule.id} failed during execution.")
-
-                    db.commit()
-
-            except Exception as e:
-                logger.error(f"Error processing schedule {schedule.id}: {e}", exc_info=True)
+def _finish_run(db, schedule: Schedule, content: Content, error, now_utc: datetime, due_at: datetime, staged: bool):
+    """Records the result of a run (`error` is None on success) and releases the lease."""
+    success = error is None
+    outcome = "completed" if success else "failed"
+    # The staged upload was used up, or failed along with the run; a retry uploads in full.
+    clear_staged(schedule)
+    if success:
+        live_delay = (datetime.now(timezone.utc) - due_at).total_seconds()
+        PUBLISH_DELAY.labels(
+            platform=schedule.platform, post_type=content.post_type or "unknown", staged=str(staged).lower(),
+        ).observe(max(live_delay, 0.0))
+        logger.info(f"Schedule {schedule.id} went live {live_delay:.1f}s after it was due ({'pre-staged' if staged else 'full upload'}).")
+        retry_policy.record_success(schedule)
+        if schedule.status == 'pending':
+            schedule.status = 'completed'
+            content.status = 'published'
+            logger.info(f"One-time job {schedule.id} completed successfully.")
+        elif schedule.status == 'recurring':
+            schedule.day_counter += 1
+            schedule.last_run_at = now_utc
+            logger.info(f"Recurring job {schedule.id} completed successfully. Day counter is now {schedule.day_counter}.")
+    elif retry_policy.record_failure(schedule, error, now_utc):
+        # Stays active; refresh_next_run_at below makes it due again at next_attempt_at.
+        outcome = "retrying"
+    elif schedule.status == 'recurring':
+        # Out of retries, or not retryable (which includes an unknown outcome): this
+        # occurrence is served and error_message keeps why; run again at the next one.
+        schedule.retry_count = 0
+        schedule.last_run_at = now_utc
+        logger.error(f"Recurring job {schedule.id} gave up on today's run: {error}")
+    else:
+        if schedule.status == 'pending':
+            content.status = 'failed'
+        schedule.status = 'failed'
+        logger.error(f"Job {schedule.id} failed during execution: {error}")
 
+    refresh_next_run_at(schedule, now_utc)
+    release_lease(db, schedule.id, WORKER_ID)
+    db.commit()
+    SCHEDULER_JOBS.labels(outcome=outcome).inc()
+
+
+async def check_and_run_schedules(concurrency: int = None, per_account_concurrency: int = None):
+    """
+    Runs every schedule that is due right now, once.
+    - Fetches due schedules (`next_run_at <= now`) in indexed batches.
+    - Executes them up to `concurrency` at a time overall and
+      `per_account_concurrency` at a time per account. A concurrency of 1
+      runs them strictly one after another.
+    """
+    concurrency = concurrency or SCHEDULER_CONCURRENCY
+    per_account_concurrency = per_account_concurrency or SCHEDULER_PER_ACCOUNT_CONCURRENCY
+
+    logger.info("Checking for due schedules...")
+    now_utc = datetime.now(timezone.utc)
+    due = await asyncio.to_thread(_fetch_due, now_utc)
+
+    if not due:
+        logger.info("No due schedules found.")
+        return
+
+    logger.info(f"Found {len(due)} due schedule(s).")
+
+    if concurrency <= 1:
+        for schedule_id, _ in due:
+            await run_schedule(schedule_id, now_utc)
+        return
+
+    logger.info(f"Dispatching {len(due)} due job(s) with concurrency {concurrency} (per account: {per_account_concurrency}).")
+    global_limit = asyncio.Semaphore(concurrency)
+    account_limits = {}
+
+    async def _dispatch(schedule_id: int, account: str):
+        account_limit = account_limits.setdefault(account, asyncio.Semaphore(per_account_concurrency))
+        async with account_limit:
+            async with global_limit:
+                await run_schedule(schedule_id, now_utc)
+
+    await asyncio.gather(*(_dispatch(schedule_id, account) for schedule_id, account in due))
+
+
+def _fetch_due(now_utc: datetime):
+    """(schedule id, account key) for every schedule due at `now_utc`."""
+    db = SessionLocal()
+    try:
+        return [
+            (schedule.id, _account_key(schedule))
+            for batch in fetch_due_batches(db, now_utc, SCHEDULER_BATCH_SIZE)
+            for schedule in batch
+        ]
+    finally:
+        db.close()
+
+
+def _expire_upload_sessions():
+    db = SessionLocal()
+    try:
+        expire_upload_sessions(db, UPLOAD_FOLDER)
     finally:
         db.close()
 
 
+async def _sweep_upload_sessions(interval: float):
+    while True:
+        try:
+            await asyncio.to_thread(_expire_upload_sessions)
+        except Exception as e:
+            logger.error(f"Error expiring upload sessions: {e}", exc_info=True)
+        await asyncio.sleep(interval)
+
+
 async def main():
     """
-    Main function to start the scheduler service loop.
+    Main function to start the scheduler service.
+    Sleeps until the next schedule is due instead of polling, and is woken
+    early by the web app whenever a schedule is created.
     """
     logger.info("--- Starting Custom Scheduler Service ---")
+    start_scheduler_exporter()
+
+    engine = ScheduleEngine(
+        session_factory=SessionLocal,
+        runner=run_schedule,
+        account_key=_account_key,
+        concurrency=SCHEDULER_CONCURRENCY,
+        per_account_concurrency=SCHEDULER_PER_ACCOUNT_CONCURRENCY,
+        resync_interval=SCHEDULER_RESYNC_SECONDS,
+        plan_size=SCHEDULER_BATCH_SIZE,
+    )
+    transport = await start_wake_listener(engine.wake)
+    prestaging = None
+    if PRESTAGE_LEAD_SECONDS > 0:
+        prestaging = asyncio.create_task(Prestager(SessionLocal).run_forever())
+    sweeping = None
+    if UPLOAD_SESSION_SWEEP_SECONDS > 0:
+        sweeping = asyncio.create_task(_sweep_upload_sessions(UPLOAD_SESSION_SWEEP_SECONDS))
 
     try:
-        while True:
-            await check_and_run_schedules()
-            logger.info("Scheduler service sleeping for 60 seconds...")
-            await asyncio.sleep(60)
-    except (KeyboardInterrupt, SystemExit):
+        await engine.run_forever()
+    except (KeyboardInterrupt, SystemExit, asyncio.CancelledError):
         logger.info("Scheduler service shutting down.")
+    finally:
+        logger.info(f"Schedule lateness (seconds): {engine.lateness.snapshot()}")
+        if transport:
+            transport.close()
+        if prestaging:
+            prestaging.cancel()
+        if sweeping:
+            sweeping.cancel()
+        platform_executor.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
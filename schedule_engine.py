@@ -0,0 +1,227 @@
+import time
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import and_, or_
+
+from metrics import SCHEDULER_LATENESS, SCHEDULER_QUEUE_DEPTH, SCHEDULER_TICK_DURATION
+from models import Schedule
+from schedule_leases import ACTIVE_STATUSES, lease_available
+from schedule_times import as_utc, to_db_time
+
+logger = logging.getLogger(__name__)
+
+
+class LatenessStats:
+    """Tracks how late jobs start compared to their due time, in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds: float):
+        seconds = max(seconds, 0.0)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+            "last": round(self.last, 3),
+        }
+
+
+def fetch_due_batches(db, until: datetime, batch_size: int = 500) -> Iterator[List[Schedule]]:
+    """
+    Yields active, unleased schedules with next_run_at <= `until`, earliest
+    first, in batches of `batch_size`. Served by the (status, next_run_at)
+    index, so the cost depends on the number of due rows rather than on all
+    schedules.
+    """
+    lease_filter = lease_available(until)
+    until = to_db_time(until)
+    last_key = None
+    while True:
+        query = db.query(Schedule).filter(
+            Schedule.status.in_(ACTIVE_STATUSES),
+            Schedule.next_run_at.isnot(None),
+            Schedule.next_run_at <= until,
+            lease_filter,
+        )
+        if last_key is not None:
+            last_time, last_id = last_key
+            query = query.filter(or_(
+                Schedule.next_run_at > last_time,
+                and_(Schedule.next_run_at == last_time, Schedule.id > last_id),
+            ))
+        batch = query.order_by(Schedule.next_run_at, Schedule.id).limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last_key = (batch[-1].next_run_at, batch[-1].id)
+
+
+class ScheduleEngine:
+    """
+    Event-driven scheduler core.
+
+    Keeps a min-heap of (fire time, schedule id) and sleeps exactly until the
+    earliest one is due, or until it is woken because schedules changed. The
+    heap holds the `plan_size` earliest schedules by their persisted
+    next_run_at and is rebuilt on wake-up, after a job finishes, and every
+    `resync_interval` seconds as a safety net.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        runner: Callable[[int, datetime], Awaitable[None]],
+        account_key: Callable[[Schedule], str],
+        concurrency: int = 4,
+        per_account_concurrency: int = 1,
+        resync_interval: float = 300,
+        plan_size: int = 500,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        self._session_factory = session_factory
+        self._runner = runner
+        self._account_key = account_key
+        self._per_account_concurrency = per_account_concurrency
+        self._resync_interval = resync_interval
+        self._plan_size = plan_size
+        self._clock = clock
+
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._running: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._global_limit = asyncio.Semaphore(concurrency)
+        self._account_limits: Dict[str, asyncio.Semaphore] = {}
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+        self.lateness = LatenessStats()
+
+    # --- Planning ---
+
+    def resync(self):
+        """Rebuilds the heap from the earliest active schedules in the database."""
+        db = self._session_factory()
+        try:
+            upcoming = db.query(Schedule).filter(
+                Schedule.status.in_(ACTIVE_STATUSES),
+                Schedule.next_run_at.isnot(None),
+            ).order_by(Schedule.next_run_at, Schedule.id).limit(self._plan_size + len(self._running)).all()
+            heap = [
+                (self._planned_time(schedule), schedule.id, self._account_key(schedule))
+                for schedule in upcoming if schedule.id not in self._running
+            ][:self._plan_size]
+        finally:
+            db.close()
+
+        heapq.heapify(heap)
+        self._heap = heap
+        if heap:
+            logger.info(f"Planned {len(heap)} schedule(s); next is {heap[0][1]} at {heap[0][0].isoformat()}.")
+        else:
+            logger.info("No active schedules planned.")
+
+    @staticmethod
+    def _planned_time(schedule: Schedule) -> datetime:
+        """
+        A schedule leased by another scheduler process is looked at again when
+        that lease expires, in case the process died while running it.
+        """
+        planned = as_utc(schedule.next_run_at)
+        lease_expires_at = as_utc(schedule.lease_expires_at)
+        if lease_expires_at and lease_expires_at > planned:
+            return lease_expires_at
+        return planned
+
+    def wake(self):
+        """Asks the engine to re-plan as soon as possible."""
+        self._wake.set()
+
+    def seconds_until_next(self) -> float:
+        if not self._heap:
+            return self._resync_interval
+        delay = (self._heap[0][0] - self._clock()).total_seconds()
+        return max(0.0, min(delay, self._resync_interval))
+
+    # --- Execution ---
+
+    def dispatch_due(self) -> int:
+        """Starts every job whose fire time has passed. Returns how many were started."""
+        now_utc = self._clock()
+        started = 0
+        while self._heap and self._heap[0][0] <= now_utc:
+            due_at, schedule_id, account = heapq.heappop(self._heap)
+            if schedule_id in self._running:
+                continue
+            self._running.add(schedule_id)
+            task = asyncio.create_task(self._run(schedule_id, account, due_at))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            started += 1
+        return started
+
+    async def _run(self, schedule_id: int, account: str, due_at: datetime):
+        account_limit = self._account_limits.setdefault(account, asyncio.Semaphore(self._per_account_concurrency))
+        try:
+            async with account_limit:
+                async with self._global_limit:
+                    started_at = self._clock()
+                    lateness = (started_at - due_at).total_seconds()
+                    self.lateness.record(lateness)
+                    SCHEDULER_LATENESS.observe(max(lateness, 0.0))
+                    logger.info(f"Running schedule {schedule_id} (due {due_at.isoformat()}, {lateness:.1f}s late).")
+                    await self._runner(schedule_id, started_at)
+        except Exception as e:
+            logger.error(f"Error running schedule {schedule_id}: {e}", exc_info=True)
+        finally:
+            self._running.discard(schedule_id)
+            # The job changed its row (status, last_run_at), so plan again.
+            self.wake()
+
+    def _record_queue_depth(self):
+        now_utc = self._clock()
+        due = sum(1 for due_at, _, _ in self._heap if due_at <= now_utc)
+        SCHEDULER_QUEUE_DEPTH.labels(state="planned").set(len(self._heap) - due)
+        SCHEDULER_QUEUE_DEPTH.labels(state="due").set(due)
+        SCHEDULER_QUEUE_DEPTH.labels(state="running").set(len(self._running))
+
+    async def run_forever(self):
+        self.resync()
+        while not self._stopping:
+            started = time.perf_counter()
+            self.dispatch_due()
+            self._record_queue_depth()
+            SCHEDULER_TICK_DURATION.observe(time.perf_counter() - started)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.seconds_until_next())
+                woken = True
+            except asyncio.TimeoutError:
+                woken = False
+
+            if woken:
+                self._wake.clear()
+                self.resync()
+            elif not self._heap or self._heap[0][0] > self._clock():
+                # Nothing became due: this was the periodic safety resync.
+                self.resync()
+
+    async def stop(self):
+        self._stopping = True
+        self.wake()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
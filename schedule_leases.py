@@ -0,0 +1,126 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import or_
+
+from models import Schedule
+from schedule_times import to_db_time
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'recurring')
+
+# How long a claimed schedule stays reserved for one worker without renewal.
+# A worker that crashes mid-upload loses its claim after this long.
+SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+
+# Identifies this scheduler process in lease_owner.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def lease_available(now: datetime):
+    """SQL condition: the schedule is not leased, or its lease has expired."""
+    now = to_db_time(now)
+    return or_(Schedule.lease_expires_at.is_(None), Schedule.lease_expires_at < now)
+
+
+def claim_schedule(db, schedule_id: int, owner: str, now: datetime, lease_seconds: float = None) -> bool:
+    """
+    Atomically reserves a due schedule for `owner`.
+
+    A single conditional UPDATE does the claim, so when several scheduler
+    processes race for the same row exactly one of them sees rowcount == 1.
+    Works the same on SQLite and MySQL.
+    """
+    lease_seconds = lease_seconds or SCHEDULER_LEASE_SECONDS
+    claimed = db.query(Schedule).filter(
+        Schedule.id == schedule_id,
+        Schedule.status.in_(ACTIVE_STATUSES),
+        Schedule.next_run_at <= to_db_time(now),
+        lease_available(now),
+    ).update({
+        Schedule.lease_owner: owner,
+        Schedule.lease_expires_at: to_db_time(now + timedelta(seconds=lease_seconds)),
+    }, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def renew_lease(db, schedule_id: int, owner: str, now: datetime, lease_seconds: float = None) -> bool:
+    """Extends a lease still held by `owner`. Returns False if it was lost."""
+    lease_seconds = lease_seconds or SCHEDULER_LEASE_SECONDS
+    renewed = db.query(Schedule).filter(
+        Schedule.id == schedule_id,
+        Schedule.lease_owner == owner,
+    ).update({
+        Schedule.lease_expires_at: to_db_time(now + timedelta(seconds=lease_seconds)),
+    }, synchronize_session=False)
+    db.commit()
+    return renewed == 1
+
+
+def release_lease(db, schedule_id: int, owner: str) -> bool:
+    """
+    Clears a lease still held by `owner`; persisted with the caller's commit.
+    A worker whose lease expired and was taken over leaves the new owner's
+    lease alone. Returns False in that case.
+    """
+    released = db.query(Schedule).filter(
+        Schedule.id == schedule_id,
+        Schedule.lease_owner == owner,
+    ).update({
+        Schedule.lease_owner: None,
+        Schedule.lease_expires_at: None,
+    }, synchronize_session=False)
+    if released != 1:
+        logger.warning(f"Schedule {schedule_id} is leased by another worker now; leaving its lease in place.")
+    return released == 1
+
+
+class LeaseKeeper:
+    """
+    Renews a schedule's lease in the background while its upload runs,
+    so long uploads are not mistaken for crashed workers.
+    """
+
+    def __init__(self, session_factory, schedule_id: int, owner: str,
+                 clock: Callable[[], datetime], lease_seconds: float = None):
+        self._session_factory = session_factory
+        self._schedule_id = schedule_id
+        self._owner = owner
+        self._clock = clock
+        self._lease_seconds = lease_seconds or SCHEDULER_LEASE_SECONDS
+        self._task = None
+
+    async def _renew_forever(self):
+        while True:
+            await asyncio.sleep(self._lease_seconds / 3)
+            try:
+                if not await asyncio.to_thread(self._renew):
+                    logger.warning(f"Lost the lease on schedule {self._schedule_id}; another worker may take it over.")
+                    return
+            except Exception as e:
+                logger.error(f"Could not renew lease on schedule {self._schedule_id}: {e}")
+
+    def _renew(self) -> bool:
+        db = self._session_factory()
+        try:
+            return renew_lease(db, self._schedule_id, self._owner, self._clock(), self._lease_seconds)
+        finally:
+            db.close()
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._renew_forever())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
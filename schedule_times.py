@@ -0,0 +1,96 @@
+import os
+import pytz
+from datetime import datetime, timezone, timedelta, time
+from typing import Optional
+
+from models import Schedule
+
+# How late a recurring occurrence may still run, e.g. after a scheduler
+# restart or a backlog of slow uploads. Older occurrences are skipped.
+SCHEDULER_MISFIRE_GRACE_SECONDS = float(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", "3600"))
+
+
+def get_user_timezone():
+    """The timezone recurring schedules are expressed in (TIMEZONE, default UTC)."""
+    return pytz.timezone(os.getenv('TIMEZONE', 'UTC'))
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treats naive datetimes read back from the database as UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def next_occurrence(hour: int, minute: int, after: datetime, tz=None) -> datetime:
+    """
+    Returns the first `hour:minute` wall-clock time in `tz` strictly after `after`,
+    as an aware UTC datetime. DST gaps and overlaps are resolved by pytz.
+    """
+    tz = tz or get_user_timezone()
+    after = as_utc(after)
+    candidate_date = after.astimezone(tz).date()
+    while True:
+        local = tz.normalize(tz.localize(datetime.combine(candidate_date, time(hour, minute))))
+        candidate = local.astimezone(timezone.utc)
+        if candidate > after:
+            return candidate
+        candidate_date += timedelta(days=1)
+
+
+def previous_occurrence(hour: int, minute: int, at: datetime, tz=None) -> datetime:
+    """The last `hour:minute` wall-clock time in `tz` at or before `at`, as an aware UTC datetime."""
+    tz = tz or get_user_timezone()
+    at = as_utc(at)
+    candidate_date = at.astimezone(tz).date()
+    while True:
+        local = tz.normalize(tz.localize(datetime.combine(candidate_date, time(hour, minute))))
+        candidate = local.astimezone(timezone.utc)
+        if candidate <= at:
+            return candidate
+        candidate_date -= timedelta(days=1)
+
+
+def to_db_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Converts a datetime to the naive UTC form stored in DateTime columns."""
+    value = as_utc(value)
+    return value.replace(tzinfo=None) if value else None
+
+
+def fire_time(schedule: Schedule, now_utc: datetime, tz=None, grace_seconds: float = None) -> Optional[datetime]:
+    """
+    When an active schedule should next run, as an aware UTC datetime.
+
+    One-time jobs fire at their scheduled_time. A recurring job is due when
+    its latest `hour:minute` occurrence in the user's timezone is after its
+    last run (or, if it never ran, after it was created) and at most
+    `grace_seconds` ago; any earlier missed occurrences are coalesced into
+    that one run. Otherwise it fires at its next occurrence.
+    A failed run waiting for a retry fires at its next_attempt_at instead.
+    """
+    # getattr: migration 0001 passes rows from before next_attempt_at existed
+    next_attempt_at = getattr(schedule, "next_attempt_at", None)
+    if schedule.status in ('pending', 'recurring') and next_attempt_at is not None:
+        return as_utc(next_attempt_at)
+
+    if schedule.status == 'pending':
+        return as_utc(schedule.scheduled_time)
+
+    if schedule.status == 'recurring' and schedule.hour is not None and schedule.minute is not None:
+        grace_seconds = SCHEDULER_MISFIRE_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        # Occurrences up to here are served. A new schedule still catches an
+        # occurrence earlier in the minute it was created, like the old poller.
+        served_until = as_utc(schedule.last_run_at) or (as_utc(schedule.scheduled_time) or now_utc) - timedelta(seconds=60)
+        latest = previous_occurrence(schedule.hour, schedule.minute, now_utc, tz)
+        if latest > served_until and (now_utc - latest).total_seconds() <= grace_seconds:
+            return latest
+        return next_occurrence(schedule.hour, schedule.minute, max(now_utc, served_until), tz)
+
+    return None
+
+
+def refresh_next_run_at(schedule: Schedule, now_utc: datetime, tz=None):
+    """Recomputes the persisted next_run_at; inactive schedules get None."""
+    schedule.next_run_at = to_db_time(fire_time(schedule, now_utc, tz))
@@ -1,8 +1,11 @@
 import logging
-from copy import deepcopy
+from dataclasses import replace
 
 from models import Schedule, Content
 from automation import ContentUploader
+from upload_job import UploadJob
+from retry_policy import UploadError
+from prestage import load_staged
 
 logger = logging.getLogger(__name__)
 
@@ -10,24 +13,24 @@ logger = logging.getLogger(__name__)
 async def execute_upload_logic(schedule: Schedule, content_to_upload: Content) -> bool:
     """
     This is the core logic that performs the upload for a given schedule.
-    It does NOT interact with the database. It returns True on success, False on failure.
+    It does NOT interact with the database. It returns True on success and raises
+    UploadError on failure, so the caller can decide whether to retry.
     """
     logger.info(f"--- Executing job for schedule_id: {schedule.id} ---")
     try:
-        # For recurring jobs with a day counter, we create a temporary copy
-        # of the content to modify its caption.
+        # A plain snapshot of the content; the schedule's account wins over the
+        # content's (both None: the .env account).
+        job = UploadJob.from_content(content_to_upload, schedule.platform, schedule.account)
+        # For recurring jobs with a day counter, this run gets its own caption.
         if schedule.status == 'recurring' and schedule.use_day_counter:
-            content_for_this_run = deepcopy(content_to_upload)
-            day = schedule.day_counter
-            original_caption = content_to_upload.caption or ""
-            content_for_this_run.caption = f"Day {day} {original_caption}"
-            logger.info(f"Applying dynamic caption for recurring job: '{content_for_this_run.caption}'")
-        else:
-            content_for_this_run = content_to_upload
+            job = replace(job, caption=f"Day {schedule.day_counter} {job.caption}")
+            logger.info(f"Applying dynamic caption for recurring job: '{job.caption}'")
 
-        logger.info(f"Found content '{content_for_this_run.filename}'. Starting upload to {schedule.platform}...")
+        logger.info(f"Found content '{content_to_upload.filename}'. Starting upload to {schedule.platform}...")
         uploader = ContentUploader()
-        success = await uploader.upload_to_platform(content_for_this_run, schedule.platform)
+        # Media uploaded ahead of time by the Prestager only needs configuring with the final caption.
+        staged = load_staged(schedule)
+        success = await uploader.upload_to_platform(job, staged)
 
         if success:
             logger.info(f"✅ Successfully uploaded content for schedule {schedule.id}.")
@@ -36,9 +39,11 @@ async def execute_upload_logic(schedule: Schedule, content_to_upload: Content) -
 
         return success
 
+    except UploadError:
+        raise
     except Exception as e:
         logging.error(f"An unexpected error in execute_upload_logic for schedule {schedule.id}: {e}", exc_info=True)
-        return False
+        raise UploadError.from_exception(e) from e
     finally:
         # The session is managed by the caller, so we don't close it here.
         logger.info(f"--- Finished execution for schedule_id: {schedule.id} ---")
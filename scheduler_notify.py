@@ -0,0 +1,91 @@
+import os
+import glob
+import socket
+import asyncio
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Local datagram sockets the schedulers listen on, one per process at
+# `<SCHEDULER_WAKE_SOCKET>.<pid>`. The web app sends a byte to each of them
+# whenever a schedule is created so every scheduler re-plans immediately.
+SCHEDULER_WAKE_SOCKET = os.getenv("SCHEDULER_WAKE_SOCKET", "/tmp/daily_content_scheduler.sock")
+
+
+def _listener_paths(path: str):
+    return glob.glob(f"{glob.escape(path)}.*")
+
+
+def _is_live(path: str) -> bool:
+    """Whether a process is still bound to the socket; connecting to a leftover file is refused."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.connect(path)
+            return True
+        except OSError:
+            return False
+
+
+def notify_scheduler(path: str = None) -> bool:
+    """
+    Wakes every scheduler process on this host. Never blocks and never raises:
+    a scheduler that is not reached picks the change up on its next periodic
+    resync. Returns True when at least one scheduler was notified.
+    """
+    path = path or SCHEDULER_WAKE_SOCKET
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    delivered = False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.setblocking(False)
+        for target in _listener_paths(path):
+            try:
+                sock.sendto(b"wake", target)
+                delivered = True
+            except OSError as e:
+                logger.debug(f"Scheduler wake-up to {target} not delivered ({e}).")
+    return delivered
+
+
+class _WakeProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_wake: Callable[[], None], path: str):
+        self.on_wake = on_wake
+        self.path = path
+
+    def datagram_received(self, data, addr):
+        self.on_wake()
+
+    def connection_lost(self, exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+async def start_wake_listener(on_wake: Callable[[], None], path: str = None):
+    """
+    Binds this process's wake-up socket and calls `on_wake` for every
+    notification; closing the transport removes the socket. Returns the
+    transport, or None when UNIX sockets are unavailable.
+    """
+    path = path or SCHEDULER_WAKE_SOCKET
+    if not hasattr(socket, "AF_UNIX"):
+        logger.warning("UNIX sockets are not available; the scheduler will rely on periodic resyncs only.")
+        return None
+
+    # Sockets left behind by schedulers that did not exit cleanly; live ones belong to other schedulers
+    for leftover in _listener_paths(path):
+        if not _is_live(leftover):
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass  # Another scheduler starting up removed it first
+
+    own_path = f"{path}.{os.getpid()}"
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _WakeProtocol(on_wake, own_path), local_addr=own_path, family=socket.AF_UNIX
+    )
+    logger.info(f"Listening for schedule wake-ups on {own_path}")
+    return transport
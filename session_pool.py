@@ -0,0 +1,193 @@
+import os
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from instagrapi import Client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# instagrapi is imported on first use, so that importing this module stays cheap
+def _new_client() -> "Client":
+    from instagrapi import Client
+    return Client()
+
+
+class SessionPool:
+    """
+    Keeps one warm, validated instagrapi Client per account in memory.
+
+    The first request for an account loads its session file, logs in and
+    verifies the session once. Later requests reuse that client directly; the
+    session is only re-validated when Instagram answers with LoginRequired.
+    Only an action marked idempotent is then retried: one that publishes may
+    already have gone out before the session was rejected.
+    Calls for the same account are serialized because instagrapi clients are
+    not thread-safe.
+    """
+
+    def __init__(
+        self,
+        client_factory: Optional[Callable[[], "Client"]] = None,
+        login_observer: Optional[Callable[[str, float], None]] = None,
+    ):
+        self._client_factory = client_factory or _new_client
+        # Called with ("login" | "relogin", seconds) after each successful login
+        self._login_observer = login_observer
+        self._clients: Dict[str, "Client"] = {}
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+
+        # Counters, readable through stats()
+        self.hits = 0
+        self.misses = 0
+        self.relogins = 0
+        self.login_seconds = 0.0
+
+    def _lock_for(self, username: str) -> threading.RLock:
+        with self._locks_guard:
+            lock = self._locks.get(username)
+            if lock is None:
+                lock = self._locks[username] = threading.RLock()
+            return lock
+
+    @staticmethod
+    def _persist_settings(cl: "Client", session_file: Path):
+        """Writes the client settings atomically so a crash never leaves a half-written session file."""
+        session_file = Path(session_file)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{session_file.name}.", dir=session_file.parent or ".")
+        os.close(fd)
+        try:
+            cl.dump_settings(tmp_path)
+            os.replace(tmp_path, session_file)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _record_login(self, kind: str, seconds: float):
+        self.login_seconds += seconds
+        if self._login_observer:
+            self._login_observer(kind, seconds)
+
+    def _login(self, username: str, password: str, session_file: Path) -> "Client":
+        started = time.monotonic()
+        cl = self._client_factory()
+        if Path(session_file).exists():
+            logger.info(f"Loading session from {session_file}...")
+            cl.load_settings(session_file)
+
+        # login() reuses the loaded session when it is still valid,
+        # otherwise it performs a full username/password login.
+        cl.login(username, password)
+        cl.get_timeline_feed()  # Verify the session once, when the client enters the pool
+        self._persist_settings(cl, session_file)
+        self._record_login("login", time.monotonic() - started)
+        logger.info(f"Session for '{username}' is valid and has been added to the pool.")
+        return cl
+
+    def get_client(self, username: str, password: str, session_file: Path) -> "Client":
+        """Returns the pooled client for an account, logging in on first use."""
+        with self._lock_for(username):
+            cl = self._clients.get(username)
+            if cl is not None:
+                self.hits += 1
+                return cl
+            self.misses += 1
+            cl = self._login(username, password, session_file)
+            self._clients[username] = cl
+            return cl
+
+    def relogin(self, username: str, password: str, session_file: Path) -> "Client":
+        """Re-authenticates an account whose session was rejected and persists the new settings."""
+        with self._lock_for(username):
+            self.relogins += 1
+            started = time.monotonic()
+            cl = self._clients.get(username)
+            if cl is None:
+                cl = self._client_factory()
+            cl.login(username, password, relogin=True)
+            self._persist_settings(cl, session_file)
+            self._record_login("relogin", time.monotonic() - started)
+            self._clients[username] = cl
+            logger.info(f"Re-login for '{username}' succeeded.")
+            return cl
+
+    def _relogin_after_rejection(self, username: str, password: str, session_file: Path, idempotent: bool):
+        """Re-logs in after LoginRequired, so the next call for the account starts with a valid session."""
+        if idempotent:
+            logger.warning(f"Session for '{username}' was rejected. Re-logging in and retrying once.")
+        else:
+            logger.warning(f"Session for '{username}' was rejected. Re-logging in; the action is not retried here.")
+        self.relogin(username, password, session_file)
+
+    def run(
+        self, username: str, password: str, session_file: Path, action: Callable[["Client"], T],
+        idempotent: bool = False,
+    ) -> T:
+        """
+        Runs `action(client)` with the pooled client for an account. If the
+        session turns out to be expired, logs in again; an `idempotent` action
+        is then retried once, any other gets the LoginRequired raised.
+        """
+        from instagrapi.exceptions import LoginRequired
+        with self._lock_for(username):
+            cl = self.get_client(username, password, session_file)
+            try:
+                return action(cl)
+            except LoginRequired:
+                self._relogin_after_rejection(username, password, session_file, idempotent)
+                if not idempotent:
+                    raise
+                return action(self._clients[username])
+
+    def _detached_client(self, username: str, password: str, session_file: Path) -> "Client":
+        """A new client carrying a copy of the pooled client's session; only the copy takes the account lock."""
+        with self._lock_for(username):
+            settings = self.get_client(username, password, session_file).get_settings()
+        cl = self._client_factory()
+        cl.set_settings(settings)
+        return cl
+
+    def run_detached(
+        self, username: str, password: str, session_file: Path, action: Callable[["Client"], T],
+        idempotent: bool = False,
+    ) -> T:
+        """
+        Like run(), but `action` gets a separate client sharing the account's
+        session and runs without holding the account lock, so a long transfer
+        does not hold up other calls for the account.
+        """
+        from instagrapi.exceptions import LoginRequired
+        cl = self._detached_client(username, password, session_file)
+        try:
+            return action(cl)
+        except LoginRequired:
+            self._relogin_after_rejection(username, password, session_file, idempotent)
+            if not idempotent:
+                raise
+            return action(self._detached_client(username, password, session_file))
+
+    def invalidate(self, username: Optional[str] = None):
+        """Drops one pooled client, or all of them when no username is given."""
+        with self._locks_guard:
+            if username is None:
+                self._clients.clear()
+            else:
+                self._clients.pop(username, None)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "clients": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "relogins": self.relogins,
+            "login_seconds": round(self.login_seconds, 3),
+        }
@@ -0,0 +1,168 @@
+import os
+import re
+import shutil
+import hashlib
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+import aiofiles
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from an upload and written to disk per step.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Size of one chunk in the resumable upload protocol.
+RESUMABLE_CHUNK_SIZE = int(os.getenv("RESUMABLE_CHUNK_SIZE", str(8 * 1024 * 1024)))
+
+_CHUNK_NAME = re.compile(r"^(\d+)\.part$")
+
+
+class FileTooLarge(Exception):
+    """Raised when an upload crosses its size budget while being streamed."""
+
+
+async def _iter_upload(upload: UploadFile, chunk_size: int) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def write_stream(chunks: AsyncIterator[bytes], dest_path: str, max_bytes: int,
+                       label: str = "upload") -> Tuple[int, str]:
+    """
+    Writes an async stream of byte chunks to `dest_path`, hashing it on the way.
+
+    Aborts as soon as more than `max_bytes` have been received, removing the
+    partial file, and raises FileTooLarge. Returns (size in bytes, SHA-256 hex digest).
+    """
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(dest_path, 'wb') as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise FileTooLarge(f"{label} exceeds the remaining upload budget of {max_bytes} bytes")
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        remove_quietly(dest_path)
+        raise
+    return size, digest.hexdigest()
+
+
+async def stream_to_file(upload: UploadFile, dest_path: str, max_bytes: int,
+                         chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[int, str]:
+    """
+    Copies an UploadFile to `dest_path` in fixed-size chunks, so only one chunk
+    is held in memory at a time. See write_stream for limits and the return value.
+    """
+    return await write_stream(_iter_upload(upload, chunk_size), dest_path, max_bytes, upload.filename)
+
+
+def remove_quietly(path: str):
+    """Deletes a file if it exists, logging instead of raising on failure."""
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        logger.warning(f"Could not delete file {path}: {e}")
+
+
+# --- Resumable upload chunks ---
+#
+# Each upload session owns a directory of `<index>.part` files. A chunk only
+# appears under its final name once it has been written completely, so the
+# directory listing is the source of truth for what has been received, and
+# chunks can arrive in any order and in parallel.
+
+def session_dir(upload_folder: str, session_id: str) -> str:
+    return os.path.join(upload_folder, ".sessions", session_id)
+
+
+def chunk_count(total_size: int, chunk_size: int) -> int:
+    return max(1, -(-total_size // chunk_size))
+
+
+def expected_chunk_length(index: int, total_size: int, chunk_size: int) -> int:
+    """Every chunk is `chunk_size` bytes except possibly the last one."""
+    if index == chunk_count(total_size, chunk_size) - 1:
+        return total_size - index * chunk_size
+    return chunk_size
+
+
+async def write_chunk(upload_folder: str, session_id: str, index: int,
+                      chunks: AsyncIterator[bytes], expected_length: int) -> Tuple[int, str]:
+    """Stores one chunk atomically. Raises FileTooLarge or ValueError on a length mismatch."""
+    directory = session_dir(upload_folder, session_id)
+    os.makedirs(directory, exist_ok=True)
+    final_path = os.path.join(directory, f"{index}.part")
+    tmp_path = f"{final_path}.{os.getpid()}.{id(chunks)}.tmp"
+
+    size, digest = await write_stream(chunks, tmp_path, expected_length, f"chunk {index}")
+    if size != expected_length:
+        remove_quietly(tmp_path)
+        raise ValueError(f"Chunk {index} has {size} bytes, expected {expected_length}")
+    os.replace(tmp_path, final_path)
+    return size, digest
+
+
+def received_chunks(upload_folder: str, session_id: str) -> List[int]:
+    directory = session_dir(upload_folder, session_id)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(m.group(1)) for m in map(_CHUNK_NAME.match, os.listdir(directory)) if m)
+
+
+def missing_chunks(upload_folder: str, session_id: str, total_size: int, chunk_size: int) -> List[int]:
+    received = set(received_chunks(upload_folder, session_id))
+    return [i for i in range(chunk_count(total_size, chunk_size)) if i not in received]
+
+
+def assemble_chunks(upload_folder: str, session_id: str, total_size: int, chunk_size: int,
+                    dest_path: str) -> Tuple[int, str]:
+    """
+    Concatenates a complete session's chunks into `dest_path`. Returns
+    (size in bytes, SHA-256 hex digest). The chunks are kept, so a finalize
+    that fails later can be retried; discard_session once it has committed.
+    """
+    directory = session_dir(upload_folder, session_id)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, 'wb') as out:
+            for index in range(chunk_count(total_size, chunk_size)):
+                with open(os.path.join(directory, f"{index}.part"), 'rb') as part:
+                    while True:
+                        block = part.read(UPLOAD_CHUNK_SIZE)
+                        if not block:
+                            break
+                        digest.update(block)
+                        out.write(block)
+                        size += len(block)
+    except BaseException:
+        remove_quietly(dest_path)
+        raise
+    return size, digest.hexdigest()
+
+
+def discard_session(upload_folder: str, session_id: str):
+    shutil.rmtree(session_dir(upload_folder, session_id), ignore_errors=True)
+
+
+def session_dirs(upload_folder: str) -> List[str]:
+    """Ids of the sessions that have a chunk directory."""
+    root = os.path.join(upload_folder, ".sessions")
+    return os.listdir(root) if os.path.isdir(root) else []
+
+
+def last_chunk_time(upload_folder: str, session_id: str) -> Optional[float]:
+    """When a chunk last arrived for a session (its directory's mtime), or None."""
+    try:
+        return os.path.getmtime(session_dir(upload_folder, session_id))
+    except OSError:
+        return None
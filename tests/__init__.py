@@ -0,0 +1,36 @@
+import os
+import asyncio
+
+# Modules under test that open `database` without an explicit URL get a
+# throwaway in-memory database instead of the default ./daily_content.db.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+
+
+def run_async(coro):
+    """
+    Runs a coroutine on a private event loop. Unlike asyncio.run, it leaves the
+    current event loop set, which tests calling asyncio.get_event_loop rely on.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def memory_engine():
+    """An in-memory SQLite database with the app schema; StaticPool shares its one connection across sessions."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def memory_sessionmaker(engine=None):
+    """A session factory bound to `engine`, or to a fresh memory_engine()."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine or memory_engine())
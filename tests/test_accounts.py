@@ -0,0 +1,100 @@
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instagram_api
+from automation import ContentUploader
+from models import Account, Content
+from retry_policy import UploadError
+from upload_job import UploadJob
+from tests import run_async
+
+
+class TestAccountCredentials(unittest.TestCase):
+
+    def make_account(self, **kwargs):
+        account = Account(id=7, platform="instagram", username="brand", is_active=True, **kwargs)
+        account.set_credentials("s3cret")
+        return account
+
+    def test_password_is_encrypted_and_recoverable(self):
+        account = self.make_account()
+
+        self.assertNotIn("s3cret", account.password)
+        self.assertEqual(account.get_credentials(), "s3cret")
+
+    def test_each_account_has_its_own_session_file_and_rate_key(self):
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                patch('instagram_api.SESSIONS_FOLDER', Path(tmpdir)):
+            credentials = instagram_api.credentials_for(self.make_account())
+
+        self.assertEqual(credentials.username, "brand")
+        self.assertEqual(credentials.password, "s3cret")
+        self.assertEqual(credentials.session_file, Path(tmpdir) / "7.json")
+        self.assertEqual(credentials.rate_key, "instagram:7")
+
+    def test_session_file_stays_in_the_sessions_folder_whatever_the_username(self):
+        account = self.make_account()
+        account.username = "../../x"
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                patch('instagram_api.SESSIONS_FOLDER', Path(tmpdir)):
+            credentials = instagram_api.credentials_for(account)
+
+        self.assertEqual(credentials.session_file.parent, Path(tmpdir))
+
+    def test_disabled_account_is_a_permanent_error(self):
+        account = self.make_account()
+        account.is_active = False
+
+        with self.assertRaises(UploadError) as raised:
+            instagram_api.credentials_for(account)
+        self.assertFalse(raised.exception.retryable)
+
+
+    def test_legacy_bcrypt_password_asks_for_reentry(self):
+        account = Account(id=8, platform="instagram", username="old", is_active=True,
+                          password="$2b$12$" + "x" * 53)
+        self.assertTrue(account.needs_credentials)
+
+        with self.assertRaises(UploadError) as raised:
+            instagram_api.credentials_for(account)
+        self.assertEqual(raised.exception.error_class, "auth")
+        self.assertFalse(raised.exception.retryable)
+        self.assertIn("re-enter", str(raised.exception))
+
+        account.set_credentials("s3cret")
+        self.assertFalse(account.needs_credentials)
+        self.assertEqual(account.get_credentials(), "s3cret")
+
+
+class TestAccountDispatch(unittest.TestCase):
+
+    @patch('automation.upload_photo', return_value=True)
+    def test_content_account_is_passed_to_the_uploader(self, mock_upload_photo):
+        account = Account(id=3, platform="instagram", username="brand", is_active=True)
+        account.set_credentials("pw")
+        content = Content(post_type='photo', file_path='/path/photo.jpg', caption='A photo', account=account)
+
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                patch('instagram_api.SESSIONS_FOLDER', Path(tmpdir)):
+            result = run_async(ContentUploader().upload_to_platform(UploadJob.from_content(content, "instagram")))
+
+        self.assertTrue(result)
+        args, kwargs = mock_upload_photo.call_args
+        self.assertEqual(args, ('/path/photo.jpg', 'A photo'))
+        self.assertEqual(kwargs["account"].username, "brand")
+
+    def test_account_of_another_platform_is_rejected(self):
+        account = Account(id=4, platform="tiktok", username="brand", is_active=True)
+        content = Content(post_type='photo', file_path='/path/photo.jpg')
+
+        with self.assertRaises(UploadError):
+            UploadJob.from_content(content, "instagram", account)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import threading
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import HTTPException
+
+import auth
+from auth import TokenClaimsCache
+from tests import run_async
+
+
+class TestPasswordPool(unittest.TestCase):
+
+    def test_hash_and_verify_run_in_the_bcrypt_pool(self):
+        threads = []
+
+        def fake_hash(password):
+            threads.append(threading.current_thread().name)
+            return f"hashed:{password}"
+
+        def fake_verify(password, hashed):
+            threads.append(threading.current_thread().name)
+            return hashed == f"hashed:{password}"
+
+        with patch.object(auth.pwd_context, "hash", side_effect=fake_hash), \
+                patch.object(auth.pwd_context, "verify", side_effect=fake_verify):
+            hashed = run_async(auth.get_password_hash_async("s3cret"))
+            self.assertTrue(run_async(auth.verify_password_async("s3cret", hashed)))
+            self.assertFalse(run_async(auth.verify_password_async("wrong", hashed)))
+
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(all(name.startswith("bcrypt") for name in threads))
+        self.assertNotIn(threading.current_thread().name, threads)
+
+
+class TestTokenClaimsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = TokenClaimsCache(maxsize=2, clock=lambda: self.now)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put("a", {"exp": 2000})
+        self.cache.put("b", {"exp": 2000})
+        self.cache.get("a")
+        self.cache.put("c", {"exp": 2000})
+
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+    def test_expired_token_is_not_served(self):
+        self.cache.put("a", {"exp": 1500})
+        self.now = 1500.0
+        self.assertIsNone(self.cache.get("a"))
+
+
+class TestCurrentUser(unittest.TestCase):
+
+    def setUp(self):
+        auth.token_cache.clear()
+        self.addCleanup(auth.token_cache.clear)
+
+    def test_decodes_each_token_once(self):
+        token = auth.create_access_token({"sub": "admin"})
+
+        with patch("auth.jwt.decode", wraps=auth.jwt.decode) as decode:
+            first = run_async(auth.get_current_user(token))
+            second = run_async(auth.get_current_user(token))
+
+        self.assertEqual(first, {"username": "admin"})
+        self.assertEqual(second, first)
+        decode.assert_called_once()
+
+    def test_expired_token_is_rejected(self):
+        token = auth.create_access_token({"sub": "admin"}, expires_delta=timedelta(seconds=-1))
+
+        with self.assertRaises(HTTPException):
+            run_async(auth.get_current_user(token))
+        self.assertIsNone(auth.token_cache.get(token))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,8 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from automation import ContentUploader
-from models import Content
+from models import Content, ContentMedia
+from upload_job import UploadJob
 
 class TestAutomationDispatcher(unittest.TestCase):
 
@@ -20,7 +21,7 @@ class TestAutomationDispatcher(unittest.TestCase):
         """Verify it calls the correct function for post_type 'photo'."""
         mock_content = Content(post_type='photo', file_path='/path/photo.jpg', caption='A photo')
 
-        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(mock_content))
+        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(UploadJob.from_content(mock_content, "instagram")))
 
         self.assertTrue(result)
         mock_upload_photo.assert_called_once_with('/path/photo.jpg', 'A photo')
@@ -30,7 +31,7 @@ class TestAutomationDispatcher(unittest.TestCase):
         """Verify it calls the correct function for post_type 'video'."""
         mock_content = Content(post_type='video', file_path='/path/video.mp4', caption='A video')
 
-        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(mock_content))
+        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(UploadJob.from_content(mock_content, "instagram")))
 
         self.assertTrue(result)
         mock_upload_video.assert_called_once_with('/path/video.mp4', 'A video')
@@ -40,7 +41,7 @@ class TestAutomationDispatcher(unittest.TestCase):
         """Verify it calls the correct function for post_type 'reel'."""
         mock_content = Content(post_type='reel', file_path='/path/reel.mp4', caption='A reel')
 
-        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(mock_content))
+        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(UploadJob.from_content(mock_content, "instagram")))
 
         self.assertTrue(result)
         mock_upload_reel.assert_called_once_with('/path/reel.mp4', 'A reel')
@@ -50,14 +51,18 @@ class TestAutomationDispatcher(unittest.TestCase):
         """Verify it calls the correct function for post_type 'album'."""
         mock_content = Content(
             post_type='album',
-            file_path='/path/img1.jpg,/path/vid1.mp4',
-            caption='An album'
+            file_path='/path/img1.jpg',
+            caption='An album',
+            media=[
+                ContentMedia(position=0, path='/path/img1.jpg'),
+                ContentMedia(position=1, path='/path/vid1.mp4'),
+            ]
         )
 
-        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(mock_content))
+        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(UploadJob.from_content(mock_content, "instagram")))
 
         self.assertTrue(result)
-        # Check that the file_path string was correctly split into a list
+        # Check that every album member is passed, in order
         mock_upload_album.assert_called_once_with(['/path/img1.jpg', '/path/vid1.mp4'], 'An album')
 
     @patch('automation.upload_story', return_value=True)
@@ -70,7 +75,7 @@ class TestAutomationDispatcher(unittest.TestCase):
             caption='A story caption' # Caption should be passed
         )
 
-        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(mock_content))
+        result = self.loop.run_until_complete(self.uploader.upload_to_instagram(UploadJob.from_content(mock_content, "instagram")))
 
         self.assertTrue(result)
         # Check that file_path and file_type are passed
@@ -0,0 +1,126 @@
+import unittest
+import hashlib
+import tempfile
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from models import MediaBlob
+from blob_store import blob_path, bytes_saved, release_blob, release_blobs, store_blob
+from tests import memory_sessionmaker
+
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = self.tmpdir.name
+        self.db = memory_sessionmaker()()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def stage(self, name: str, data: bytes):
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path, hashlib.sha256(data).hexdigest(), len(data)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = store_blob(self.db, self.folder, *self.stage("a.tmp", b"same bytes"), ".jpg")
+        second = store_blob(self.db, self.folder, *self.stage("b.tmp", b"same bytes"), ".jpg")
+
+        self.assertEqual(first, second)
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(os.path.join(self.folder, "b.tmp")))
+        self.assertEqual(self.db.query(MediaBlob).one().ref_count, 2)
+        self.assertEqual(bytes_saved(self.db), len(b"same bytes"))
+
+    def test_blob_released_between_lookup_and_reference_is_stored_again(self):
+        path = store_blob(self.db, self.folder, *self.stage("a.tmp", b"same bytes"), ".jpg")
+        released = []
+
+        @event.listens_for(self.db, "do_orm_execute")
+        def release_first(state):
+            # Another request drops the last reference right before the ref_count bump
+            if state.is_update and not released:
+                released.append(True)
+                release_blob(self.db, path)
+
+        second = store_blob(self.db, self.folder, *self.stage("b.tmp", b"same bytes"), ".jpg")
+
+        self.assertEqual(second, path)
+        with open(second, 'rb') as f:
+            self.assertEqual(f.read(), b"same bytes")
+        self.assertEqual(self.db.query(MediaBlob).one().ref_count, 1)
+
+    def test_release_removes_the_file_before_giving_up_the_row(self):
+        path = store_blob(self.db, self.folder, *self.stage("a.tmp", b"data"), ".png")
+        on_disk_at_commit = []
+
+        @event.listens_for(self.db, "before_commit")
+        def check(session):
+            on_disk_at_commit.append(os.path.exists(path))
+
+        release_blob(self.db, path)
+
+        # A store_blob waiting on the row lock only writes the file after this commit
+        self.assertEqual(on_disk_at_commit, [False])
+
+    def test_new_blob_row_is_claimed_before_its_file_is_written(self):
+        tmp_path, sha256, size = self.stage("a.tmp", b"data")
+        on_disk_at_flush = []
+
+        @event.listens_for(self.db, "after_flush")
+        def check(session, context):
+            on_disk_at_flush.append(os.path.exists(blob_path(self.folder, sha256, ".png")))
+
+        path = store_blob(self.db, self.folder, tmp_path, sha256, size, ".png")
+
+        self.assertEqual(on_disk_at_flush, [False])
+        self.assertTrue(os.path.exists(path))
+
+    def test_blob_is_removed_with_its_last_reference(self):
+        path = store_blob(self.db, self.folder, *self.stage("a.tmp", b"data"), ".png")
+        store_blob(self.db, self.folder, *self.stage("b.tmp", b"data"), ".png")
+
+        release_blob(self.db, path)
+        self.assertTrue(os.path.exists(path))
+
+        prepared = f"{path}.feed.jpg"
+        open(prepared, 'wb').close()
+
+        release_blob(self.db, path)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(prepared))
+        self.assertEqual(self.db.query(MediaBlob).count(), 0)
+
+    def test_release_blobs_drops_one_reference_per_listed_path(self):
+        shared = store_blob(self.db, self.folder, *self.stage("a.tmp", b"shared"), ".jpg")
+        store_blob(self.db, self.folder, *self.stage("b.tmp", b"shared"), ".jpg")
+        store_blob(self.db, self.folder, *self.stage("c.tmp", b"shared"), ".jpg")
+        single = store_blob(self.db, self.folder, *self.stage("d.tmp", b"single"), ".jpg")
+        legacy, _, _ = self.stage("legacy.jpg", b"legacy")
+
+        # An album that uses the same picture twice, plus two other files
+        release_blobs(self.db, [shared, shared, single, legacy])
+
+        self.assertTrue(os.path.exists(shared))
+        self.assertEqual(self.db.query(MediaBlob).filter(MediaBlob.path == shared).one().ref_count, 1)
+        self.assertFalse(os.path.exists(single))
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(self.db.query(MediaBlob).count(), 1)
+
+    def test_legacy_file_without_blob_is_deleted_directly(self):
+        path, _, _ = self.stage("20240101_old.jpg", b"old")
+
+        release_blob(self.db, path)
+
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
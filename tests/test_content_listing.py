@@ -0,0 +1,96 @@
+import unittest
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import Content
+from content_listing import decode_cursor, encode_cursor, etag_matches, list_contents, parse_fields
+from tests import memory_sessionmaker
+
+
+class TestContentListing(unittest.TestCase):
+
+    def setUp(self):
+        self.db = memory_sessionmaker()()
+
+        start = datetime(2026, 1, 1)
+        for i in range(25):
+            self.db.add(Content(
+                id=i + 1, filename=f"{i}.jpg", file_path=f"/tmp/{i}.jpg", caption="long caption",
+                post_type="album" if i % 5 == 0 else "photo",
+                # Pairs of rows share a timestamp, so the id has to break ties.
+                created_at=start + timedelta(minutes=i // 2), updated_at=start,
+            ))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        seen, cursor = [], None
+        while True:
+            rows, cursor, _ = list_contents(self.db, ("id",), limit=7, cursor=cursor)
+            seen.extend(row["id"] for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(range(25, 0, -1)))
+
+    def test_projection_returns_only_requested_fields(self):
+        rows, _, _ = list_contents(self.db, parse_fields("id,filename"), limit=2)
+        self.assertEqual(rows, [{"id": 25, "filename": "24.jpg"}, {"id": 24, "filename": "23.jpg"}])
+
+    def test_filters(self):
+        rows, cursor, _ = list_contents(self.db, ("id", "post_type"), post_type="album")
+        self.assertEqual([row["id"] for row in rows], [21, 16, 11, 6, 1])
+        self.assertIsNone(cursor)
+
+    def test_invalid_fields_and_cursors_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_fields("id,password")
+        with self.assertRaises(ValueError):
+            list_contents(self.db, cursor="not-a-cursor")
+
+    def test_cursor_round_trip(self):
+        created_at = datetime(2026, 1, 1, 12, 30, 15, 123456)
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+
+    def test_etag_changes_only_when_the_page_changes(self):
+        _, _, etag = list_contents(self.db, ("id",), limit=5)
+        self.assertEqual(list_contents(self.db, ("id",), limit=5)[2], etag)
+        self.assertNotEqual(list_contents(self.db, ("id", "filename"), limit=5)[2], etag)
+
+        # Editing a row outside the page keeps the tag, editing one on it changes it.
+        self.db.get(Content, 1).status = "published"
+        self.db.commit()
+        self.assertEqual(list_contents(self.db, ("id",), limit=5)[2], etag)
+        self.db.get(Content, 25).status = "published"
+        self.db.commit()
+        self.assertNotEqual(list_contents(self.db, ("id",), limit=5)[2], etag)
+
+    def test_etag_changes_when_rows_appear_past_the_page(self):
+        rows, cursor, etag = list_contents(self.db, ("id",), limit=5, post_type="album")
+        self.assertEqual(len(rows), 5)
+        self.assertIsNone(cursor)
+
+        # An older album lands after the page: same rows, but now there is a next page
+        self.db.add(Content(id=100, filename="old.jpg", file_path="/tmp/old.jpg", post_type="album",
+                            created_at=datetime(2025, 1, 1), updated_at=datetime(2025, 1, 1)))
+        self.db.commit()
+
+        rows_after, cursor_after, etag_after = list_contents(self.db, ("id",), limit=5, post_type="album")
+        self.assertEqual(rows_after, rows)
+        self.assertIsNotNone(cursor_after)
+        self.assertNotEqual(etag_after, etag)
+
+    def test_etag_matching(self):
+        self.assertTrue(etag_matches('"abc"', '"abc"'))
+        self.assertTrue(etag_matches('W/"abc", "def"', '"abc"'))
+        self.assertTrue(etag_matches('*', '"abc"'))
+        self.assertFalse(etag_matches(None, '"abc"'))
+        self.assertFalse(etag_matches('"def"', '"abc"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Content, Schedule
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from dashboard_stats import (
+    DASHBOARD_RECENT_CONTENTS, TTLCache, dashboard_cache, dashboard_stats, get_dashboard_async, load_dashboard,
+)
+from tests import memory_engine, memory_sessionmaker
+
+
+class TestDashboardStats(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = memory_engine()
+        self.db = memory_sessionmaker(self.engine)()
+
+        start = datetime(2026, 1, 1)
+        for i in range(15):
+            self.db.add(Content(
+                id=i + 1, filename=f"{i}.jpg", file_path=f"/tmp/{i}.jpg",
+                status="published" if i % 3 == 0 else "uploaded", created_at=start + timedelta(minutes=i),
+            ))
+        self.db.add_all([
+            Schedule(content_id=1, platform="instagram", status="recurring", hour=8, minute=0, scheduled_time=start),
+            Schedule(content_id=15, platform="instagram", status="recurring", hour=9, minute=30, scheduled_time=start),
+            Schedule(content_id=14, platform="instagram", status="pending", scheduled_time=start),
+            Schedule(content_id=13, platform="instagram", status="completed", scheduled_time=start),
+        ])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_stats_come_from_one_query(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        stats = dashboard_stats(self.db)
+
+        self.assertEqual(stats, {"total_contents": 15, "pending_schedules": 1, "published_contents": 5})
+        self.assertEqual(len(statements), 1)
+
+    def test_recurring_map_only_covers_displayed_contents(self):
+        data = load_dashboard(self.db)
+
+        self.assertEqual(len(data["contents"]), DASHBOARD_RECENT_CONTENTS)
+        self.assertEqual(data["contents"][0].id, 15)
+        # Content 1 is recurring too, but is not among the latest contents.
+        self.assertEqual(list(data["recurring_map"]), [15])
+        self.assertEqual(data["recurring_map"][15].minute, 30)
+
+
+class TestDashboardAsync(unittest.TestCase):
+
+    def test_async_session_loads_the_same_data(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "dashboard.db")
+            sync_engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind=sync_engine)
+            with sessionmaker(bind=sync_engine)() as db:
+                db.add(Content(filename="a.jpg", file_path="/tmp/a.jpg", status="published"))
+                db.commit()
+            sync_engine.dispose()
+
+            async def load():
+                engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+                try:
+                    async with async_sessionmaker(engine)() as db:
+                        return await get_dashboard_async(db)
+                finally:
+                    await engine.dispose()
+
+            dashboard_cache.invalidate()
+            try:
+                data = asyncio.run(load())
+            finally:
+                dashboard_cache.invalidate()
+
+        self.assertEqual(data["stats"], {"total_contents": 1, "pending_schedules": 0, "published_contents": 1})
+        self.assertEqual(data["contents"][0].filename, "a.jpg")
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = TTLCache(ttl=5, clock=lambda: self.now)
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return {"value": self.loads}
+
+    def test_entries_are_reused_until_they_expire(self):
+        self.assertEqual(self.cache.get_or_load("k", self.load), {"value": 1})
+        self.now = 4.9
+        self.assertEqual(self.cache.get_or_load("k", self.load), {"value": 1})
+        self.now = 5.0
+        self.assertEqual(self.cache.get_or_load("k", self.load), {"value": 2})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_invalidate_forces_a_reload(self):
+        self.cache.get_or_load("k", self.load)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get_or_load("k", self.load), {"value": 2})
+
+    def test_zero_ttl_disables_caching(self):
+        cache = TTLCache(ttl=0, clock=lambda: self.now)
+        cache.get_or_load("k", self.load)
+        cache.get_or_load("k", self.load)
+        self.assertEqual(self.loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
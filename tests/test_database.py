@@ -0,0 +1,73 @@
+import sqlite3
+import tempfile
+import unittest
+import subprocess
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import async_database_url
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestAsyncDatabaseUrl(unittest.TestCase):
+
+    def test_sync_urls_map_to_async_drivers(self):
+        self.assertEqual(async_database_url("sqlite:///./daily_content.db"), "sqlite+aiosqlite:///./daily_content.db")
+        self.assertEqual(async_database_url("mysql+pymysql://user:p%40ss@db:3306/daily_content"),
+                         "mysql+aiomysql://user:p%40ss@db:3306/daily_content")
+        self.assertEqual(async_database_url("mysql://user:pw@db/daily_content"), "mysql+aiomysql://user:pw@db/daily_content")
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            async_database_url("postgresql://user:pw@db/daily_content")
+
+
+class TestInitDatabase(unittest.TestCase):
+    """Runs init_database in a fresh interpreter against a temporary SQLite file."""
+
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(prefix="init_db_"), "app.db")
+
+    def run_python(self, code: str):
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{self.db_path}")
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, check=True)
+
+    def init(self):
+        self.run_python("import models, database; database.init_database()")
+
+    def state(self):
+        connection = sqlite3.connect(self.db_path)
+        try:
+            tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            row = connection.execute("SELECT version_num FROM alembic_version").fetchone()
+            return tables, row and row[0]
+        finally:
+            connection.close()
+
+    def test_empty_database_is_created_and_stamped(self):
+        self.init()
+
+        tables, version = self.state()
+        self.assertTrue({"schedules", "upload_sessions", "media_blobs"} <= tables)
+        self.assertEqual(version, "0012")
+
+    def test_existing_database_is_migrated_instead_of_pre_created(self):
+        self.init()
+        self.run_python(
+            "from alembic import command; import database; command.downgrade(database._alembic_config(), 'base')"
+        )
+        self.assertNotIn("upload_sessions", self.state()[0])
+
+        self.init()  # Would fail at 0003 if the tables had been created before migrating
+
+        tables, version = self.state()
+        self.assertIn("upload_sessions", tables)
+        self.assertEqual(version, "0012")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import tempfile
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from db_pool import TimedQueuePool, apply_sqlite_pragmas, pool_stats
+
+
+class TestDbPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.tmpdir.name, 'pool.db')}",
+            poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+        )
+        apply_sqlite_pragmas(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_sqlite_pragmas_are_applied_on_connect(self):
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), 5000)
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+
+    def test_stats_report_occupancy_and_timeouts(self):
+        held = self.engine.connect()
+        try:
+            stats = pool_stats(self.engine.pool)
+            self.assertEqual((stats["size"], stats["checked_out"], stats["overflow"]), (1, 1, 0))
+
+            with self.assertRaises(PoolTimeoutError):
+                self.engine.connect()
+        finally:
+            held.close()
+
+        stats = pool_stats(self.engine.pool)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual((stats["checkouts"], stats["timeouts"]), (1, 1))
+        self.assertGreaterEqual(stats["wait_ms_max"], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
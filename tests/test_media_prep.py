@@ -0,0 +1,103 @@
+import unittest
+import asyncio
+import tempfile
+
+import sys
+import os
+import subprocess
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+from media_prep import (
+    MediaPreparer, artifact_paths, prepare_image, prepare_media, prepared_image_path, resolve_image,
+)
+
+
+class TestMediaPrep(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _make_image(self, name, size, exif=True):
+        path = os.path.join(self.folder, name)
+        img = Image.new("RGB", size, (200, 100, 50))
+        if exif:
+            data = Image.Exif()
+            data[0x010F] = "TestCamera"  # Make
+            img.save(path, "JPEG", exif=data.tobytes())
+        else:
+            img.save(path, "PNG")
+        return path
+
+    def test_tall_feed_image_is_cropped_to_four_by_five(self):
+        path = self._make_image("tall.jpg", (1000, 2000))
+        output = prepare_image(path, "photo")
+        with Image.open(output) as img:
+            self.assertEqual(img.size, (1000, 1250))
+
+    def test_wide_feed_image_is_downscaled_to_max_width(self):
+        path = self._make_image("wide.jpg", (3000, 2000))
+        output = prepare_image(path, "album")
+        with Image.open(output) as img:
+            self.assertEqual(img.size, (1080, 720))
+
+    def test_exif_is_stripped(self):
+        path = self._make_image("exif.jpg", (800, 800))
+        with Image.open(path) as original:
+            self.assertTrue(original.getexif())
+        with Image.open(prepare_image(path, "photo")) as img:
+            self.assertFalse(img.getexif())
+
+    def test_story_keeps_aspect_and_fits_story_size(self):
+        path = self._make_image("story.png", (2160, 3840), exif=False)
+        output = prepare_image(path, "story")
+        self.assertTrue(output.endswith(".story.jpg"))
+        with Image.open(output) as img:
+            self.assertEqual(img.size, (1080, 1920))
+
+    def test_resolve_image_prefers_prepared_file(self):
+        path = self._make_image("photo.jpg", (800, 800))
+        self.assertEqual(resolve_image(path, "photo"), path)
+        prepare_image(path, "photo")
+        self.assertEqual(resolve_image(path, "photo"), prepared_image_path(path, "photo"))
+        # Videos and other files are always used as-is
+        self.assertEqual(resolve_image("/x/clip.mp4", "reels"), "/x/clip.mp4")
+
+    def test_unreadable_file_falls_back_to_original(self):
+        path = os.path.join(self.folder, "broken.jpg")
+        with open(path, "wb") as f:
+            f.write(b"not an image")
+        self.assertEqual(prepare_media([path], "photo"), {path: path})
+        self.assertFalse(any(os.path.exists(p) for p in artifact_paths(path)))
+
+    def test_preparer_runs_in_process_pool(self):
+        path = self._make_image("pooled.jpg", (1200, 1200))
+        preparer = MediaPreparer(max_workers=1)
+        try:
+            results = asyncio.run(preparer.prepare([path], "photo"))
+        finally:
+            preparer.shutdown()
+        self.assertEqual(results, {path: prepared_image_path(path, "photo")})
+        with Image.open(results[path]) as img:
+            self.assertEqual(img.size, (1080, 1080))
+
+
+class TestMediaPrepSettings(unittest.TestCase):
+
+    def test_empty_worker_count_uses_the_default(self):
+        # As left by copying .env.example with an empty value
+        env = dict(os.environ, MEDIA_PREP_WORKERS="")
+        code = "import os, media_prep; print(media_prep.MEDIA_PREP_WORKERS == (os.cpu_count() or 1))"
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "True")
+
+
+if __name__ == '__main__':
+    unittest.main()
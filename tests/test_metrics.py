@@ -0,0 +1,64 @@
+import unittest
+import asyncio
+import tempfile
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prometheus_client import REGISTRY
+
+from automation import ContentUploader
+from metrics import render_metrics
+from models import Content
+from session_pool import SessionPool
+from upload_job import UploadJob
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_exposition_lists_every_metric(self):
+        content, content_type = render_metrics()
+        text = content.decode()
+
+        self.assertTrue(content_type.startswith("text/plain"))
+        for name in ("http_request_duration_seconds", "content_upload_duration_seconds",
+                     "instagram_login_duration_seconds", "scheduler_tick_duration_seconds",
+                     "scheduler_job_lateness_seconds", "scheduler_jobs_total", "scheduler_queue_depth"):
+            self.assertIn(f"# TYPE {name}", text)
+
+    def test_upload_duration_is_labelled_by_outcome(self):
+        labels = {"platform": "instagram", "post_type": "story"}
+        before_ok = sample("content_upload_duration_seconds_count", outcome="success", **labels)
+        before_failed = sample("content_upload_duration_seconds_count", outcome="failure", **labels)
+
+        uploader = ContentUploader()
+        uploader.upload_to_instagram = AsyncMock(side_effect=[True, False])
+        job = UploadJob.from_content(Content(filename="s.jpg", file_path="/tmp/s.jpg", post_type="story"), "instagram")
+        asyncio.run(uploader.upload_to_platform(job))
+        asyncio.run(uploader.upload_to_platform(job))
+
+        self.assertEqual(sample("content_upload_duration_seconds_count", outcome="success", **labels), before_ok + 1)
+        self.assertEqual(sample("content_upload_duration_seconds_count", outcome="failure", **labels), before_failed + 1)
+
+    def test_session_pool_reports_logins(self):
+        observed = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            def factory():
+                cl = MagicMock()
+                cl.dump_settings.side_effect = lambda path: Path(path).write_text("{}")
+                return cl
+
+            pool = SessionPool(client_factory=factory, login_observer=lambda kind, seconds: observed.append(kind))
+            pool.get_client("user", "pass", Path(tmpdir) / "session.json")
+
+        self.assertEqual(observed, ["login"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import unittest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics import PLATFORM_CALLS_IN_FLIGHT, PLATFORM_QUEUE_DEPTH
+from platform_executor import OutcomeUnknown, PlatformExecutor
+from retry_policy import classify_error
+from tests import run_async
+
+
+class TestPlatformExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = PlatformExecutor(max_workers=1, kind="thread", timeout=5)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+
+    def test_returns_result(self):
+        self.assertEqual(run_async(self.executor.run(pow, 2, 10)), 1024)
+        self.assertEqual(self.executor.pending, 0)
+
+    def test_gauges_split_running_and_queued_calls(self):
+        """With one worker, a second call waits in the queue."""
+        async def scenario():
+            first = asyncio.ensure_future(self.executor.run(self.release.wait))
+            second = asyncio.ensure_future(self.executor.run(self.release.wait))
+            await asyncio.sleep(0.05)
+            observed = (PLATFORM_CALLS_IN_FLIGHT._value.get(), PLATFORM_QUEUE_DEPTH._value.get())
+            self.release.set()
+            await asyncio.gather(first, second)
+            return observed
+
+        self.assertEqual(run_async(scenario()), (1, 1))
+        self.assertEqual(PLATFORM_CALLS_IN_FLIGHT._value.get(), 0)
+        self.assertEqual(PLATFORM_QUEUE_DEPTH._value.get(), 0)
+
+    def test_timeout_raises_retryable_error_and_cancels_queued_call(self):
+        calls = []
+
+        async def scenario():
+            running = asyncio.ensure_future(self.executor.run(self.release.wait))
+            await asyncio.sleep(0.05)  # let it take the only worker
+            with self.assertRaises(TimeoutError) as ctx:
+                await self.executor.run(calls.append, "queued", timeout=0.05)
+            self.release.set()
+            await running
+            return ctx.exception
+
+        error = run_async(scenario())
+        self.assertEqual(calls, [])
+        self.assertEqual(classify_error(error), ("timeout", True))
+
+    def test_timeout_of_a_running_call_is_not_retried(self):
+        async def scenario():
+            with self.assertRaises(OutcomeUnknown) as ctx:
+                await self.executor.run(self.release.wait, timeout=0.05)
+            self.release.set()
+            return ctx.exception
+
+        error = run_async(scenario())
+        self.assertEqual(classify_error(error), ("unknown_outcome", False))
+
+    def test_rejects_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            PlatformExecutor(kind="fiber")
+
+    def test_process_pool(self):
+        executor = PlatformExecutor(max_workers=1, kind="process", timeout=60)
+        try:
+            self.assertEqual(run_async(executor.run(pow, 3, 4)), 81)
+        finally:
+            executor.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import json
+import unittest
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from instagrapi.exceptions import ClientError
+
+import instagram_api
+import run_scheduler
+from automation import ContentUploader
+from instagram_api import InstagramCredentials
+from metrics import PUBLISH_DELAY
+from models import Content, Schedule
+from prestage import Prestager, claim_staging, store_staged
+from scheduler import execute_upload_logic
+from upload_job import UploadJob
+from tests import memory_sessionmaker, run_async
+
+STAGED = {"upload_id": "123", "width": 1080, "height": 1080, "post_type": "photo", "path": "/tmp/p.jpg", "username": "me"}
+
+
+class PrestageDBTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.Session = memory_sessionmaker()
+        self.now = datetime.now(timezone.utc)
+
+    def add_schedule(self, due_in: timedelta, **kwargs) -> int:
+        db = self.Session()
+        content = Content(filename="p.jpg", file_path="/tmp/p.jpg", post_type="photo")
+        db.add(content)
+        db.flush()
+        due_at = (self.now + due_in).replace(tzinfo=None)
+        schedule = Schedule(content_id=content.id, platform="instagram", scheduled_time=due_at,
+                            status="pending", next_run_at=due_at, **kwargs)
+        db.add(schedule)
+        db.commit()
+        schedule_id = schedule.id
+        db.close()
+        return schedule_id
+
+    def get(self, schedule_id: int) -> Schedule:
+        db = self.Session()
+        schedule = db.get(Schedule, schedule_id)
+        db.expunge(schedule)
+        db.close()
+        return schedule
+
+
+class TestPrestager(PrestageDBTestCase):
+
+    def make_prestager(self, stage_result=STAGED):
+        uploader = MagicMock()
+        uploader.stage_for_platform = AsyncMock(return_value=stage_result)
+        prestager = Prestager(self.Session, lead_seconds=600, uploader=uploader, clock=lambda: self.now)
+        return prestager, uploader
+
+    def test_stages_only_schedules_inside_the_lead_window(self):
+        soon = self.add_schedule(timedelta(minutes=5))
+        later = self.add_schedule(timedelta(hours=2))
+        prestager, uploader = self.make_prestager()
+
+        self.assertEqual(run_async(prestager.run_once()), 1)
+
+        self.assertEqual(json.loads(self.get(soon).staged_upload), STAGED)
+        self.assertIsNone(self.get(later).staged_upload)
+        # Already staged: the next poll leaves it alone
+        self.assertEqual(run_async(prestager.run_once()), 0)
+        uploader.stage_for_platform.assert_awaited_once()
+
+    def test_staging_finished_after_the_run_is_discarded(self):
+        schedule_id = self.add_schedule(timedelta(minutes=5))
+        db = self.Session()
+        claimed_at = claim_staging(db, schedule_id, self.now)
+        self.assertIsNotNone(claimed_at)
+        # A second process cannot claim it meanwhile
+        self.assertIsNone(claim_staging(db, schedule_id, self.now))
+
+        # The job runs first and clears the claim
+        db.query(Schedule).filter(Schedule.id == schedule_id).update({Schedule.staged_at: None})
+        db.commit()
+
+        self.assertFalse(store_staged(db, schedule_id, claimed_at, STAGED))
+        db.close()
+        self.assertIsNone(self.get(schedule_id).staged_upload)
+
+
+class TestStagedRun(PrestageDBTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch('run_scheduler.SessionLocal', self.Session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_run_uses_and_clears_the_staged_upload_and_records_delay(self):
+        schedule_id = self.add_schedule(timedelta(seconds=-1), staged_upload=json.dumps(STAGED),
+                                        staged_at=self.now.replace(tzinfo=None))
+        seen = {}
+
+        async def fake_upload(schedule, content):
+            seen["staged"] = schedule.staged_upload
+            return True
+
+        before = PUBLISH_DELAY.labels(platform="instagram", post_type="photo", staged="true")._sum.get()
+        with patch('run_scheduler.execute_upload_logic', side_effect=fake_upload):
+            run_async(run_scheduler.run_schedule(schedule_id, self.now))
+
+        schedule = self.get(schedule_id)
+        self.assertEqual(json.loads(seen["staged"]), STAGED)
+        self.assertEqual(schedule.status, "completed")
+        self.assertIsNone(schedule.staged_upload)
+        self.assertIsNone(schedule.staged_at)
+        after = PUBLISH_DELAY.labels(platform="instagram", post_type="photo", staged="true")._sum.get()
+        self.assertGreater(after, before)
+
+
+class TestStagedPublish(unittest.TestCase):
+
+    @patch('scheduler.ContentUploader')
+    def test_day_counter_caption_is_sent_with_the_staged_upload(self, MockContentUploader):
+        uploader = MockContentUploader.return_value
+        uploader.upload_to_platform = AsyncMock(return_value=True)
+        schedule = Schedule(id=1, platform="instagram", status="recurring", use_day_counter=True,
+                            day_counter=3, staged_upload=json.dumps(STAGED))
+        content = Content(id=2, caption="Stretch")
+
+        self.assertTrue(run_async(execute_upload_logic(schedule, content)))
+
+        args, _ = uploader.upload_to_platform.call_args
+        self.assertEqual(args[0].caption, "Day 3 Stretch")
+        self.assertEqual(args[1], STAGED)
+
+    def test_matching_staged_upload_is_only_configured(self):
+        job = UploadJob.from_content(Content(id=5, post_type="photo", file_path="/tmp/p.jpg", caption="Hi"), "instagram")
+        credentials = MagicMock(username="me")
+
+        with patch('automation.credentials_for', return_value=credentials), \
+                patch('automation.publish_staged', return_value=True) as publish, \
+                patch('automation.upload_photo', return_value=True) as upload:
+            self.assertTrue(run_async(ContentUploader().upload_to_instagram(job, staged=STAGED)))
+
+        publish.assert_called_once_with(STAGED, "Hi", credentials)
+        upload.assert_not_called()
+
+    def test_stale_staged_upload_falls_back_to_a_full_upload(self):
+        job = UploadJob.from_content(Content(id=5, post_type="photo", file_path="/tmp/other.jpg", caption="Hi"), "instagram")
+
+        with patch('automation.credentials_for', return_value=MagicMock(username="me")), \
+                patch('automation.publish_staged', return_value=True) as publish, \
+                patch('automation.upload_photo', return_value=True) as upload:
+            self.assertTrue(run_async(ContentUploader().upload_to_instagram(job, staged=STAGED)))
+
+        publish.assert_not_called()
+        upload.assert_called_once_with("/tmp/other.jpg", "Hi")
+
+class FakeClipClient:
+    """Follows clip_upload's shape: the clips upload steps, then clip_configure."""
+
+    def __init__(self):
+        self.uploaded = []
+        self.published = []
+
+    def clip_upload(self, path, caption, thumbnail=None, configure_timeout=10):
+        self.uploaded.append(path)
+        return self.clip_configure("u1", Path("/tmp/r.mp4.jpg"), 720, 1280, 12.5, caption, [], None)
+
+    def clip_configure(self, *args, **kwargs):
+        self.published.append(args)
+        return {"media": {"pk": 9}}
+
+
+class TestStagedReels(unittest.TestCase):
+
+    def setUp(self):
+        self.credentials = InstagramCredentials("me", "pw", Path("/tmp/me.json"), "instagram:1")
+
+    def test_reel_is_uploaded_by_clip_upload_and_stopped_before_configure(self):
+        cl = FakeClipClient()
+        with patch('instagram_api._run_with_client', side_effect=lambda action, account, **kwargs: action(cl)), \
+                patch('instagram_api.existing_thumbnail', return_value=None):
+            staged = instagram_api.stage_media("/tmp/r.mp4", "reel", self.credentials)
+
+        self.assertEqual(cl.uploaded, [Path("/tmp/r.mp4")])
+        self.assertEqual(cl.published, [])
+        self.assertEqual(staged["upload_id"], "u1")
+        self.assertEqual((staged["width"], staged["height"], staged["duration"]), (720, 1280, 12.5))
+        self.assertEqual(staged["thumbnail"], "/tmp/r.mp4.jpg")
+
+    def test_configure_waits_for_transcoding_outside_the_account_lock(self):
+        staged = {"post_type": "reel", "upload_id": "u1", "width": 720, "height": 1280, "duration": 12.5,
+                  "thumbnail": "/tmp/r.mp4.jpg"}
+        cl = MagicMock()
+        cl.clip_configure.side_effect = [ClientError("Transcode not finished yet."), {"media": {"pk": 9}}]
+        calls = []
+
+        def run_with_client(action, account):
+            calls.append("locked")
+            return action(cl)
+
+        with patch('instagram_api._run_with_client', side_effect=run_with_client), \
+                patch('instagram_api.time.sleep', side_effect=lambda seconds: calls.append("sleep")):
+            self.assertTrue(instagram_api.publish_staged(staged, "Hi", self.credentials))
+
+        # Each attempt takes the client (and its lock) separately; the sleep happens between them
+        self.assertEqual(calls, ["locked", "sleep", "locked"])
+        cl.clip_configure.assert_called_with("u1", Path("/tmp/r.mp4.jpg"), 720, 1280, 12.5, "Hi")
+
+
+if __name__ == '__main__':
+    unittest.main()
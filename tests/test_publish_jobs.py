@@ -0,0 +1,72 @@
+import unittest
+import json
+from datetime import datetime, timezone, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import Schedule
+from publish_jobs import job_events, job_state
+from tests import run_async
+
+NOW = datetime(2024, 1, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def make_job(**kwargs):
+    fields = dict(id=5, content_id=1, platform="instagram", status="pending", retry_count=0, next_run_at=NOW.replace(tzinfo=None))
+    fields.update(kwargs)
+    return Schedule(**fields)
+
+
+class TestJobState(unittest.TestCase):
+
+    def test_states_follow_the_schedule(self):
+        lease = (NOW + timedelta(minutes=5)).replace(tzinfo=None)
+        retry_at = (NOW + timedelta(minutes=1)).replace(tzinfo=None)
+
+        self.assertEqual(job_state(make_job(), NOW)["state"], "queued")
+        self.assertEqual(job_state(make_job(lease_owner="w1", lease_expires_at=lease), NOW)["state"], "running")
+        self.assertEqual(job_state(make_job(retry_count=1, next_attempt_at=retry_at, next_run_at=retry_at), NOW)["state"], "retrying")
+        self.assertEqual(job_state(make_job(status="completed", next_run_at=None), NOW)["state"], "succeeded")
+        self.assertEqual(job_state(make_job(status="failed", error_message="boom"), NOW)["error"], "boom")
+
+    def test_expired_lease_is_not_running(self):
+        expired = (NOW - timedelta(seconds=1)).replace(tzinfo=None)
+        self.assertEqual(job_state(make_job(lease_owner="w1", lease_expires_at=expired), NOW)["state"], "queued")
+
+
+class TestJobEvents(unittest.TestCase):
+
+    def collect(self, states, keepalive_seconds=100):
+        states = iter(states)
+
+        async def load_job(job_id):
+            return next(states)
+
+        async def scenario():
+            return [message async for message in job_events(load_job, 5, poll_seconds=0, keepalive_seconds=keepalive_seconds)]
+
+        return run_async(scenario())
+
+    def test_emits_changes_until_terminal_state(self):
+        queued = {"id": 5, "state": "queued", "updated_at": "a"}
+        messages = self.collect([queued, dict(queued, updated_at="b"), {"id": 5, "state": "running"},
+                                 {"id": 5, "state": "succeeded"}])
+
+        events = [json.loads(m.split("data: ")[1])["state"] for m in messages]
+        self.assertEqual(events, ["queued", "running", "succeeded"])
+
+    def test_deleted_job_ends_the_stream(self):
+        messages = self.collect([{"id": 5, "state": "queued"}, None])
+
+        self.assertTrue(messages[-1].startswith("event: gone"))
+
+    def test_sends_keepalive_while_nothing_changes(self):
+        queued = {"id": 5, "state": "queued"}
+        messages = self.collect([queued, queued, queued, None], keepalive_seconds=0)
+
+        self.assertIn(": keep-alive\n\n", messages)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, call, patch
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instagram_api
+from instagram_api import InstagramCredentials
+from rate_limiter import AccountRateLimiter
+from tests import memory_sessionmaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 10, 12, 0, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+class TestAccountRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.Session = memory_sessionmaker()
+        self.clock = FakeClock()
+
+    def make_limiter(self, **kwargs):
+        return AccountRateLimiter(self.Session, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_posts_beyond_the_limit_are_deferred_until_refill(self):
+        limiter = self.make_limiter(posts_per_hour=2)
+
+        self.assertEqual(limiter.reserve_post("a"), 0)
+        self.assertEqual(limiter.reserve_post("a"), 0)
+        self.assertAlmostEqual(limiter.reserve_post("a"), 1800)
+
+        self.clock.sleep(1800)
+        self.assertEqual(limiter.reserve_post("a"), 0)
+
+    def test_accounts_have_separate_buckets(self):
+        limiter = self.make_limiter(posts_per_hour=1)
+
+        self.assertEqual(limiter.reserve_post("a"), 0)
+        self.assertEqual(limiter.reserve_post("b"), 0)
+        self.assertGreater(limiter.reserve_post("a"), 0)
+
+    def test_state_survives_a_new_limiter(self):
+        self.make_limiter(posts_per_hour=1).reserve_post("a")
+
+        restarted = self.make_limiter(posts_per_hour=1)
+
+        self.assertAlmostEqual(restarted.projected_delay("a"), 3600)
+        self.clock.sleep(900)
+        self.assertAlmostEqual(restarted.projected_delay("a"), 2700)
+
+    def test_wait_for_call_sleeps_until_a_token_is_free(self):
+        limiter = self.make_limiter(calls_per_minute=2)
+        started = self.clock.now
+
+        for _ in range(3):
+            limiter.wait_for_call("a")
+
+        self.assertEqual(self.clock.now - started, timedelta(seconds=30))
+
+    def test_call_tokens_are_reserved_from_the_database_in_batches(self):
+        limiter = self.make_limiter(calls_per_minute=30, call_batch=5)
+        reservations = []
+        original = limiter._take
+        limiter._take = lambda *args: reservations.append(args) or original(*args)
+
+        for _ in range(12):
+            limiter.wait_for_call("a")
+
+        self.assertEqual(len(reservations), 3)
+        # Tokens held in the allowance are already gone from the shared bucket
+        self.assertAlmostEqual(limiter.projected_delay("a", "calls", count=16), 2.0)
+
+    def test_a_limit_of_zero_disables_it(self):
+        limiter = self.make_limiter(posts_per_hour=0, calls_per_minute=0)
+
+        for _ in range(3):
+            self.assertEqual(limiter.reserve_post("a"), 0)
+            limiter.wait_for_call("a")
+        self.assertEqual(limiter.snapshot("a"), {"posts": 0.0, "calls": 0.0})
+
+class TestCallMetering(unittest.TestCase):
+
+    def test_every_request_of_a_pooled_client_is_charged_to_its_account(self):
+        account = InstagramCredentials("me", "pw", Path("/tmp/me.json"), "instagram:7")
+        response = MagicMock(status_code=200)
+
+        with patch("requests.Session.request", return_value=response), \
+                patch.object(instagram_api, "call_limiter") as limiter:
+            cl = instagram_api._metered_client()
+
+            def publish(client):
+                # e.g. an album: one rupload per item, then the configure
+                client.private.post("https://i.instagram.com/rupload_igphoto/1")
+                client.private.post("https://i.instagram.com/rupload_igphoto/2")
+                client.private.post("https://i.instagram.com/api/v1/media/configure_sidecar/")
+
+            with patch.object(instagram_api.session_pool, "run",
+                              side_effect=lambda username, password, session_file, action, idempotent: action(cl)):
+                instagram_api._run_with_client(publish, account)
+            # Outside a pooled call nothing is charged
+            cl.private.get("https://i.instagram.com/api/v1/accounts/current_user/")
+
+        self.assertEqual(limiter.wait_for_call.call_args_list, [call("instagram:7")] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime, timezone, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from instagrapi.exceptions import BadPassword, ClientError, ClientRequestTimeout, PleaseWaitFewMinutes
+
+from models import Schedule
+from retry_policy import RetryPolicy, UploadError, classify_error
+
+
+class FixedRandom:
+    """Always picks the top of the jitter range."""
+
+    def uniform(self, low, high):
+        return high
+
+
+class TestClassifyError(unittest.TestCase):
+
+    def test_transient_errors_are_retryable(self):
+        self.assertEqual(classify_error(PleaseWaitFewMinutes()), ("rate_limited", True))
+        self.assertEqual(classify_error(ClientRequestTimeout()), ("timeout", True))
+        self.assertEqual(classify_error(ClientError(code=429)), ("rate_limited", True))
+        self.assertEqual(classify_error(ClientError(code=503)), ("server_error", True))
+        self.assertEqual(classify_error(RuntimeError("boom")), ("unknown", True))
+
+    def test_permanent_errors_are_not(self):
+        self.assertEqual(classify_error(BadPassword()), ("auth", False))
+        self.assertEqual(classify_error(FileNotFoundError("gone.jpg")), ("invalid_media", False))
+        self.assertEqual(classify_error(ClientError(code=400)), ("rejected", False))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_delay_doubles_up_to_the_cap(self):
+        policy = RetryPolicy(base_seconds=10, max_seconds=60, rng=FixedRandom())
+        self.assertEqual([policy.delay(n) for n in range(1, 6)], [10, 20, 40, 60, 60])
+
+    def test_jitter_stays_within_half_to_full_delay(self):
+        policy = RetryPolicy(base_seconds=10, max_seconds=600)
+        delays = [policy.delay(3) for _ in range(200)]
+        self.assertTrue(all(20 <= d <= 40 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_retry_sets_next_attempt_until_attempts_run_out(self):
+        policy = RetryPolicy(max_attempts=3, base_seconds=10, rng=FixedRandom())
+        schedule = Schedule(id=1, status="pending", retry_count=0)
+        now = datetime(2024, 1, 10, tzinfo=timezone.utc)
+        error = UploadError("timed out", "timeout")
+
+        self.assertTrue(policy.record_failure(schedule, error, now))
+        self.assertEqual(schedule.retry_count, 1)
+        self.assertEqual(schedule.next_attempt_at, datetime(2024, 1, 10, 0, 0, 10))
+
+        self.assertTrue(policy.record_failure(schedule, error, now))
+        self.assertEqual(schedule.next_attempt_at, datetime(2024, 1, 10, 0, 0, 20))
+
+        self.assertFalse(policy.record_failure(schedule, error, now))
+        self.assertEqual(schedule.retry_count, 2)
+        self.assertIsNone(schedule.next_attempt_at)
+
+    def test_permanent_error_is_not_retried(self):
+        policy = RetryPolicy(max_attempts=5)
+        schedule = Schedule(id=1, status="pending", retry_count=0)
+
+        retried = policy.record_failure(
+            schedule, UploadError("bad file", "invalid_media", retryable=False), datetime.now(timezone.utc))
+
+        self.assertFalse(retried)
+        self.assertEqual(schedule.retry_count, 0)
+        self.assertIn("invalid_media", schedule.error_message)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,372 @@
+import unittest
+import asyncio
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import run_scheduler
+from models import Content, Schedule
+from retry_policy import UploadError
+from schedule_engine import fetch_due_batches
+from tests import memory_sessionmaker
+
+
+class SchedulerDBTestCase(unittest.TestCase):
+    """Runs run_scheduler against an isolated in-memory SQLite database."""
+
+    def setUp(self):
+        self.Session = memory_sessionmaker()
+        patcher = patch('run_scheduler.SessionLocal', self.Session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_due_schedules(self, count: int, platform: str = "instagram"):
+        db = self.Session()
+        due_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        for i in range(count):
+            content = Content(filename=f"p{i}.jpg", file_path=f"/tmp/p{i}.jpg", post_type="photo")
+            db.add(content)
+            db.flush()
+            db.add(Schedule(
+                content_id=content.id, platform=platform, scheduled_time=due_at,
+                status="pending", next_run_at=due_at.replace(tzinfo=None)
+            ))
+        db.commit()
+        db.close()
+
+
+class TestConcurrentDispatch(SchedulerDBTestCase):
+
+    def run_tracking_concurrency(self, **kwargs):
+        state = {"running": 0, "peak": 0}
+
+        async def fake_upload(schedule, content):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(0.01)
+            state["running"] -= 1
+            return True
+
+        with patch('run_scheduler.execute_upload_logic', side_effect=fake_upload):
+            asyncio.run(run_scheduler.check_and_run_schedules(**kwargs))
+        return state["peak"]
+
+    def test_runs_due_jobs_concurrently_and_commits_each(self):
+        self.add_due_schedules(6)
+
+        peak = self.run_tracking_concurrency(concurrency=3, per_account_concurrency=3)
+
+        self.assertEqual(peak, 3)
+        db = self.Session()
+        statuses = {s.status for s in db.query(Schedule).all()}
+        db.close()
+        self.assertEqual(statuses, {"completed"})
+
+    def test_per_account_limit_serializes_one_account(self):
+        self.add_due_schedules(4)
+
+        peak = self.run_tracking_concurrency(concurrency=4, per_account_concurrency=1)
+
+        self.assertEqual(peak, 1)
+
+    def test_accounts_publish_in_parallel_but_each_one_serially(self):
+        self.add_due_schedules(4)
+        db = self.Session()
+        for schedule in db.query(Schedule).all():
+            schedule.account_id = 1 if schedule.id % 2 else 2
+        db.commit()
+        db.close()
+
+        peak = self.run_tracking_concurrency(concurrency=4, per_account_concurrency=1)
+
+        self.assertEqual(peak, 2)
+
+
+class TestDueQuery(SchedulerDBTestCase):
+
+    def test_fetches_only_due_rows_in_batches(self):
+        self.add_due_schedules(5)
+        db = self.Session()
+        future = datetime.now(timezone.utc) + timedelta(hours=1)
+        db.add(Schedule(content_id=1, platform="instagram", scheduled_time=future,
+                        status="pending", next_run_at=future.replace(tzinfo=None)))
+        db.commit()
+
+        batches = list(fetch_due_batches(db, datetime.now(timezone.utc), batch_size=2))
+        db.close()
+
+        self.assertEqual([len(b) for b in batches], [2, 2, 1])
+        self.assertEqual(len({s.id for b in batches for s in b}), 5)
+
+    def test_recurring_run_moves_next_run_at_to_tomorrow(self):
+        now = datetime.now(timezone.utc)
+        db = self.Session()
+        content = Content(filename="p.jpg", file_path="/tmp/p.jpg", post_type="photo")
+        db.add(content)
+        db.flush()
+        schedule = Schedule(content_id=content.id, platform="instagram", scheduled_time=now,
+                            status="recurring", hour=now.hour, minute=now.minute,
+                            next_run_at=now.replace(second=0, microsecond=0, tzinfo=None))
+        db.add(schedule)
+        db.commit()
+        schedule_id = schedule.id
+        db.close()
+
+        with patch('run_scheduler.execute_upload_logic', return_value=True), \
+                patch.dict(os.environ, {"TIMEZONE": "UTC"}):
+            asyncio.run(run_scheduler.run_schedule(schedule_id, now))
+
+        db = self.Session()
+        schedule = db.get(Schedule, schedule_id)
+        self.assertEqual(schedule.day_counter, 2)
+        self.assertGreater(schedule.next_run_at, now.replace(tzinfo=None) + timedelta(hours=23))
+        db.close()
+
+
+class TestLeaseRelease(SchedulerDBTestCase):
+
+    def test_run_that_lost_its_lease_leaves_the_new_owner_alone(self):
+        self.add_due_schedules(1)
+        now = datetime.now(timezone.utc)
+
+        async def taken_over(schedule, content):
+            db = self.Session()
+            db.get(Schedule, schedule.id).lease_owner = "other-worker"
+            db.commit()
+            db.close()
+            return True
+
+        with patch('run_scheduler.execute_upload_logic', side_effect=taken_over):
+            asyncio.run(run_scheduler.run_schedule(1, now))
+
+        db = self.Session()
+        schedule = db.get(Schedule, 1)
+        self.assertEqual(schedule.status, "completed")
+        self.assertEqual(schedule.lease_owner, "other-worker")
+        db.close()
+
+    def test_finished_run_releases_its_own_lease(self):
+        self.add_due_schedules(1)
+
+        with patch('run_scheduler.execute_upload_logic', return_value=True):
+            asyncio.run(run_scheduler.run_schedule(1, datetime.now(timezone.utc)))
+
+        db = self.Session()
+        schedule = db.get(Schedule, 1)
+        self.assertIsNone(schedule.lease_owner)
+        self.assertIsNone(schedule.lease_expires_at)
+        db.close()
+
+
+class TestRetries(SchedulerDBTestCase):
+
+    def run_failing(self, error, schedule_id, now):
+        with patch('run_scheduler.execute_upload_logic', side_effect=error):
+            asyncio.run(run_scheduler.run_schedule(schedule_id, now))
+        db = self.Session()
+        schedule = db.get(Schedule, schedule_id)
+        db.expunge(schedule)
+        db.close()
+        return schedule
+
+    def test_transient_failure_is_rescheduled_with_backoff(self):
+        self.add_due_schedules(1)
+        now = datetime.now(timezone.utc)
+
+        schedule = self.run_failing(UploadError("timed out", "timeout"), 1, now)
+
+        self.assertEqual(schedule.status, "pending")
+        self.assertEqual(schedule.retry_count, 1)
+        self.assertIsNotNone(schedule.next_attempt_at)
+        self.assertEqual(schedule.next_run_at, schedule.next_attempt_at)
+        self.assertGreater(schedule.next_run_at, now.replace(tzinfo=None))
+
+    def test_retry_that_succeeds_completes_the_job(self):
+        self.add_due_schedules(1)
+        now = datetime.now(timezone.utc)
+        self.run_failing(UploadError("timed out", "timeout"), 1, now)
+
+        later = now + timedelta(hours=2)
+        with patch('run_scheduler.execute_upload_logic', return_value=True):
+            asyncio.run(run_scheduler.run_schedule(1, later))
+
+        db = self.Session()
+        schedule = db.get(Schedule, 1)
+        self.assertEqual(schedule.status, "completed")
+        self.assertEqual(schedule.retry_count, 0)
+        self.assertIsNone(schedule.next_attempt_at)
+        db.close()
+
+    def test_permanent_failure_fails_at_once(self):
+        self.add_due_schedules(1)
+
+        schedule = self.run_failing(
+            UploadError("Unsupported file type", "invalid_media", retryable=False), 1, datetime.now(timezone.utc))
+
+        self.assertEqual(schedule.status, "failed")
+        self.assertIsNone(schedule.next_run_at)
+
+    def add_recurring(self, now, **kwargs) -> int:
+        db = self.Session()
+        content = Content(filename="p.jpg", file_path="/tmp/p.jpg", post_type="photo")
+        db.add(content)
+        db.flush()
+        schedule = Schedule(content_id=content.id, platform="instagram", scheduled_time=now,
+                            status="recurring", hour=now.hour, minute=now.minute,
+                            next_run_at=now.replace(tzinfo=None) - timedelta(seconds=1), **kwargs)
+        db.add(schedule)
+        db.commit()
+        schedule_id = schedule.id
+        db.close()
+        return schedule_id
+
+    def test_recurring_job_with_a_permanent_failure_keeps_recurring(self):
+        now = datetime.now(timezone.utc)
+        schedule_id = self.add_recurring(now)
+
+        with patch.dict(os.environ, {"TIMEZONE": "UTC"}):
+            schedule = self.run_failing(
+                UploadError("timed out while running", "unknown_outcome", retryable=False), schedule_id, now)
+
+        self.assertEqual(schedule.status, "recurring")
+        self.assertIn("unknown_outcome", schedule.error_message)
+        self.assertEqual(schedule.last_run_at, now.replace(tzinfo=None))
+        self.assertGreater(schedule.next_run_at, now.replace(tzinfo=None) + timedelta(hours=23))
+
+    def test_recurring_job_out_of_retries_waits_for_next_occurrence(self):
+        now = datetime.now(timezone.utc)
+        schedule_id = self.add_recurring(now, retry_count=4)
+
+        with patch.dict(os.environ, {"TIMEZONE": "UTC"}):
+            schedule = self.run_failing(UploadError("throttled", "rate_limited"), schedule_id, now)
+
+        self.assertEqual(schedule.status, "recurring")
+        self.assertEqual(schedule.retry_count, 0)
+        self.assertGreater(schedule.next_run_at, now.replace(tzinfo=None) + timedelta(hours=23))
+
+
+class FakeClock:
+    """A clock the test moves by hand, standing in for datetime.now."""
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+class TestMisfires(SchedulerDBTestCase):
+    """A daily 09:00 job whose run starts late, e.g. behind slow uploads or after a restart."""
+
+    def setUp(self):
+        super().setUp()
+        env = patch.dict(os.environ, {"TIMEZONE": "UTC"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.occurrence = datetime(2026, 3, 10, 9, 0, tzinfo=timezone.utc)
+        self.clock = FakeClock(self.occurrence)
+
+    def add_daily_schedule(self, next_run_at: datetime, last_run_at: datetime = None) -> int:
+        db = self.Session()
+        content = Content(filename="p.jpg", file_path="/tmp/p.jpg", post_type="photo")
+        db.add(content)
+        db.flush()
+        schedule = Schedule(content_id=content.id, platform="instagram", status="recurring", hour=9, minute=0,
+                            scheduled_time=datetime(2026, 3, 1, 8, 0), day_counter=1,
+                            last_run_at=last_run_at.replace(tzinfo=None) if last_run_at else None,
+                            next_run_at=next_run_at.replace(tzinfo=None))
+        db.add(schedule)
+        db.commit()
+        schedule_id = schedule.id
+        db.close()
+        return schedule_id
+
+    def run_at_clock(self, schedule_id: int):
+        with patch('run_scheduler.execute_upload_logic', return_value=True) as upload:
+            asyncio.run(run_scheduler.run_schedule(schedule_id, self.clock()))
+        db = self.Session()
+        schedule = db.get(Schedule, schedule_id)
+        db.expunge(schedule)
+        db.close()
+        return upload.call_count, schedule
+
+    def test_late_start_within_grace_still_runs(self):
+        schedule_id = self.add_daily_schedule(self.occurrence)
+        self.clock.advance(minutes=25)
+
+        uploads, schedule = self.run_at_clock(schedule_id)
+
+        self.assertEqual(uploads, 1)
+        self.assertEqual(schedule.day_counter, 2)
+        self.assertEqual(schedule.next_run_at, datetime(2026, 3, 11, 9, 0))
+
+    def test_missed_days_are_coalesced_into_one_run(self):
+        # The scheduler was down since before the 7th's post
+        schedule_id = self.add_daily_schedule(self.occurrence - timedelta(days=3),
+                                              last_run_at=self.occurrence - timedelta(days=4))
+        self.clock.advance(minutes=10)
+
+        uploads, schedule = self.run_at_clock(schedule_id)
+
+        self.assertEqual(uploads, 1)
+        self.assertEqual(schedule.day_counter, 2)
+        self.assertEqual(schedule.last_run_at, self.clock().replace(tzinfo=None))
+        self.assertEqual(schedule.next_run_at, datetime(2026, 3, 11, 9, 0))
+
+    def test_run_past_the_grace_period_waits_for_the_next_occurrence(self):
+        schedule_id = self.add_daily_schedule(self.occurrence)
+        self.clock.advance(hours=2)
+
+        with patch('schedule_times.SCHEDULER_MISFIRE_GRACE_SECONDS', 3600):
+            uploads, schedule = self.run_at_clock(schedule_id)
+
+        self.assertEqual(uploads, 0)
+        self.assertEqual(schedule.day_counter, 1)
+        self.assertEqual(schedule.next_run_at, datetime(2026, 3, 11, 9, 0))
+
+    def test_occurrence_already_served_is_not_run_twice(self):
+        schedule_id = self.add_daily_schedule(self.occurrence)
+        self.clock.advance(minutes=1)
+        self.run_at_clock(schedule_id)
+
+        # Someone forces it due again later the same morning
+        db = self.Session()
+        db.query(Schedule).filter(Schedule.id == schedule_id).update({"next_run_at": self.occurrence.replace(tzinfo=None)})
+        db.commit()
+        db.close()
+        self.clock.advance(minutes=5)
+
+        uploads, schedule = self.run_at_clock(schedule_id)
+
+        self.assertEqual(uploads, 0)
+        self.assertEqual(schedule.day_counter, 2)
+
+
+class TestRateLimitDeferral(SchedulerDBTestCase):
+
+    def test_job_over_the_post_limit_is_deferred_not_failed(self):
+        self.add_due_schedules(2)
+        now = datetime.now(timezone.utc)
+        limiter = run_scheduler.AccountRateLimiter(self.Session, posts_per_hour=1, clock=lambda: now)
+
+        with patch('run_scheduler.rate_limiter', limiter), \
+                patch('run_scheduler.execute_upload_logic', return_value=True) as upload:
+            asyncio.run(run_scheduler.run_schedule(1, now))
+            asyncio.run(run_scheduler.run_schedule(2, now))
+
+        self.assertEqual(upload.call_count, 1)
+        db = self.Session()
+        deferred = db.get(Schedule, 2)
+        self.assertEqual(deferred.status, "pending")
+        self.assertEqual(deferred.retry_count, 0)
+        self.assertAlmostEqual((deferred.next_run_at - now.replace(tzinfo=None)).total_seconds(), 3600, delta=1)
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytz
+
+from models import Content, Schedule
+from schedule_engine import ScheduleEngine
+from schedule_times import fire_time, next_occurrence
+from tests import memory_sessionmaker
+
+JAKARTA = pytz.timezone("Asia/Jakarta")  # UTC+7, no DST
+
+
+class TestScheduleTimes(unittest.TestCase):
+
+    def test_next_occurrence_later_today(self):
+        after = datetime(2024, 1, 10, 1, 0, tzinfo=timezone.utc)  # 08:00 in Jakarta
+        self.assertEqual(next_occurrence(9, 30, after, JAKARTA), datetime(2024, 1, 10, 2, 30, tzinfo=timezone.utc))
+
+    def test_next_occurrence_rolls_to_tomorrow(self):
+        after = datetime(2024, 1, 10, 3, 0, tzinfo=timezone.utc)  # 10:00 in Jakarta
+        self.assertEqual(next_occurrence(9, 30, after, JAKARTA), datetime(2024, 1, 11, 2, 30, tzinfo=timezone.utc))
+
+    def test_recurring_job_that_ran_today_waits_for_tomorrow(self):
+        now = datetime(2024, 1, 10, 2, 30, 20, tzinfo=timezone.utc)
+        schedule = Schedule(status="recurring", hour=9, minute=30, last_run_at=datetime(2024, 1, 10, 2, 30, 5))
+        self.assertEqual(fire_time(schedule, now, JAKARTA), datetime(2024, 1, 11, 2, 30, tzinfo=timezone.utc))
+
+    def test_recurring_job_due_within_current_minute(self):
+        now = datetime(2024, 1, 10, 2, 30, 20, tzinfo=timezone.utc)
+        schedule = Schedule(status="recurring", hour=9, minute=30, last_run_at=None)
+        self.assertEqual(fire_time(schedule, now, JAKARTA), datetime(2024, 1, 10, 2, 30, tzinfo=timezone.utc))
+
+    def test_occurrence_missed_within_grace_is_still_due(self):
+        now = datetime(2024, 1, 10, 3, 0, tzinfo=timezone.utc)  # 30 minutes after 09:30 in Jakarta
+        schedule = Schedule(status="recurring", hour=9, minute=30, last_run_at=datetime(2024, 1, 9, 2, 30, 5))
+        self.assertEqual(fire_time(schedule, now, JAKARTA, grace_seconds=3600),
+                         datetime(2024, 1, 10, 2, 30, tzinfo=timezone.utc))
+        self.assertEqual(fire_time(schedule, now, JAKARTA, grace_seconds=600),
+                         datetime(2024, 1, 11, 2, 30, tzinfo=timezone.utc))
+
+    def test_new_schedule_does_not_fire_for_an_earlier_occurrence(self):
+        now = datetime(2024, 1, 10, 2, 40, tzinfo=timezone.utc)
+        schedule = Schedule(status="recurring", hour=9, minute=30, scheduled_time=datetime(2024, 1, 10, 2, 40))
+        self.assertEqual(fire_time(schedule, now, JAKARTA, grace_seconds=3600),
+                         datetime(2024, 1, 11, 2, 30, tzinfo=timezone.utc))
+
+
+class TestScheduleEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.Session = memory_sessionmaker()
+        self.ran = []
+
+    def add_schedule(self, scheduled_time):
+        db = self.Session()
+        content = Content(filename="p.jpg", file_path="/tmp/p.jpg", post_type="photo")
+        db.add(content)
+        db.flush()
+        schedule = Schedule(
+            content_id=content.id, platform="instagram", scheduled_time=scheduled_time,
+            status="pending", next_run_at=scheduled_time.replace(tzinfo=None)
+        )
+        db.add(schedule)
+        db.commit()
+        schedule_id = schedule.id
+        db.close()
+        return schedule_id
+
+    def make_engine(self):
+        async def runner(schedule_id, now_utc):
+            self.ran.append(schedule_id)
+            db = self.Session()
+            db.query(Schedule).filter(Schedule.id == schedule_id).update({"status": "completed"})
+            db.commit()
+            db.close()
+
+        return ScheduleEngine(self.Session, runner, lambda s: s.platform, resync_interval=60)
+
+    def test_sleeps_until_due_and_records_lateness(self):
+        async def scenario():
+            due_at = datetime.now(timezone.utc) + timedelta(milliseconds=200)
+            schedule_id = self.add_schedule(due_at)
+            engine = self.make_engine()
+            loop_task = asyncio.create_task(engine.run_forever())
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.ran, [])
+            await asyncio.sleep(0.3)
+            await engine.stop()
+            await loop_task
+            return engine, schedule_id
+
+        engine, schedule_id = asyncio.run(scenario())
+
+        self.assertEqual(self.ran, [schedule_id])
+        self.assertEqual(engine.lateness.count, 1)
+        self.assertLess(engine.lateness.max, 0.2)
+
+    def test_wake_picks_up_new_schedule(self):
+        async def scenario():
+            engine = self.make_engine()
+            loop_task = asyncio.create_task(engine.run_forever())
+            await asyncio.sleep(0.05)
+            schedule_id = self.add_schedule(datetime.now(timezone.utc))
+            engine.wake()
+            await asyncio.sleep(0.1)
+            await engine.stop()
+            await loop_task
+            return schedule_id
+
+        schedule_id = asyncio.run(scenario())
+
+        self.assertEqual(self.ran, [schedule_id])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import tempfile
+import multiprocessing
+from datetime import datetime, timezone, timedelta
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Content, Schedule
+from schedule_leases import claim_schedule, release_lease, renew_lease
+
+SCHEDULE_COUNT = 40
+WORKER_COUNT = 4
+
+
+def _make_session_factory(db_path):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False, "timeout": 30})
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _claim_all(db_path, owner, results):
+    """Worker process: tries to claim every schedule, like a competing scheduler."""
+    Session = _make_session_factory(db_path)
+    db = Session()
+    now = datetime.now(timezone.utc)
+    claimed = [i for i in range(1, SCHEDULE_COUNT + 1) if claim_schedule(db, i, owner, now, 60)]
+    db.close()
+    results.put((owner, claimed))
+
+
+class TestScheduleLeases(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "leases.db")
+        self.Session = _make_session_factory(self.db_path)
+        Base.metadata.create_all(bind=self.Session.kw["bind"])
+
+        db = self.Session()
+        db.add(Content(filename="p.jpg", file_path="/tmp/p.jpg"))
+        due_at = (datetime.now(timezone.utc) - timedelta(minutes=1)).replace(tzinfo=None)
+        for _ in range(SCHEDULE_COUNT):
+            db.add(Schedule(content_id=1, platform="instagram", scheduled_time=due_at,
+                            status="pending", next_run_at=due_at))
+        db.commit()
+        db.close()
+
+    def tearDown(self):
+        self.Session.kw["bind"].dispose()
+        self.tmpdir.cleanup()
+
+    def test_competing_processes_claim_each_schedule_once(self):
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_claim_all, args=(self.db_path, f"worker-{i}", results)) for i in range(WORKER_COUNT)]
+        for worker in workers:
+            worker.start()
+        claims = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        all_claimed = [schedule_id for _, claimed in claims for schedule_id in claimed]
+        self.assertEqual(sorted(all_claimed), list(range(1, SCHEDULE_COUNT + 1)))
+
+    def test_expired_lease_can_be_taken_over(self):
+        db = self.Session()
+        now = datetime.now(timezone.utc)
+
+        self.assertTrue(claim_schedule(db, 1, "crashed", now, 60))
+        self.assertFalse(claim_schedule(db, 1, "survivor", now + timedelta(seconds=30), 60))
+        self.assertTrue(claim_schedule(db, 1, "survivor", now + timedelta(seconds=61), 60))
+        self.assertFalse(renew_lease(db, 1, "crashed", now + timedelta(seconds=62), 60))
+        db.close()
+
+    def test_renewal_keeps_lease(self):
+        db = self.Session()
+        now = datetime.now(timezone.utc)
+
+        self.assertTrue(claim_schedule(db, 1, "owner", now, 60))
+        self.assertTrue(renew_lease(db, 1, "owner", now + timedelta(seconds=50), 60))
+        self.assertFalse(claim_schedule(db, 1, "other", now + timedelta(seconds=90), 60))
+        db.close()
+
+    def test_release_leaves_a_taken_over_lease_alone(self):
+        db = self.Session()
+        now = datetime.now(timezone.utc)
+        claim_schedule(db, 1, "expired", now, 60)
+        claim_schedule(db, 1, "survivor", now + timedelta(seconds=61), 60)
+
+        self.assertFalse(release_lease(db, 1, "expired"))
+        db.commit()
+        self.assertEqual(db.get(Schedule, 1).lease_owner, "survivor")
+
+        self.assertTrue(release_lease(db, 1, "survivor"))
+        db.commit()
+        db.expire_all()
+        self.assertIsNone(db.get(Schedule, 1).lease_owner)
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import socket
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scheduler_notify import notify_scheduler, start_wake_listener
+from tests import run_async
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs UNIX sockets")
+class TestWakeSockets(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "wake.sock")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    async def listen(self, pid: int, wakes: list):
+        with patch('scheduler_notify.os.getpid', return_value=pid):
+            return await start_wake_listener(lambda: wakes.append(pid), self.path)
+
+    def test_every_scheduler_on_the_host_is_woken(self):
+        # A socket file whose scheduler died without removing it
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(f"{self.path}.3")
+        stale.close()
+
+        async def scenario():
+            wakes = []
+            first = await self.listen(1, wakes)
+            second = await self.listen(2, wakes)
+            delivered = notify_scheduler(self.path)
+            await asyncio.sleep(0.05)
+            files = sorted(os.listdir(self.tmpdir.name))
+            first.close()
+            second.close()
+            await asyncio.sleep(0)
+            return delivered, sorted(wakes), files
+
+        delivered, wakes, files = run_async(scenario())
+
+        self.assertTrue(delivered)
+        self.assertEqual(wakes, [1, 2])
+        self.assertEqual(files, ["wake.sock.1", "wake.sock.2"])
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_notify_without_a_scheduler_is_harmless(self):
+        self.assertFalse(notify_scheduler(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from instagrapi.exceptions import LoginRequired
+from session_pool import SessionPool
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.session_file = Path(self.tmpdir.name) / "session.json"
+        self.clients = []
+
+        def factory():
+            cl = MagicMock()
+            cl.dump_settings.side_effect = lambda path: Path(path).write_text("{}")
+            self.clients.append(cl)
+            return cl
+
+        self.pool = SessionPool(client_factory=factory)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_reuses_warm_client(self):
+        """Only the first request for an account logs in and verifies the session."""
+        first = self.pool.get_client("user", "pass", self.session_file)
+        second = self.pool.get_client("user", "pass", self.session_file)
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.clients), 1)
+        first.login.assert_called_once_with("user", "pass")
+        first.get_timeline_feed.assert_called_once()
+        self.assertEqual(self.pool.stats()["hits"], 1)
+        self.assertEqual(self.pool.stats()["misses"], 1)
+        self.assertTrue(self.session_file.exists())
+
+    def test_relogins_once_on_login_required(self):
+        """An expired session triggers a single re-login and a retry of an idempotent action."""
+        action = MagicMock(side_effect=[LoginRequired(), "media"])
+
+        result = self.pool.run("user", "pass", self.session_file, action, idempotent=True)
+
+        self.assertEqual(result, "media")
+        self.assertEqual(action.call_count, 2)
+        self.clients[0].login.assert_called_with("user", "pass", relogin=True)
+        self.assertEqual(self.pool.stats()["relogins"], 1)
+
+    def test_publishing_action_is_not_rerun_after_login_required(self):
+        """The action may have published before the session was rejected, so it is raised, not retried."""
+        action = MagicMock(side_effect=[LoginRequired(), "media"])
+
+        with self.assertRaises(LoginRequired):
+            self.pool.run("user", "pass", self.session_file, action)
+
+        self.assertEqual(action.call_count, 1)
+        self.clients[0].login.assert_called_with("user", "pass", relogin=True)
+        self.assertEqual(self.pool.stats()["relogins"], 1)
+
+    def test_detached_run_uses_a_copy_of_the_session_without_the_account_lock(self):
+        pooled = self.pool.get_client("user", "pass", self.session_file)
+        pooled.get_settings.return_value = {"authorization_data": {"sessionid": "abc"}}
+        lock_held = []
+
+        def action(cl):
+            lock_held.append(self.pool._lock_for("user")._is_owned())
+            return cl
+
+        detached = self.pool.run_detached("user", "pass", self.session_file, action)
+
+        self.assertIsNot(detached, pooled)
+        detached.set_settings.assert_called_once_with({"authorization_data": {"sessionid": "abc"}})
+        detached.login.assert_not_called()
+        self.assertEqual(lock_held, [False])
+
+    def test_invalidate_forces_new_login(self):
+        self.pool.get_client("user", "pass", self.session_file)
+        self.pool.invalidate("user")
+        self.pool.get_client("user", "pass", self.session_file)
+
+        self.assertEqual(len(self.clients), 2)
+        self.assertEqual(self.pool.stats()["misses"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def import_in_subprocess(module: str, database_url: str) -> set:
+    """Imports `module` in a fresh interpreter and returns the top-level packages it loaded."""
+    code = f"import sys, {module}; print(' '.join(sorted({{name.split('.')[0] for name in sys.modules}})))"
+    env = dict(os.environ, DATABASE_URL=database_url)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(prefix="startup_"), "startup.db")
+        self.database_url = f"sqlite:///{self.db_path}"
+
+    def tables(self) -> list:
+        connection = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        finally:
+            connection.close()
+
+    def test_importing_the_web_app_neither_creates_the_schema_nor_loads_instagrapi(self):
+        modules = import_in_subprocess("main", self.database_url)
+
+        self.assertIn("fastapi", modules)
+        self.assertNotIn("instagrapi", modules)
+        self.assertNotIn("alembic", modules)
+        self.assertEqual(self.tables(), [])
+
+    def test_scheduler_loads_instagrapi_only_when_it_publishes(self):
+        modules = import_in_subprocess("run_scheduler", self.database_url)
+
+        self.assertIn("automation", modules)
+        self.assertNotIn("instagrapi", modules)
+
+    def test_gunicorn_master_creates_the_schema_without_a_preloaded_app(self):
+        code = "import gunicorn_config; gunicorn_config.on_starting(None)"
+        env = dict(os.environ, DATABASE_URL=self.database_url, WEB_PRELOAD_APP="false", DB_INIT_ON_START="true")
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, check=True)
+
+        self.assertTrue({"alembic_version", "contents", "schedules", "accounts"} <= set(self.tables()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import asyncio
+import hashlib
+import tempfile
+from io import BytesIO
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import UploadFile
+from storage import (
+    FileTooLarge, assemble_chunks, discard_session, expected_chunk_length, missing_chunks, stream_to_file, write_chunk
+)
+
+
+async def _body(data: bytes):
+    yield data
+
+
+class TestStreamToFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmpdir.name, "out.bin")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_copies_in_chunks_and_hashes(self):
+        data = os.urandom(10_000)
+        upload = UploadFile(file=BytesIO(data), filename="clip.mp4")
+
+        size, digest = asyncio.run(stream_to_file(upload, self.dest, max_bytes=20_000, chunk_size=1024))
+
+        self.assertEqual(size, len(data))
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+        with open(self.dest, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_aborts_and_removes_partial_file_over_limit(self):
+        upload = UploadFile(file=BytesIO(b"x" * 5000), filename="big.mp4")
+
+        with self.assertRaises(FileTooLarge):
+            asyncio.run(stream_to_file(upload, self.dest, max_bytes=2048, chunk_size=1024))
+
+        self.assertFalse(os.path.exists(self.dest))
+
+
+class TestResumableChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_out_of_order_parallel_chunks_assemble_in_order(self):
+        data = os.urandom(2500)
+        chunk_size = 1000
+
+        async def upload(indexes):
+            await asyncio.gather(*(
+                write_chunk(self.folder, "s1", i, _body(data[i * chunk_size:(i + 1) * chunk_size]),
+                            expected_chunk_length(i, len(data), chunk_size))
+                for i in indexes
+            ))
+
+        asyncio.run(upload([2, 0]))
+        self.assertEqual(missing_chunks(self.folder, "s1", len(data), chunk_size), [1])
+
+        asyncio.run(upload([1]))
+        dest = os.path.join(self.folder, "out.bin")
+        size, digest = assemble_chunks(self.folder, "s1", len(data), chunk_size, dest)
+
+        self.assertEqual(size, len(data))
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        # Kept until the finalize commits, so a failed finalize can be retried
+        self.assertEqual(missing_chunks(self.folder, "s1", len(data), chunk_size), [])
+        discard_session(self.folder, "s1")
+        self.assertFalse(os.path.exists(os.path.join(self.folder, ".sessions", "s1")))
+
+    def test_short_chunk_is_rejected(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(write_chunk(self.folder, "s1", 0, _body(b"x" * 10), 1000))
+        self.assertEqual(missing_chunks(self.folder, "s1", 2000, 1000), [0, 1])
+
+if __name__ == '__main__':
+    unittest.main()
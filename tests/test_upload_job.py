@@ -0,0 +1,43 @@
+import pickle
+import unittest
+from dataclasses import FrozenInstanceError, replace
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import Account, Content, ContentMedia
+from upload_job import UploadJob
+
+
+class TestUploadJob(unittest.TestCase):
+
+    def make_content(self, **kwargs):
+        return Content(
+            id=9, post_type="album", file_path="/m/a.jpg", caption="Trip", file_type="image/jpeg",
+            media=[ContentMedia(position=0, path="/m/a.jpg"), ContentMedia(position=1, path="/m/b.mp4")],
+            **kwargs,
+        )
+
+    def test_snapshot_copies_plain_values(self):
+        job = UploadJob.from_content(self.make_content(), "instagram")
+
+        self.assertEqual(job.content_id, 9)
+        self.assertEqual(job.paths, ("/m/a.jpg", "/m/b.mp4"))
+        self.assertEqual(job.caption, "Trip")
+        self.assertIsNone(job.account)
+        self.assertFalse(hasattr(job, "__dict__"))
+
+    def test_is_immutable_and_picklable(self):
+        account = Account(id=2, platform="instagram", username="brand", is_active=True)
+        account.set_credentials("pw")
+        job = UploadJob.from_content(self.make_content(account=account), "instagram")
+
+        with self.assertRaises(FrozenInstanceError):
+            job.caption = "changed"
+        self.assertEqual(pickle.loads(pickle.dumps(job)), job)
+        self.assertEqual(job.account.username, "brand")
+        self.assertEqual(replace(job, caption="Day 2 Trip").caption, "Day 2 Trip")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import time
+import unittest
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import UploadSession
+from storage import session_dir
+from upload_sessions import expire_upload_sessions
+from tests import memory_sessionmaker
+
+
+class TestExpireUploadSessions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = self.tmpdir.name
+        self.db = memory_sessionmaker()()
+        self.now = datetime.now(timezone.utc)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def add_session(self, session_id: str, idle: timedelta, chunk_idle: timedelta = None):
+        updated_at = (self.now - idle).replace(tzinfo=None)
+        self.db.add(UploadSession(id=session_id, filename="v.mp4", total_size=10, chunk_size=10,
+                                  status="open", created_at=updated_at, updated_at=updated_at))
+        self.db.commit()
+        if chunk_idle is not None:
+            self.add_chunks(session_id, chunk_idle)
+
+    def add_chunks(self, session_id: str, idle: timedelta):
+        directory = session_dir(self.folder, session_id)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "0.part"), 'wb') as f:
+            f.write(b"x" * 10)
+        stamp = time.time() - idle.total_seconds()
+        os.utime(directory, (stamp, stamp))
+
+    def remaining(self):
+        return sorted(session_id for (session_id,) in self.db.query(UploadSession.id))
+
+    def test_idle_sessions_are_deleted_with_their_chunks(self):
+        self.add_session("stale", timedelta(days=2), chunk_idle=timedelta(days=2))
+        self.add_session("fresh", timedelta(hours=1), chunk_idle=timedelta(hours=1))
+        # Created long ago, but chunks are still arriving
+        self.add_session("busy", timedelta(days=2), chunk_idle=timedelta(minutes=1))
+
+        self.assertEqual(expire_upload_sessions(self.db, self.folder, self.now, ttl_seconds=86400), 1)
+
+        self.assertEqual(self.remaining(), ["busy", "fresh"])
+        self.assertFalse(os.path.exists(session_dir(self.folder, "stale")))
+        self.assertTrue(os.path.exists(session_dir(self.folder, "busy")))
+
+    def test_old_chunk_directories_without_a_session_are_removed(self):
+        self.add_chunks("orphan", timedelta(days=2))
+        self.add_chunks("new", timedelta(minutes=1))  # Its session row may not be visible yet
+
+        expire_upload_sessions(self.db, self.folder, self.now, ttl_seconds=86400)
+
+        self.assertFalse(os.path.exists(session_dir(self.folder, "orphan")))
+        self.assertTrue(os.path.exists(session_dir(self.folder, "new")))
+
+
+if __name__ == '__main__':
+    unittest.main()
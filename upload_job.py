@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from instagram_api import InstagramCredentials, credentials_for
+from media_prep import resolve_image
+from models import Account, Content
+from retry_policy import UploadError
+
+
+@dataclass(frozen=True)
+class UploadJob:
+    """
+    What one upload needs, copied out of the Content row once.
+
+    Plain values only: no ORM state, so it can be handed to executor
+    threads or pickled for a process pool, and a per-run caption is a
+    dataclasses.replace() rather than a deepcopy of the Content.
+    """
+    __slots__ = ("content_id", "platform", "post_type", "paths", "caption", "file_type", "account")
+
+    content_id: Optional[int]
+    platform: str
+    post_type: str
+    paths: Tuple[str, ...]  # Media to post, in order; images point at their prepared copies when ready
+    caption: str
+    file_type: Optional[str]
+    account: Optional[InstagramCredentials]  # None: the .env account
+
+    def __reduce__(self):
+        # Pickle through __init__: frozen slots cannot be restored by setattr
+        return (UploadJob, tuple(getattr(self, name) for name in self.__slots__))
+
+    @classmethod
+    def from_content(cls, content: Content, platform: str, account: Optional[Account] = None) -> "UploadJob":
+        """
+        Snapshot of `content` for publishing to `platform` from `account`,
+        else the content's own account, else the .env account.
+        Raises UploadError when the account cannot post there.
+        """
+        account = account if account is not None else content.account
+        if account is not None and account.platform != platform:
+            raise UploadError(f"Account '{account.username}' is not a {platform} account", "auth", retryable=False)
+        post_type = content.post_type or "unknown"
+        return cls(
+            content_id=content.id,
+            platform=platform,
+            post_type=post_type,
+            paths=tuple(resolve_image(path, post_type) for path in content.media_paths),
+            caption=content.caption or "",
+            file_type=content.file_type,
+            account=credentials_for(account) if account is not None and platform == "instagram" else None,
+        )
@@ -0,0 +1,55 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models import UploadSession
+from schedule_times import as_utc, to_db_time
+from storage import discard_session, last_chunk_time, session_dirs
+
+logger = logging.getLogger(__name__)
+
+# Resumable upload sessions with no activity for this long are dropped with their chunks
+UPLOAD_SESSION_TTL_SECONDS = float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+# How often the scheduler sweeps expired sessions (0 disables)
+UPLOAD_SESSION_SWEEP_SECONDS = float(os.getenv("UPLOAD_SESSION_SWEEP_SECONDS", "3600"))
+
+
+def expire_upload_sessions(
+    db: Session, upload_folder: str, now: Optional[datetime] = None,
+    ttl_seconds: float = UPLOAD_SESSION_TTL_SECONDS,
+) -> int:
+    """
+    Deletes upload sessions, and their chunk directories, that have seen
+    neither a status change nor a chunk for `ttl_seconds`, plus chunk
+    directories left without a session row. Returns how many sessions expired.
+    """
+    now = as_utc(now) or datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=ttl_seconds)
+
+    expired = 0
+    candidates = db.query(UploadSession.id).filter(UploadSession.updated_at < to_db_time(cutoff)).all()
+    for (session_id,) in candidates:
+        chunk_time = last_chunk_time(upload_folder, session_id)
+        if chunk_time is not None and chunk_time >= cutoff.timestamp():
+            continue  # Chunks are still arriving
+        # Conditional, so a finalize that just picked the session up keeps it
+        deleted = db.query(UploadSession).filter(
+            UploadSession.id == session_id, UploadSession.updated_at < to_db_time(cutoff),
+        ).delete(synchronize_session=False)
+        db.commit()
+        if deleted:
+            discard_session(upload_folder, session_id)
+            expired += 1
+
+    known = {session_id for (session_id,) in db.query(UploadSession.id)}
+    for session_id in session_dirs(upload_folder):
+        chunk_time = last_chunk_time(upload_folder, session_id)
+        if session_id not in known and chunk_time is not None and chunk_time < cutoff.timestamp():
+            discard_session(upload_folder, session_id)
+
+    if expired:
+        logger.info(f"Expired {expired} upload session(s) idle for over {ttl_seconds:.0f}s.")
+    return expired